@@ -1,8 +1,10 @@
 from errors import InvalidUpdate
-from git import git, CalledProcessError
+from git import git, get_object_info
 from type_conversions import to_type
 
+import marshal
 import os
+import re
 from tempfile import mkstemp
 import sys
 
@@ -34,11 +36,14 @@ GIT_CONFIG_OPTS = \
      'hooks.disable-email-diff':          {'default': False,  'type': bool},
      'hooks.disable-merge-commit-checks': {'default': False,  'type': bool},
      'hooks.file-commit-cmd':             {'default': None},
+     'hooks.filename-index-cache-size':   {'default': 20,     'type': int},
      'hooks.from-domain':                 {'default': None},
      'hooks.frozen-ref':                  {'default': '',     'type': tuple},
      'hooks.ignore-refs':                 {'default': GERRIT_INTERNAL_REFS,
                                            'type': tuple},
+     'hooks.lock-timeout':                {'default': 30,     'type': int},
      'hooks.mailinglist':                 {'default': None,   'type': tuple},
+     'hooks.mailinglist-batch':           {'default': False,  'type': bool},
      'hooks.max-commit-emails':           {'default': 100,    'type': int},
      'hooks.max-email-diff-size':         {'default': 100000, 'type': int},
      'hooks.max-rh-line-length':          {'default': 76,     'type': int},
@@ -47,16 +52,26 @@ GIT_CONFIG_OPTS = \
      'hooks.no-rh-style-checks':          {'default': '',     'type': tuple},
      'hooks.no-style-checks':             {'default': '',     'type': tuple},
      'hooks.post-receive-hook':           {'default': None},
+     'hooks.pre-receive-checks':          {'default': False,  'type': bool},
      'hooks.reject-merge-commits':        {'default': '',     'type': tuple},
+     'hooks.smtp-server':                 {'default': None},
+     'hooks.style-check-cache-size':      {'default': 10000,  'type': int},
+     'hooks.style-check-jobs':            {'default': 1,      'type': int},
      'hooks.style-checker':               {'default': 'style_checker'},
      'hooks.style-checker-config-file':   {'default': None},
      'hooks.tn-required':                 {'default': False,  'type': bool},
+     'hooks.use-sendmail':                {'default': False,  'type': bool},
 
      # The following options are for testing purposes only, and should
      # never be used in an operational repository.
      'hooks.bcc-file-ci':              {'default': True,   'type': bool},
      }
 
+# The name of the file where we cache the contents of the project.config
+# file, once parsed.  This file is relative to the root of the (bare)
+# repository.
+CONFIG_CACHE_FILENAME = 'git-hooks::config-cache'
+
 # The maximum number of characters from a commit's subject
 # to be used as part of the subject of emails describing
 # the commit.
@@ -126,20 +141,154 @@ def git_config(option_name):
     return val
 
 
+def git_config_ref_matcher(option_name):
+    """Return a RefMatcher object for the given git config option.
+
+    PARAMETERS
+        option_name: The name of a git config option whose value is
+            a list of regular expressions matching reference names.
+    """
+    # Implement the cache as an attribute of this function, where
+    # the key is the option name and its value (the list of regular
+    # expressions may change if the config gets re-initialized),
+    # and the value is the associated RefMatcher.
+    if 'cache' not in git_config_ref_matcher.__dict__:
+        # First time call, initialize the attribute.
+        git_config_ref_matcher.cache = {}
+
+    key = (option_name, git_config(option_name))
+    if key not in git_config_ref_matcher.cache:
+        git_config_ref_matcher.cache[key] = RefMatcher(key[1])
+    return git_config_ref_matcher.cache[key]
+
+
+class RefMatcher(object):
+    """An object matching reference names against a list of patterns.
+
+    Each pattern is a regular expression, which matches a reference
+    name if re.match does (in other words, the pattern must match
+    the start of the reference name).
+
+    Rather than trying each pattern one after the other, all patterns
+    are merged into a single regular expression.  Also, the patterns
+    without any special character are only used as prefixes, which is
+    faster than using the regular expression engine.
+
+    ATTRIBUTES
+        patterns: The list of patterns.
+    """
+    # The characters which have a special meaning in a regular expression.
+    SPECIAL_CHARS = frozenset('.^$*+?{}[]\\|()')
+
+    def __init__(self, patterns, prefix=''):
+        """The constructor.
+
+        PARAMETERS
+            patterns: An iterable of regular expressions.  Leading and
+                trailing spaces are ignored.
+            prefix: A string to prepend to each pattern (after having
+                stripped it).
+        """
+        self.patterns = [prefix + pattern.strip() for pattern in patterns]
+        self.__pattern_res = [re.compile(pattern)
+                              for pattern in self.patterns]
+        self.__literals = tuple(
+            pattern for pattern in self.patterns
+            if not self.SPECIAL_CHARS.intersection(pattern))
+        regexps = [pattern for pattern in self.patterns
+                   if pattern not in self.__literals]
+        self.__combined_re = None
+        if any(re.search(r'\\[1-9]|\(\?P=', regexp) for regexp in regexps):
+            # Some patterns use backreferences, which would no longer
+            # refer to the correct group once the patterns are merged.
+            # Just try each pattern individually.
+            self.__literals = ()
+        elif regexps:
+            try:
+                self.__combined_re = re.compile(
+                    '|'.join('(?:%s)' % regexp for regexp in regexps))
+            except re.error:
+                # Can happen if the same group name is used by more
+                # than one pattern.  Same as above.
+                self.__literals = ()
+
+    def match(self, ref_name):
+        """Return the first pattern matching ref_name, or None.
+
+        PARAMETERS
+            ref_name: The name of the reference.
+        """
+        if self.__literals or self.__combined_re is not None:
+            # Quickly eliminate the case where no pattern matches,
+            # which is the most common case.
+            if not (ref_name.startswith(self.__literals)
+                    or (self.__combined_re is not None
+                        and self.__combined_re.match(ref_name))):
+                return None
+        for (pattern, pattern_re) in zip(self.patterns, self.__pattern_res):
+            if pattern_re.match(ref_name):
+                return pattern
+        return None
+
+
 def initialize_git_config_map():
     """Initialize the __git_config_map global.
     """
     global __git_config_map
 
     # The hooks' configuration is stored on a special branch called
-    # refs/meta/config, inside a file called project.config.  Get
-    # that file.
+    # refs/meta/config, inside a file called project.config.
+    #
+    # Parsing that file requires calling git, and is done by every
+    # hook being called, and for each reference being updated.  So
+    # we cache the result of that parsing, using the SHA1 of that file
+    # as the key, which only costs us a quick lookup.
+    config_info = get_object_info('refs/meta/config:project.config')
+    if config_info is not None and config_info[1] == 'blob':
+        cache_key = config_cache_key(config_info[0])
+        all_configs_map = load_config_cache(cache_key)
+        if all_configs_map is None:
+            all_configs_map = read_config_file(config_info[0])
+            save_config_cache(cache_key, all_configs_map)
+    else:
+        all_configs_map = read_config_file(None)
+
+    # Populate the __git_config_map dictionary...
+    __git_config_map = {}
+    for config_name in GIT_CONFIG_OPTS.keys():
+        # Get the config value from either the all_configs_map
+        # if defined, or else from the default value.
+        if config_name in all_configs_map:
+            config_val = all_configs_map[config_name]
+        else:
+            config_val = GIT_CONFIG_OPTS[config_name]['default']
+
+        # Finally, save the config value if __git_config_map
+        __git_config_map[config_name] = config_val
+
+
+def read_config_file(blob_rev):
+    """Read and parse the hooks' config file, and return the result.
+
+    PARAMETERS
+        blob_rev: The SHA1 of the project.config file from
+            the refs/meta/config branch, or None if this file
+            does not exist.
+
+    RETURN VALUE
+        A dictionary, indexed by config name, of all the options
+        defined in the config file (and supported by this module).
+        The value of these options are converted to their type,
+        except for the values which could not be converted: They
+        are left untouched (as strings), so as to only report an
+        error if the option in question is actually used.
+    """
     (tmp_fd, tmp_file) = mkstemp('tmp-git-hooks-')
     try:
         cfg_file = tmp_file
-        try:
-            git.show('refs/meta/config:project.config', _outfile=tmp_fd)
-        except CalledProcessError:
+        if blob_rev is not None:
+            git.cat_file('blob', blob_rev, _outfile=tmp_fd)
+        else:
             # Most likely a project that still uses the repository's
             # config file to store the hooks configuration, rather
             # that the controlled project.config file.
@@ -194,18 +343,83 @@ def initialize_git_config_map():
             # for this multiple-value configs. So split each entry as well...
             config_val = to_type(config_val, tuple)
             all_configs_map[config_name] += config_val
-        else:
+        elif config_name in GIT_CONFIG_OPTS:
             all_configs_map[config_name] = config_val
 
-    # Populate the __git_config_map dictionary...
-    __git_config_map = {}
-    for config_name in GIT_CONFIG_OPTS.keys():
-        # Get the config value from either the all_configs_map
-        # if defined, or else from the default value.
-        if config_name in all_configs_map:
-            config_val = all_configs_map[config_name]
-        else:
-            config_val = GIT_CONFIG_OPTS[config_name]['default']
+    # Convert all the values to their type now, rather than each time
+    # the config file gets parsed (see git_config).
+    for (config_name, config_val) in all_configs_map.items():
+        if 'type' in GIT_CONFIG_OPTS[config_name] and \
+                isinstance(config_val, str):
+            try:
+                all_configs_map[config_name] = \
+                    to_type(config_val, GIT_CONFIG_OPTS[config_name]['type'])
+            except ValueError:
+                # Leave it to git_config to report the error.
+                pass
 
-        # Finally, save the config value if __git_config_map
-        __git_config_map[config_name] = config_val
+    return all_configs_map
+
+
+def config_cache_key(blob_rev):
+    """Return the key of the config cache for the given config file.
+
+    PARAMETERS
+        blob_rev: The SHA1 of the project.config file.
+
+    RETURN VALUE
+        A tuple which changes whenever the contents of the config
+        file changes, or whenever the parsing of that file might
+        produce different results (Eg: new version of the hooks
+        adding new options, or changing the type of existing ones).
+    """
+    return (blob_rev,
+            tuple(sorted((config_name,
+                          GIT_CONFIG_OPTS[config_name]['type'].__name__
+                          if 'type' in GIT_CONFIG_OPTS[config_name]
+                          else None)
+                         for config_name in GIT_CONFIG_OPTS)))
+
+
+def load_config_cache(cache_key):
+    """Return the config options from the cache, or None if not cached.
+
+    PARAMETERS
+        cache_key: The key of the config cache (see config_cache_key).
+
+    RETURN VALUE
+        The dictionary that read_config_file returned when the cache
+        was saved, or None if the cache does not exist or does not
+        match cache_key.
+    """
+    try:
+        with open(CONFIG_CACHE_FILENAME, 'rb') as f:
+            (key, all_configs_map) = marshal.load(f)
+    except (IOError, EOFError, ValueError, TypeError):
+        # No cache, or the cache is corrupted (or it was saved by
+        # a different version of Python).
+        return None
+    if key != cache_key:
+        return None
+    return all_configs_map
+
+
+def save_config_cache(cache_key, all_configs_map):
+    """Save the given config options in the cache.
+
+    PARAMETERS
+        cache_key: The key of the config cache (see config_cache_key).
+        all_configs_map: The dictionary returned by read_config_file.
+    """
+    try:
+        # Write the cache in a temporary file first, and then rename it,
+        # so that concurrent pushes never see a partially written cache.
+        (tmp_fd, tmp_file) = mkstemp(prefix=CONFIG_CACHE_FILENAME + '.',
+                                     dir='.')
+        with os.fdopen(tmp_fd, 'wb') as f:
+            marshal.dump((cache_key, all_configs_map), f)
+        os.rename(tmp_file, CONFIG_CACHE_FILENAME)
+    except (IOError, OSError):
+        # This is only a cache (Eg: the repository might not be
+        # writable by the user).  Just ignore the error.
+        pass
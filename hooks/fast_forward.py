@@ -13,10 +13,9 @@ Usage: fast_forward.py REF_NAME OLD_REV NEW_REV
 
 """
 
-import re
 import sys
 
-from config import git_config
+from config import git_config, RefMatcher
 from errors import InvalidUpdate
 from git import git
 from utils import warn
@@ -47,17 +46,17 @@ def check_fast_forward(ref_name, old_rev, new_rev):
     # Non-fast-forward update.  See if this is one of the branches where
     # such an update is allowed.
     ok_branches = git_config('hooks.allow-non-fast-forward')
+    ok_branches_matcher = RefMatcher(ok_branches + FORCED_UPDATE_OK_BRANCHES,
+                                     prefix='refs/heads/')
 
-    for branch in ["refs/heads/" + branch.strip()
-                   for branch in ok_branches + FORCED_UPDATE_OK_BRANCHES]:
-        if re.match(branch, ref_name) is not None:
-            # This is one of the branches where a non-fast-forward update
-            # is allowed.  Allow the update, but print a warning for
-            # the user, just to make sure he is completely aware of
-            # the changes that just took place.
-            warn("!!! WARNING: This is *NOT* a fast-forward update.")
-            warn("!!! WARNING: You may have removed some important commits.")
-            return
+    if ok_branches_matcher.match(ref_name) is not None:
+        # This is one of the branches where a non-fast-forward update
+        # is allowed.  Allow the update, but print a warning for
+        # the user, just to make sure he is completely aware of
+        # the changes that just took place.
+        warn("!!! WARNING: This is *NOT* a fast-forward update.")
+        warn("!!! WARNING: You may have removed some important commits.")
+        return
 
     # This non-fast-forward update is not allowed.
     raise InvalidUpdate(
@@ -0,0 +1,161 @@
+"""A persistent cache of the list of files in a given tree.
+
+Checking a commit for filename collisions requires the complete list
+of files in its parent, which can be expensive to obtain in large
+repositories.  And yet, most pushes are made on top of the same few
+well-known commits (Eg: the tip of the "master" branch).  This module
+provides a cache, stored inside the repository, of the list of files
+in the trees we already had to list.
+
+Each entry is keyed on the SHA1 of the tree, and is stored as a file
+containing all the filenames separated by nul characters (the same
+format as "git ls-tree -r -z --name-only").
+
+The cache is shared by all the users pushing to the repository, so
+its entries are created group-writable.  Being only a cache, errors
+accessing it are ignored (the entries concerned are considered
+missing, or are simply not recorded).
+"""
+
+import os
+from tempfile import mkstemp
+import time
+
+from config import git_config
+from utils import debug, make_shared_dir
+
+# The name of the directory where the cache is stored.  This directory
+# is relative to the root of the (bare) repository.
+FILENAME_INDEX_CACHE_DIR = 'git-hooks::filename-index-cache'
+
+# The number of seconds after which an unused entry gets evicted
+# from the cache, regardless of the size of the cache.
+FILENAME_INDEX_CACHE_MAX_AGE = 30 * 24 * 60 * 60
+
+
+class FilenameIndexCache(object):
+    """A persistent cache of the list of files in a given tree.
+
+    The cache is implemented as a directory, with one file per entry,
+    whose name is the SHA1 of the tree.  The modification time of each
+    file records the last time the entry was used, so as to evict
+    the least recently used entries when the cache grows over its
+    maximum size (see the hooks.filename-index-cache-size config
+    option), as well as the entries not used for a long time (see
+    FILENAME_INDEX_CACHE_MAX_AGE).
+
+    ATTRIBUTES
+        max_entries: The maximum number of entries in the cache.
+    """
+    def __init__(self):
+        """The constructor."""
+        self.max_entries = git_config('hooks.filename-index-cache-size')
+
+    @property
+    def enabled(self):
+        """True if the cache can be used, False otherwise."""
+        return self.max_entries > 0
+
+    def __contains__(self, tree_rev):
+        """Return True if the list of files in tree_rev is in the cache.
+
+        PARAMETERS
+            tree_rev: The SHA1 of a tree object.
+        """
+        return (self.enabled
+                and os.path.exists(os.path.join(FILENAME_INDEX_CACHE_DIR,
+                                                tree_rev)))
+
+    def get(self, tree_rev):
+        """Return the list of files in tree_rev, or None if not cached.
+
+        PARAMETERS
+            tree_rev: The SHA1 of a tree object.
+        """
+        if not self.enabled:
+            return None
+
+        entry = os.path.join(FILENAME_INDEX_CACHE_DIR, tree_rev)
+        try:
+            with open(entry) as f:
+                contents = f.read()
+            # Record this use of the entry.
+            os.utime(entry, None)
+        except (IOError, OSError):
+            return None
+        debug('filename-index cache hit: %s' % tree_rev, level=3)
+        return [filename for filename in contents.split('\x00') if filename]
+
+    def add(self, tree_rev, filename_list):
+        """Record the list of files in tree_rev.
+
+        Nothing is done if tree_rev is already in the cache.
+
+        PARAMETERS
+            tree_rev: The SHA1 of a tree object.
+            filename_list: The list of all the files in tree_rev.
+        """
+        if not self.enabled or tree_rev in self:
+            return
+
+        try:
+            make_shared_dir(FILENAME_INDEX_CACHE_DIR)
+            # Write the entry in a temporary file first, and then rename
+            # it, so that concurrent pushes never see a partially written
+            # entry.
+            (tmp_fd, tmp_file) = mkstemp(prefix='tmp-',
+                                         dir=FILENAME_INDEX_CACHE_DIR)
+        except OSError:
+            # The cache cannot be written (Eg: the repository is not
+            # writable by the user).  Just forget about this entry.
+            return
+        try:
+            try:
+                # Let the other users pushing to this repository
+                # use (and evict) this entry.
+                os.fchmod(tmp_fd, 0664)
+                os.write(tmp_fd, ''.join('%s\x00' % filename
+                                         for filename in filename_list))
+            finally:
+                os.close(tmp_fd)
+            os.rename(tmp_file,
+                      os.path.join(FILENAME_INDEX_CACHE_DIR, tree_rev))
+        except OSError:
+            # Either we could not write the entry (Eg: no space left
+            # on device), or our temporary file was evicted concurrently
+            # (see __evict below).  Same as above.
+            try:
+                os.unlink(tmp_file)
+            except OSError:
+                pass
+            return
+        self.__evict()
+
+    def __evict(self):
+        """Evict the entries that are too old, and the least recently used
+        entries, if too many.
+        """
+        oldest_allowed = time.time() - FILENAME_INDEX_CACHE_MAX_AGE
+
+        def last_use(entry):
+            try:
+                return os.path.getmtime(
+                    os.path.join(FILENAME_INDEX_CACHE_DIR, entry))
+            except OSError:
+                # The entry was probably evicted concurrently.
+                return 0
+
+        try:
+            entries = sorted(os.listdir(FILENAME_INDEX_CACHE_DIR),
+                             key=last_use)
+        except OSError:
+            return
+        nb_to_evict = max(len(entries) - self.max_entries, 0)
+        for (i, entry) in enumerate(entries):
+            if i >= nb_to_evict and last_use(entry) >= oldest_allowed:
+                break
+            try:
+                os.unlink(os.path.join(FILENAME_INDEX_CACHE_DIR, entry))
+            except OSError:
+                # Same as above, already evicted.
+                pass
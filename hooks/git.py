@@ -24,10 +24,16 @@
 # |
 # | (These are adapted from git-bz)
 
+import atexit
 import os
 import re
 from subprocess import Popen, PIPE, STDOUT
 import subprocess
+from tempfile import mkstemp
+
+# The size of the chunks used when reading the output of a git command
+# incrementally.
+OUTPUT_CHUNK_SIZE = 64 * 1024
 
 
 class CalledProcessError(subprocess.CalledProcessError):
@@ -59,6 +65,31 @@ def git_run(command, *args, **kwargs):
            _input=<str>: Feed <str> to stdinin of the command
            _outfile=<file): Use <file> as the output file descriptor
            _split_lines: Return an array with one string per returned line
+           _stdin_revs=<iterable>: Pass the --stdin option to the command,
+               and feed it the given revisions (one per line, duplicates
+               removed) via stdin.  This is meant to be used in place
+               of command line arguments with commands such as
+               "git rev-list" when the number of revisions is large
+               (Eg: one exclusion for each reference in the repository).
+               Cannot be used with _input, _max_output_size, _iter_lines
+               or _iter_records.
+           _max_output_size=<int>: Stop reading the command's output
+               as soon as it is known to be larger than <int> bytes
+               (after stripping), and terminate the command.  In that
+               case, the output is returned truncated to <int> + 1 bytes,
+               allowing the caller to determine that the output was
+               truncated.  Cannot be used with _input, _stdin_revs,
+               _outfile or _split_lines.
+           _iter_lines: Return an iterator over the lines of output
+               (without the newline character), which reads the output
+               as the command produces it, rather than all at once.
+               The iterator raises CalledProcessError once exhausted
+               if the command failed.  Cannot be used with _input,
+               _stdin_revs, _outfile, _split_lines or _max_output_size.
+           _iter_records: Same as _iter_lines, but for commands whose
+               records are terminated by NUL characters rather than
+               newlines (Eg: the -z option of many git commands).
+               See iter_nul_records.
     """
     to_run = ['git', command.replace("_", "-")]
 
@@ -67,6 +98,9 @@ def git_run(command, *args, **kwargs):
     input = None
     outfile = None
     do_split_lines = False
+    max_output_size = None
+    iter_lines = False
+    iter_records = False
     for (k, v) in kwargs.iteritems():
         if k == '_cwd':
             cwd = v
@@ -74,10 +108,32 @@ def git_run(command, *args, **kwargs):
             env = v
         elif k == '_input':
             input = v
+        elif k == '_stdin_revs':
+            assert '_input' not in kwargs
+            to_run.append('--stdin')
+            input = ''.join(['%s\n' % rev for rev in unique_revs(v)])
         elif k == '_outfile':
             outfile = v
         elif k == '_split_lines':
             do_split_lines = True
+        elif k == '_max_output_size':
+            assert ('_input' not in kwargs and '_stdin_revs' not in kwargs
+                    and '_outfile' not in kwargs
+                    and '_split_lines' not in kwargs)
+            max_output_size = v
+        elif k == '_iter_lines':
+            assert ('_input' not in kwargs and '_stdin_revs' not in kwargs
+                    and '_outfile' not in kwargs
+                    and '_split_lines' not in kwargs
+                    and '_max_output_size' not in kwargs)
+            iter_lines = True
+        elif k == '_iter_records':
+            assert ('_input' not in kwargs and '_stdin_revs' not in kwargs
+                    and '_outfile' not in kwargs
+                    and '_split_lines' not in kwargs
+                    and '_max_output_size' not in kwargs
+                    and '_iter_lines' not in kwargs)
+            iter_records = True
         elif v is True:
             if len(k) == 1:
                 to_run.append("-" + k)
@@ -93,7 +149,18 @@ def git_run(command, *args, **kwargs):
 
     process = Popen(to_run, stdout=stdout, stderr=STDOUT, stdin=stdin,
                     cwd=cwd, env=env)
-    output, error = process.communicate(input)
+    if iter_lines:
+        return iter_output_lines(process, to_run)
+    if iter_records:
+        return iter_output_records(process, to_run)
+    if max_output_size is None:
+        output, error = process.communicate(input)
+    else:
+        output, truncated = read_output_capped(process, max_output_size)
+        if truncated:
+            return output
+        error = None
+        process.wait()
     # We redirected stderr to the same fd as stdout, so error should
     # not contain anything.
     assert not error
@@ -112,6 +179,150 @@ def git_run(command, *args, **kwargs):
             return output.strip()
 
 
+def read_output_capped(process, max_output_size):
+    """Read process' output, unless larger than max_output_size bytes.
+
+    If the process' output is known to be larger than max_output_size
+    bytes (after stripping), stop reading, and terminate the process.
+    This allows us to handle commands whose output can be extremely
+    large without having to keep all of it in memory.
+
+    PARAMETERS
+        process: A Popen object, whose stdout is a pipe.
+        max_output_size: The maximum size of the output.
+
+    RETURN VALUE
+        A tuple with the output, and a boolean which is True if
+        the output was truncated.  If truncated, the output is
+        stripped, and max_output_size + 1 bytes long.  Otherwise,
+        this is the process' entire output (not stripped).
+    """
+    chunks = []
+    size = 0
+    while True:
+        data = process.stdout.read(OUTPUT_CHUNK_SIZE)
+        if not data:
+            break
+        chunks.append(data)
+        size += len(data)
+        if size > max_output_size:
+            # Only the whitespaces at both ends of the output read
+            # so far may not be part of the stripped output, so
+            # the stripped output starts with output.strip().
+            output = ''.join(chunks).strip()
+            if len(output) > max_output_size:
+                process.terminate()
+                process.stdout.close()
+                process.wait()
+                return (output[:max_output_size + 1], True)
+    process.stdout.close()
+    return (''.join(chunks), False)
+
+
+def iter_output_lines(process, to_run):
+    """Return an iterator over the lines of process' output.
+
+    PARAMETERS
+        process: A Popen object, whose stdout is a pipe.
+        to_run: The command that process is running.
+
+    RETURN VALUE
+        An iterator, yielding each line of output without the newline
+        character, and raising CalledProcessError once all lines have
+        been read if the process exited with a nonzero status.
+    """
+    try:
+        for line in process.stdout:
+            yield line.rstrip('\n')
+    finally:
+        process.stdout.close()
+        process.wait()
+    if process.returncode != 0:
+        raise CalledProcessError(process.returncode, " ".join(to_run))
+
+
+def iter_output_records(process, to_run):
+    """Return an iterator over the NUL-terminated records of process' output.
+
+    PARAMETERS
+        process: A Popen object, whose stdout is a pipe.
+        to_run: The command that process is running.
+
+    RETURN VALUE
+        An iterator, yielding each record (see iter_nul_records),
+        and raising CalledProcessError once all records have been
+        read if the process exited with a nonzero status.
+    """
+    try:
+        for record in iter_nul_records(process.stdout):
+            yield record
+    finally:
+        process.stdout.close()
+        process.wait()
+    if process.returncode != 0:
+        raise CalledProcessError(process.returncode, " ".join(to_run))
+
+
+def iter_nul_records(data):
+    """Return an iterator over the NUL-terminated records in data.
+
+    This is meant to parse the output of the git commands using
+    the -z option.  The records are extracted one after the other,
+    in a single pass over the data, and without copying the rest
+    of the data each time (unlike, say, repeatedly popping the first
+    element of a list).
+
+    PARAMETERS
+        data: Either a string, or a file object (Eg: the stdout of
+            a git command), in which case the data is read in chunks,
+            as the iteration progresses.
+
+    RETURN VALUE
+        An iterator, yielding each record without its terminating
+        NUL character.  If the data does not end with a NUL character,
+        the data after the last NUL character is yielded as the last
+        record (unless empty).
+    """
+    if isinstance(data, basestring):
+        chunks = (data,)
+    else:
+        chunks = iter(lambda: data.read(OUTPUT_CHUNK_SIZE), '')
+
+    # The beginning of a record which continues in the next chunk.
+    pending = ''
+    for chunk in chunks:
+        if pending:
+            chunk = pending + chunk
+        start = 0
+        end = chunk.find('\x00')
+        while end >= 0:
+            yield chunk[start:end]
+            start = end + 1
+            end = chunk.find('\x00', start)
+        pending = chunk[start:]
+    if pending:
+        yield pending
+
+
+def unique_revs(revs):
+    """Return the list of revisions in revs, with duplicates removed.
+
+    PARAMETERS
+        revs: An iterable of revisions.
+
+    RETURN VALUE
+        A list with the same revisions in the same order, except
+        that only the first occurence of each revision is kept.
+    """
+    seen = set()
+    result = []
+    for rev in revs:
+        if rev not in seen:
+            seen.add(rev)
+            result.append(rev)
+    return result
+
+
 class Git:
     """Wrapper to allow us to do git.<command>(...) instead of git_run()
 
@@ -139,6 +350,371 @@ class Git:
 git = Git()
 
 
+class CatFileBatch(object):
+    """A long-lived "git cat-file --batch" (or --batch-check) process.
+
+    Querying an object through "git cat-file" requires a new git
+    process each time, which becomes expensive when we need to
+    inspect thousands of objects (Eg: when style-checking a commit
+    modifying thousands of files).  This class keeps a single
+    "git cat-file --batch" process running instead, and sends it
+    our queries through a pipe.
+
+    The process is started lazily, on the first query.  It is also
+    automatically restarted if we detect that it was started from
+    another process (Eg: before daemonizing), or from another
+    directory (the process only knows about the repository it
+    was started from).
+
+    ATTRIBUTES
+        check_only: True if the process only reports the object's
+            info (--batch-check), False if it also reports the object's
+            contents (--batch).
+    """
+    def __init__(self, check_only):
+        """The constructor.
+
+        PARAMETERS
+            check_only: Same as the attribute.
+        """
+        self.check_only = check_only
+        self.__process = None
+        # A (pid, cwd, GIT_DIR) tuple identifying the context in which
+        # self.__process was started.
+        self.__owner = None
+
+    def query(self, object_name):
+        """Query the given object.
+
+        PARAMETERS
+            object_name: The name of the object, in any form accepted
+                by "git cat-file" (Eg: "<commit>:<path>").
+
+        RETURN VALUE
+            None if the object does not exist.  Otherwise, a 4-element
+            tuple: (sha1, type, size, contents), where contents is None
+            if self.check_only is True.
+        """
+        if '\n' in object_name:
+            # The batch protocol is line-oriented, so it cannot handle
+            # this object name.  Fall back to running git directly.
+            return self.__query_without_batch(object_name)
+
+        process = self.__get_process()
+        process.stdin.write(object_name + '\n')
+        process.stdin.flush()
+
+        header = process.stdout.readline()
+        if not header.endswith('\n'):
+            self.close()
+            raise CalledProcessError(process.poll() or 1,
+                                     'git cat-file %s' % self.__option,
+                                     header)
+        header = header[:-1]
+        if header.endswith(' missing') or header.endswith(' ambiguous'):
+            return None
+
+        (sha1, obj_type, size) = header.split()
+        size = int(size)
+        contents = None
+        if not self.check_only:
+            contents = process.stdout.read(size)
+            # Each object's contents is followed by a newline.
+            process.stdout.read(1)
+        return (sha1, obj_type, size, contents)
+
+    def close(self):
+        """Terminate the cat-file process, if running."""
+        if self.__process is not None and self.__owner[0] == os.getpid():
+            self.__process.stdin.close()
+            self.__process.wait()
+        self.__process = None
+        self.__owner = None
+
+    @property
+    def __option(self):
+        """The cat-file command-line option for our kind of queries."""
+        return '--batch-check' if self.check_only else '--batch'
+
+    def __get_process(self):
+        """Return the cat-file process, starting it if necessary."""
+        owner = (os.getpid(), os.getcwd(), os.environ.get('GIT_DIR'))
+        if self.__process is not None and self.__owner != owner:
+            self.close()
+        if self.__process is None:
+            with open(os.devnull, 'w') as devnull:
+                self.__process = Popen(['git', 'cat-file', self.__option],
+                                       stdin=PIPE, stdout=PIPE,
+                                       stderr=devnull)
+            self.__owner = owner
+        return self.__process
+
+    def __query_without_batch(self, object_name):
+        """Same as self.query, but without using the cat-file process."""
+        try:
+            obj_type = git.cat_file(object_name, t=True)
+        except CalledProcessError:
+            return None
+        contents = None
+        if not self.check_only:
+            # Use _outfile to get the contents unstripped.
+            (tmp_fd, tmp_file) = mkstemp('tmp-git-hooks-')
+            try:
+                git.cat_file(obj_type, object_name, _outfile=tmp_fd)
+                os.close(tmp_fd)
+                with open(tmp_file) as f:
+                    contents = f.read()
+            finally:
+                os.unlink(tmp_file)
+        return (git.rev_parse(object_name), obj_type,
+                int(git.cat_file(object_name, s=True)), contents)
+
+
+# The cat-file processes used to query the objects' info and contents.
+cat_file_batch_check = CatFileBatch(check_only=True)
+cat_file_batch = CatFileBatch(check_only=False)
+atexit.register(cat_file_batch_check.close)
+atexit.register(cat_file_batch.close)
+
+
+class CommitRecord(object):
+    """The metadata of a given commit, as held by a CommitStore.
+
+    This class uses __slots__ in order to keep the memory footprint
+    of each record to a minimum, as a store may hold a very large
+    number of records (Eg: when pushing the import of an entire
+    project's history).
+
+    ATTRIBUTES
+        rev: The commit's revision (SHA1).
+        short_rev: The commit's abbreviated revision.
+        tree: The revision (SHA1) of the commit's tree.
+        parents: A tuple of revisions (SHA1s) of the commit's parents.
+        author: The commit's author (Eg: "Name <email>").
+        committer_date: The commit's committer date (a UNIX timestamp).
+        subject: The commit's subject.
+        raw_body: The commit's raw revision log (same as
+            "git log -n1 --pretty=format:%B").
+    """
+    __slots__ = ('rev', 'short_rev', 'tree', 'parents', 'author',
+                 'committer_date', 'subject', 'raw_body')
+
+    # The format to be used with "git rev-list" in order to get all
+    # the information needed to create a CommitRecord.  The %B
+    # item must be last, as it can span multiple lines, which is why
+    # each log is also terminated by a NUL character (see
+    # commit_record_logs).
+    GIT_LOG_FORMAT = 'format:%H%n%h%n%T%n%P%n%an <%ae>%n%ct%n%s%n%B%x00'
+
+    def __init__(self, log):
+        """The constructor.
+
+        PARAMETERS
+            log: The log of our commit, as returned by
+                commit_record_logs.
+        """
+        fields = log.split('\n', 7)
+        # The raw body can be empty, in which case the stripping
+        # of the log may have removed the newline before it.
+        fields.extend([''] * (8 - len(fields)))
+        (rev, short_rev, tree, parents, author, committer_date, subject,
+         raw_body) = fields
+        # Intern the strings which tend to be repeated across commits
+        # (Eg: the same revision is the parent of one commit, and
+        # the rev of another).
+        self.rev = intern(rev)
+        self.short_rev = short_rev
+        self.tree = intern(tree)
+        self.parents = tuple(intern(parent) for parent in parents.split())
+        self.author = intern(author)
+        self.committer_date = int(committer_date)
+        self.subject = subject
+        self.raw_body = raw_body.strip()
+
+
+class CommitStore(object):
+    """A store of commit metadata, loaded lazily and in bulk.
+
+    Various parts of the hooks need information about the same
+    commits (their parents, subject, revision log, etc).  Rather
+    than calling git each time, this class allows that information
+    to be loaded once, for as many commits as needed using a single
+    git command, and then shared by everyone.
+    """
+    def __init__(self):
+        # A dictionary of CommitRecord objects, where the key is
+        # the revision used to load the record.  Records are also
+        # registered using their commit's SHA1.
+        self.__records = {}
+
+    def load(self, revs):
+        """Load the metadata of all commits in revs not already loaded.
+
+        PARAMETERS
+            revs: A list of commit revisions.
+        """
+        revs = unique_revs([rev for rev in revs if rev not in self.__records])
+        if not revs:
+            return
+        logs = commit_record_logs('--no-walk=unsorted', _stdin_revs=revs)
+        if len(logs) != len(revs):
+            # Some revisions do not resolve to exactly one commit
+            # (Eg: a tag pointing to a tree), so we cannot match
+            # each log with its revision.  Load each revision
+            # separately.
+            for rev in revs:
+                logs = commit_record_logs('-n1', rev)
+                self.__register(rev, logs[0] if logs else '')
+            return
+        for rev, log in zip(revs, logs):
+            self.__register(rev, log)
+
+    def add_logs(self, logs):
+        """Add the records corresponding to the given logs.
+
+        This is useful when the caller already had to call "git rev-list"
+        (Eg: to get a list of commits).  Using commit_record_logs for
+        that call allows us to fill the store without having to call
+        git again.
+
+        PARAMETERS
+            logs: A list of logs, as returned by commit_record_logs.
+
+        RETURN VALUE
+            The list of CommitRecord objects corresponding to logs.
+        """
+        return [self.__register(None, log) for log in logs]
+
+    def clear(self):
+        """Remove all the records from the store.
+
+        The store is meant to be cleared after each reference update
+        has been processed, so as to not keep growing when a push
+        updates many references.
+        """
+        self.__records.clear()
+
+    def get(self, rev):
+        """Return the CommitRecord of the given commit.
+
+        PARAMETERS
+            rev: A commit revision.
+
+        RETURN VALUE
+            A CommitRecord object, or None if rev does not resolve
+            to a commit.
+        """
+        if rev not in self.__records:
+            self.load([rev])
+        return self.__records[rev]
+
+    def __register(self, rev, log):
+        """Create the CommitRecord from the given log, and register it.
+
+        PARAMETERS
+            rev: The revision used to get the log.  None if the log
+                was not obtained for a specific revision.
+            log: A log, as returned by commit_record_logs.  May be
+                empty, in which case rev does not resolve to a commit.
+
+        RETURN VALUE
+            The CommitRecord object (or None if log is empty).
+        """
+        record = None
+        if log:
+            record = CommitRecord(log)
+            if record.rev in self.__records:
+                # Reuse the existing record, to save memory.
+                record = self.__records[record.rev]
+            else:
+                self.__records[record.rev] = record
+        if rev is not None:
+            self.__records[rev] = record
+        return record
+
+
+def commit_record_logs(*args, **kwargs):
+    """Return the logs needed to create the CommitRecord of some commits.
+
+    PARAMETERS
+        Same as in the "git rev-list" command, with the special
+        keyword arguments of git_run (Eg: _stdin_revs).
+
+    RETURN VALUE
+        A list with the log of each commit listed by "git rev-list",
+        in the same order, suitable for CommitRecord's constructor.
+
+    REMARKS
+        We use "git rev-list" rather than "git log", as the output
+        of the latter depends on the user's configuration (Eg: with
+        log.showSignature set, it includes the output of gpg), which
+        would break the parsing of the logs.
+    """
+    logs = []
+    # Each log is preceded by a "commit <sha1>" line, and terminated
+    # by a NUL character (see CommitRecord.GIT_LOG_FORMAT), followed
+    # by a newline.
+    for log in git.rev_list(*args, pretty=CommitRecord.GIT_LOG_FORMAT,
+                            **kwargs).split('\x00')[:-1]:
+        logs.append(log.lstrip('\n').split('\n', 1)[1].strip())
+    return logs
+
+
+# The commit store shared by everyone.
+commit_store = CommitStore()
+
+
+def get_object_info(rev):
+    """Return some info about the given object, or None if not found.
+
+    PARAMETERS
+        rev: The name of the object (Eg: "<commit>:<path>").
+
+    RETURN VALUE
+        A 3-element tuple: (sha1, type, size).
+    """
+    info = cat_file_batch_check.query(rev)
+    if info is None:
+        return None
+    return info[:3]
+
+
+def get_object_contents(rev):
+    """Return the contents of the given object, or None if not found.
+
+    PARAMETERS
+        rev: The name of the object (Eg: "<commit>:<path>").
+
+    RETURN VALUE
+        The raw contents of the object (the same as "git cat-file <type>
+        <rev>").  Unlike most other functions in this module, the output
+        is not stripped.
+    """
+    info = cat_file_batch.query(rev)
+    if info is None:
+        return None
+    return info[3]
+
+
+def commit_tree(commit_rev):
+    """Return the SHA1 of the given commit's tree.
+
+    PARAMETERS
+        commit_rev: A commit revision.
+    """
+    # Implement the cache as an attribute of this function,
+    # where the key is the commit revision, and the value
+    # the result of the query.
+    if 'cache' not in commit_tree.__dict__:
+        # First time call, initialize the attribute.
+        commit_tree.cache = {}
+
+    if commit_rev not in commit_tree.cache:
+        commit_tree.cache[commit_rev] = \
+            get_object_info('%s^{tree}' % commit_rev)[0]
+    return commit_tree.cache[commit_rev]
+
+
 def get_git_dir():
     """Return the full path to the repository's .git directory.
 
@@ -185,11 +761,7 @@ def is_valid_commit(rev):
     PARAMETERS
         rev: The commit SHA1 we want to test.
     """
-    try:
-        git.cat_file('-e', rev)
-        return True
-    except CalledProcessError:
-        return False
+    return get_object_info(rev) is not None
 
 
 def get_object_type(rev):
@@ -205,7 +777,12 @@ def get_object_type(rev):
     if is_null_rev(rev):
         rev_type = "delete"
     else:
-        rev_type = git.cat_file(rev, t=True)
+        info = get_object_info(rev)
+        if info is None:
+            raise CalledProcessError(128, 'git cat-file -t %s' % rev,
+                                     'fatal: Not a valid object name %s'
+                                     % rev)
+        rev_type = info[1]
     return rev_type
 
 
@@ -228,9 +805,8 @@ def commit_oneline(rev):
     PARAMETERS
         rev: A commit revision (SHA1).
     """
-    info = git.rev_list(rev, max_count='1', oneline=True)
-    (short_rev, subject) = info.split(None, 1)
-    return "%s... %s" % (short_rev, subject[0:59])
+    record = commit_store.get(rev)
+    return "%s... %s" % (record.short_rev, record.subject[0:59])
 
 
 def get_module_name():
@@ -260,12 +836,7 @@ def file_exists(commit_rev, filename):
     RETURN VALUE
         A boolean.
     """
-    try:
-        git.cat_file('-e', '%s:%s' % (commit_rev, filename))
-    except CalledProcessError:
-        # cat-file -e returned non-zero; the file does not exist.
-        return False
-    return True
+    return get_object_info('%s:%s' % (commit_rev, filename)) is not None
 
 
 def parse_tag_object(tag_name):
@@ -367,7 +938,7 @@ def parse_tag_object(tag_name):
 
 
 def git_show_ref(*args):
-    """Call "git show-ref [args]" and return the result as a dictionary.
+    """Return the references of the repository, as a dictionary.
 
     The key of the dictionary is the reference name, and the value
     is a string containing the reference's rev (SHA1).
@@ -376,39 +947,101 @@ def git_show_ref(*args):
     the usual CalledProcessError will be raised if not.
 
     PARAMETERS
-        *args: Each argument is passed to the "git show-ref"
+        *args: Each argument is passed to "git for-each-ref"
             as a pattern.
 
     RETURN VALUE
         A dictionary of references that matched the given patterns,
         minus the references matching the hooks.ignore-refs config.
+
+    REMARKS
+        Unlike with "git show-ref", whose patterns match the end
+        of the reference name (Eg: "master" matches "refs/heads/master"),
+        the patterns match the start of the reference name (Eg: "refs/heads/"
+        matches all branches), or the entire reference name if they
+        contain wildcards.
+
+        In some repositories, the references matching hooks.ignore-refs
+        vastly outnumber the other references (Eg: Gerrit creates one
+        reference per patch set, under refs/changes/).  So we ask git
+        to exclude them when possible, and otherwise filter them out
+        as we read the output of git, rather than afterwards.
+    """
+    exclude_options = ignored_refs_exclude_options()
+    try:
+        return for_each_ref_not_ignored(exclude_options + list(args))
+    except CalledProcessError:
+        if not exclude_options:
+            raise
+        # Most likely a version of git which does not support
+        # the --exclude option (older than 2.42).  Do not try
+        # to use it again.
+        ignored_refs_exclude_options.unsupported = True
+        return for_each_ref_not_ignored(list(args))
+
+
+def for_each_ref_not_ignored(args):
+    """Run "git for-each-ref", and return the references not ignored.
+
+    PARAMETERS
+        args: The list of arguments to pass to "git for-each-ref".
+
+    RETURN VALUE
+        Same as git_show_ref.
+    """
+    result = {}
+    for ref_info in git.for_each_ref('--format=%(objectname) %(refname)',
+                                     *args, _iter_lines=True):
+        # If the command fails, its error messages are mixed with
+        # the references, so make sure they do not cause an error
+        # here: CalledProcessError is raised after the last line.
+        (rev, _, ref) = ref_info.partition(' ')
+        if not is_ignored_ref(ref):
+            result[ref] = rev
+    return result
+
+
+def ignored_refs_exclude_options():
+    """Return the "git for-each-ref" options excluding the ignored refs.
+
+    RETURN VALUE
+        A list of --exclude options, one for each of the patterns from
+        the hooks.ignore-refs config which is equivalent to a pattern
+        understood by git.  Can be empty (Eg: if the version of git
+        was found to not support the --exclude option).  The other
+        patterns still need to be checked against each reference.
     """
     # We cannot import that at module level, because module config
     # actually depends on this module.  So we import it here instead.
     from config import git_config
 
-    matching_refs = git.show_ref(*args, _split_lines=True)
-    result = {}
-    for ref_info in matching_refs:
-        rev, ref = ref_info.split(None, 2)
-        result[ref] = rev
+    if ignored_refs_exclude_options.__dict__.get('unsupported'):
+        return []
+    exclude_options = []
+    for ignore_ref_re in git_config('hooks.ignore-refs'):
+        # We only handle the simplest (but also most common) patterns,
+        # matching all the references starting with a given directory,
+        # (Eg: "refs/changes/.*").  Those are equivalent to the same
+        # pattern without ".*", which git treats as a prefix because
+        # it ends with a '/'.
+        m = re.match(r'([^][.^$*+?{}\\|()]*/)(\.\*)?\Z', ignore_ref_re.strip())
+        if m is not None:
+            exclude_options.append('--exclude=%s' % m.group(1))
+    return exclude_options
 
-    # Remove all references which matching the hooks.ignore-refs config.
-    #
-    # It would probably have been more efficient to check the reference
-    # against the exclusion list before adding them to the dictionary.
-    # I felt that the resulting code was harder to read.  Given the
-    # typical number of entries, the impact should be barely measurable.
-    ignore_refs_list = [regex.strip()
-                        for regex in git_config('hooks.ignore-refs')]
-
-    for ref_name in result.keys():
-        for ignore_ref_re in ignore_refs_list:
-            if re.match(ignore_ref_re, ref_name):
-                del result[ref_name]
-                break
 
-    return result
+def is_ignored_ref(ref_name):
+    """Return True iff ref_name matches the hooks.ignore-refs config.
+
+    PARAMETERS
+        ref_name: The name of the reference.
+    """
+    # We cannot import that at module level, because module config
+    # actually depends on this module.  So we import it here instead.
+    from config import git_config_ref_matcher
+
+    return git_config_ref_matcher('hooks.ignore-refs').match(
+        ref_name) is not None
 
 
 def commit_parents(rev):
@@ -422,7 +1055,73 @@ def commit_parents(rev):
         (ie: the first parent is first on the list, etc). If this is
         a headeless commit, return an empty list.
     """
-    return git.log('-n1', '--pretty=format:%P', rev).strip().split()
+    record = commit_store.get(rev)
+    if record is None:
+        return []
+    return list(record.parents)
+
+
+def commit_logs(revs, pretty):
+    """Return the log of each commit in revs, using a single git command.
+
+    PARAMETERS
+        revs: A list of commit revisions (SHA1s).
+        pretty: The format to use for the log of each commit (same
+            as the --pretty option of "git log").
+
+    RETURN VALUE
+        A list with the log of each commit, in the same order as revs.
+        Each log is the same as the output of "git log -n1 <rev>"
+        with the same --pretty option.
+    """
+    if not revs:
+        # Nothing to do.  And, besides, if we called "git log" with
+        # no revision, it would default to HEAD.
+        return []
+
+    # Use the -z option to have each log separated by a NUL character,
+    # rather than a newline, so we can tell them apart.  Also, by
+    # default, "git log --no-walk" sorts the commits in reverse
+    # chronological order, but we want the logs in the same order
+    # as revs.
+    #
+    # Note that the revisions passed via --stdin are implicitly
+    # deduplicated (see git_run), so get the logs of the unique
+    # revisions first, and then build our result from them.
+    uniq_revs = unique_revs(revs)
+    logs = git.log('--no-walk=unsorted', '-z', pretty=pretty,
+                   _stdin_revs=uniq_revs).split('\x00')
+    assert len(logs) == len(uniq_revs)
+    logs_map = dict(zip(uniq_revs, [log.strip() for log in logs]))
+    return [logs_map[rev] for rev in revs]
+
+
+def get_raw_revlog(rev):
+    """Return the commit's raw revision log.
+
+    The raw revision log is the same as "git log -n1 --pretty=format:%B".
+
+    PARAMETERS
+        rev: A commit revision.
+
+    REMARKS
+        The information comes from the commit_store, and
+        prefetch_raw_revlogs can be used to load it efficiently
+        when the revision log of many commits is going to be needed.
+    """
+    return commit_store.get(rev).raw_body
+
+
+def prefetch_raw_revlogs(revs):
+    """Get the raw revision log of all commits in revs in one go.
+
+    This allows subsequent calls to get_raw_revlog for these commits
+    to be answered without having to call git again.
+
+    PARAMETERS
+        revs: A list of commit revisions.
+    """
+    commit_store.load(revs)
 
 
 def commit_subject(rev):
@@ -431,9 +1130,7 @@ def commit_subject(rev):
     PARAMETERS
         rev: A commit revision.
     """
-    info = git.rev_list(rev, max_count='1', oneline=True)
-    _, subject = info.split(None, 1)
-    return subject
+    return commit_store.get(rev).subject
 
 
 def diff_tree(*args, **kwargs):
@@ -463,47 +1160,212 @@ def diff_tree(*args, **kwargs):
     # that it separates the filename from the rest of the data
     # using the NUL character instead of a space or newline.
     #
-    # To parse the output, we split it at each NUL character.
-    # This means that the output gets split into a sequence of
-    # pairs of lines, with the first line containing the information
-    # about a given file, and the line following it containing
+    # The output is thus a sequence of NUL-terminated records,
+    # going by pairs, with the first record containing the information
+    # about a given file, and the record following it containing
     # the name of the file.
-    diff_data = git.diff_tree('-z', *args, **kwargs).split('\x00')
-
-    # When doing a "git diff-tree" with a single tree-ish, the output
-    # starts with the hash of what is being compared. We're not
-    # interested in this piece of information, so strip it.
-    if diff_data and diff_data[0] and not diff_data[0].startswith(':'):
-        assert re.match('[0-9a-fA-F]+$', diff_data[0]) is not None
-        diff_data.pop(0)
-
-    if len(diff_data) % 2 == 1 and not diff_data[-1]:
-        # Each filename ends with a NUL character, so the terminating
-        # NUL character in the last entry caused the split to add
-        # one empty element at the end. This is expected, so just
-        # remove it.
-        diff_data.pop()
-
-    # As per the above, we should now have an even number of elements
-    # in our list.
-    assert len(diff_data) % 2 == 0
+    diff_data = iter_nul_records(git.diff_tree('-z', *args, **kwargs))
 
     result = []
-    while diff_data:
-        stats = diff_data.pop(0)
-        filename = diff_data.pop(0)
+    for stats in diff_data:
+        if not result and not stats.startswith(':'):
+            # When doing a "git diff-tree" with a single tree-ish,
+            # the output starts with the hash of what is being compared.
+            # We're not interested in this piece of information, so
+            # skip it.
+            assert re.match('[0-9a-fA-F]+$', stats) is not None
+            continue
+        filename = next(diff_data, None)
+        # As per the above, each record describing a change should
+        # be followed by the name of the file.
+        assert filename is not None
+        result.append(diff_tree_entry(stats, filename))
+
+    return result
 
-        # The stats line should start with a colon and then be followed
-        # by space-separated information about the changes made to our
-        # file.  Strip that colon before we do the splitting.
-        assert stats.startswith(':')
-        stats = stats[1:]
 
-        (old_mode, new_mode, old_sha1, new_sha1, status) = stats.split(None, 4)
-        result.append((old_mode, new_mode, old_sha1, new_sha1, status,
-                       filename))
+def diff_tree_entry(stats, filename):
+    """Return the diff_tree element corresponding to one diff-tree record.
 
-    return result
+    PARAMETERS
+        stats: The first part of a record from "git diff-tree -z",
+            describing the change made to the file.
+        filename: The second part of that record (the file's name).
+
+    RETURN VALUE
+        Same as the elements of the list returned by diff_tree.
+    """
+    # The stats line should start with a colon and then be followed
+    # by space-separated information about the changes made to our
+    # file.  Strip that colon before we do the splitting.
+    assert stats.startswith(':')
+    stats = stats[1:]
+
+    (old_mode, new_mode, old_sha1, new_sha1, status) = stats.split(None, 4)
+    return (old_mode, new_mode, old_sha1, new_sha1, status, filename)
+
+
+def is_full_sha1(rev):
+    """Return True iff rev is a full (non-abbreviated) object name.
+    """
+    return re.match('[0-9a-f]{40}([0-9a-f]{24})?$', rev) is not None
+
+
+class CommitChangesStore(object):
+    """A store of the changes made by commits, loaded lazily and in bulk.
+
+    Both the style checks and the computation of the recipients of
+    commit emails need the list of files changed by each new commit.
+    Rather than calling "git diff-tree" for each commit, this class
+    allows the changes made by all these commits to be loaded using
+    a single "git diff-tree --stdin" command, and then shared by everyone.
+    """
+    def __init__(self):
+        # A dictionary of the changes made by each commit (in the same
+        # format as diff_tree's result), indexed by (base_rev, rev)
+        # tuples.
+        self.__changes = {}
+        # A list of (base_rev, rev) tuples to be loaded together with
+        # the next one that is needed.
+        self.__pending = []
+
+    def expect(self, rev_pairs):
+        """Register some commits whose changes are going to be needed.
+
+        The changes are not loaded immediately.  Instead, they get
+        loaded all at once the first time the changes of any commit
+        not already loaded are needed (see the "get" method).
+
+        PARAMETERS
+            rev_pairs: A list of (base_rev, rev) tuples, where rev
+                is the commit, and base_rev the commit (or the empty
+                tree) it should be compared to.
+        """
+        self.__pending.extend(rev_pairs)
+
+    def load(self, rev_pairs):
+        """Load the changes of all commits in rev_pairs not already loaded.
+
+        PARAMETERS
+            rev_pairs: Same as in the "expect" method.
+        """
+        rev_pairs = unique_revs([rev_pair for rev_pair in rev_pairs
+                                 if rev_pair not in self.__changes])
+
+        # With --stdin, "git diff-tree" expects lines containing
+        # full SHA1s.  A line containing two commits compares the first
+        # commit with the second one (used as the first's parent).
+        # With --root, a line containing a single root commit compares
+        # that commit with the empty tree.  Compute the changes of all
+        # the commits which do not fit in either category separately.
+        stdin_lines = []
+        stdin_pairs = []
+        for (base_rev, rev) in rev_pairs:
+            if not is_full_sha1(rev) or not is_full_sha1(base_rev):
+                continue
+            if base_rev != empty_tree_rev():
+                stdin_lines.append('%s %s' % (rev, base_rev))
+            elif not commit_parents(rev):
+                stdin_lines.append(rev)
+            else:
+                continue
+            stdin_pairs.append((base_rev, rev))
+
+        if len(stdin_pairs) > 1:
+            changes_list = self.__diff_tree_stdin(stdin_lines)
+            if changes_list is not None:
+                for (rev_pair, changes) in zip(stdin_pairs, changes_list):
+                    self.__changes[rev_pair] = changes
+
+        for (base_rev, rev) in rev_pairs:
+            if (base_rev, rev) not in self.__changes:
+                self.__changes[(base_rev, rev)] = \
+                    diff_tree('-r', base_rev, rev)
+
+    def get(self, base_rev, rev):
+        """Return the changes made by rev, compared to base_rev.
+
+        PARAMETERS
+            base_rev: The commit (or the empty tree) to compare rev to.
+            rev: A commit.
+
+        RETURN VALUE
+            Same as diff_tree('-r', base_rev, rev).
+        """
+        if (base_rev, rev) not in self.__changes:
+            (rev_pairs, self.__pending) = (self.__pending, [])
+            self.load([(base_rev, rev)] + rev_pairs)
+        return self.__changes[(base_rev, rev)]
+
+    def __diff_tree_stdin(self, stdin_lines):
+        """Run "git diff-tree --stdin" with the given input, and parse it.
+
+        PARAMETERS
+            stdin_lines: A list of lines to pass via stdin.
+
+        RETURN VALUE
+            A list containing the changes for each line (in the same
+            format as diff_tree's result), or None if the command
+            failed, or its output could not be matched to our input.
+        """
+        try:
+            # The --always option makes sure that the output contains
+            # the commit's SHA1 even when the commit changes nothing,
+            # and thus that we can match the output with the input.
+            diff_data = git.diff_tree(
+                '--stdin', '-r', '-z', '--root', '--always',
+                _input=''.join('%s\n' % line for line in stdin_lines))
+        except CalledProcessError:
+            return None
+
+        result = []
+        diff_data = iter_nul_records(diff_data)
+        for record in diff_data:
+            if not record.startswith(':'):
+                # The SHA1 of the commit, followed by its changes.
+                if (len(result) >= len(stdin_lines)
+                        or record != stdin_lines[len(result)].split()[0]):
+                    return None
+                result.append([])
+            else:
+                filename = next(diff_data, None)
+                if not result or filename is None:
+                    return None
+                result[-1].append(diff_tree_entry(record, filename))
+        if len(result) != len(stdin_lines):
+            return None
+        return result
+
+
+# The commit changes store shared by everyone.
+commit_changes_store = CommitChangesStore()
+
+
+def commit_changes(base_rev, rev):
+    """Return the changes made by rev, compared to base_rev.
+
+    This is the same as diff_tree('-r', base_rev, rev), except that
+    the changes of all the commits registered via prefetch_commit_changes
+    are loaded at the same time, using a single git command.
+
+    PARAMETERS
+        base_rev: The commit (or the empty tree) to compare rev to.
+        rev: A commit.
+    """
+    return commit_changes_store.get(base_rev, rev)
+
+
+def prefetch_commit_changes(rev_pairs):
+    """Prepare for getting the changes made by the given commits.
+
+    The changes are actually loaded, in bulk, the first time
+    commit_changes is called for a commit not loaded yet.
+
+    PARAMETERS
+        rev_pairs: A list of (base_rev, rev) tuples, as the arguments
+            to be passed to commit_changes.
+    """
+    commit_changes_store.expect(rev_pairs)
 
 
 def is_revert_commit(rev):
@@ -517,7 +1379,7 @@ def is_revert_commit(rev):
     # the "git revert" command automatically includes in the default
     # revision log of such commits, hoping that a user is not deleting
     # them afterwards.
-    raw_revlog = git.log('-1', rev, pretty='format:%B')
+    raw_revlog = get_raw_revlog(rev)
     if 'This reverts commit' in raw_revlog:
         return True
 
@@ -5,39 +5,448 @@ because it makes some assumptions that are specific to AdaCore (Eg:
 we take into account a default_attributes file in info/).
 """
 
+from hashlib import sha1
 import os
 from os.path import isfile
-from shutil import copy
+import re
 
-from git import git, file_exists
-from tempfile import mkdtemp
-import utils
+from git import CalledProcessError, commit_tree, get_object_contents
+from utils import debug
 
 # The name of the default attributes file in the bare repository.
 # This file expected to be relative to the root of the bare repository.
 DEFAULT_ATTRIBUTES_FILE = 'info/default_attributes'
 
+# The macro attributes defined by git itself, in gitattributes format.
+BUILTIN_ATTRIBUTES = '[attr]binary -diff -merge -text\n'
 
-def cached_file_exists(commit_rev, filename):
-    """A wrapper around git.file_exists but with a cache...
+# The characters which git considers as blanks when parsing
+# gitattributes files.
+BLANKS = ' \t\r\n'
 
-    ... to avoid repetitive calls to git.
+# The prefix introducing the definition of a macro attribute.
+MACRO_PREFIX = '[attr]'
+
+# The escape sequences supported in C-style quoted patterns,
+# other than octal sequences.
+C_STYLE_ESCAPES = {'a': '\a', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r',
+                   't': '\t', 'v': '\v', '\\': '\\', '"': '"'}
+
+# The character classes which can be used inside bracket expressions
+# (Eg: "[[:digit:]]"), and their equivalent in a python regexp.
+CHARACTER_CLASSES = {
+    'alnum': 'a-zA-Z0-9',
+    'alpha': 'a-zA-Z',
+    'blank': ' \\t',
+    'cntrl': '\\x00-\\x1f\\x7f',
+    'digit': '0-9',
+    'graph': '\\x21-\\x7e',
+    'lower': 'a-z',
+    'print': '\\x20-\\x7e',
+    'punct': re.escape('!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~'),
+    'space': ' \\t\\n\\r\\f\\v',
+    'upper': 'A-Z',
+    'xdigit': '0-9A-Fa-f',
+}
+
+# A regular expression which never matches anything.
+NO_MATCH_RE = '(?!)'
+
+
+def attr_name_valid(name):
+    """Return True if name is a valid attribute name, False otherwise.
+
+    PARAMETERS
+        name: An attribute name.
+    """
+    return (re.match(r'[-._A-Za-z0-9]+\Z', name) is not None
+            and not name.startswith('-')
+            and not name.startswith('builtin_'))
+
+
+def unquote_c_style(text):
+    """Unquote the C-style quoted string at the start of text.
+
+    PARAMETERS
+        text: A string starting with a double quote.
+
+    RETURN VALUE
+        A tuple with the unquoted string, and the rest of text
+        (after the closing double quote).  None if text does not
+        start with a valid C-style quoted string.
+    """
+    assert text.startswith('"')
+    result = []
+    i = 1
+    while i < len(text):
+        c = text[i]
+        if c == '"':
+            return (''.join(result), text[i + 1:])
+        if c == '\\':
+            i += 1
+            if i >= len(text):
+                return None
+            c = text[i]
+            if c in C_STYLE_ESCAPES:
+                result.append(C_STYLE_ESCAPES[c])
+            elif c in '0123':
+                octal = text[i:i + 3]
+                if len(octal) != 3 or not all(d in '01234567' for d in octal):
+                    return None
+                result.append(chr(int(octal, 8)))
+                i += 2
+            else:
+                return None
+        else:
+            result.append(c)
+        i += 1
+    return None
+
+
+def wildmatch_regexp(pattern):
+    """Return a regexp equivalent to the given gitattributes pattern.
+
+    The pattern is interpreted the same way as git's wildmatch
+    with the WM_PATHNAME flag; in other words, "*", "?" and bracket
+    expressions do not match a '/', while "**" matches any number
+    of directories when used as a full pathname component.
+
+    PARAMETERS
+        pattern: A pattern, as found in a gitattributes file.
+
+    RETURN VALUE
+        A string containing the equivalent regular expression.
+    """
+    result = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            i += 1
+            if i >= len(pattern):
+                # A trailing backslash makes the pattern malformed.
+                return NO_MATCH_RE
+            result.append(re.escape(pattern[i]))
+        elif c == '?':
+            result.append('[^/]')
+        elif c == '*':
+            start = i
+            while i + 1 < len(pattern) and pattern[i + 1] == '*':
+                i += 1
+            if (i > start
+                    and (start == 0 or pattern[start - 1] == '/')
+                    and (i + 1 == len(pattern) or pattern[i + 1] == '/')):
+                if i + 1 == len(pattern):
+                    # A trailing "**" matches everything.
+                    result.append('.*')
+                else:
+                    # A "**/" matches zero or more directories.
+                    result.append('(?:.*/)?')
+                    i += 1
+            else:
+                result.append('[^/]*')
+        elif c == '[':
+            bracket_end, bracket_re = bracket_regexp(pattern, i)
+            if bracket_re is None:
+                # An unterminated bracket expression makes the pattern
+                # malformed.
+                return NO_MATCH_RE
+            result.append(bracket_re)
+            i = bracket_end
+        else:
+            result.append(re.escape(c))
+        i += 1
+    return ''.join(result) + r'\Z'
+
+
+def bracket_regexp(pattern, start):
+    """Return the regexp equivalent to a bracket expression in pattern.
+
+    PARAMETERS
+        pattern: A pattern, as found in a gitattributes file.
+        start: The index in pattern of the '[' character starting
+            the bracket expression.
+
+    RETURN VALUE
+        A tuple with the index in pattern of the ']' character ending
+        the bracket expression, and the equivalent regexp.  The regexp
+        is None if the bracket expression is not terminated.
+    """
+    items = []
+    negated = False
+    i = start + 1
+    if i < len(pattern) and pattern[i] in '!^':
+        negated = True
+        i += 1
+    first = True
+    while i < len(pattern) and (first or pattern[i] != ']'):
+        first = False
+        c = pattern[i]
+        if c == '\\':
+            i += 1
+            if i >= len(pattern):
+                return (i, None)
+            c = pattern[i]
+        elif c == '[' and pattern[i + 1:i + 2] == ':':
+            class_end = pattern.find(':]', i + 2)
+            if class_end >= 0:
+                class_name = pattern[i + 2:class_end]
+                if class_name not in CHARACTER_CLASSES:
+                    # Unknown character classes make the pattern
+                    # malformed.
+                    return (i, None)
+                items.append(CHARACTER_CLASSES[class_name])
+                i = class_end + 2
+                continue
+        if (pattern[i + 1:i + 2] == '-' and i + 2 < len(pattern)
+                and pattern[i + 2] != ']'):
+            # A range.
+            i += 2
+            high = pattern[i]
+            if high == '\\':
+                i += 1
+                if i >= len(pattern):
+                    return (i, None)
+                high = pattern[i]
+            if c <= high:
+                items.append('%s-%s' % (re.escape(c), re.escape(high)))
+        else:
+            items.append(re.escape(c))
+        i += 1
+    if i >= len(pattern):
+        return (i, None)
+    if not items:
+        # Only possible with empty ranges, which match nothing...
+        # unless negated.
+        return (i, '[^/]' if negated else NO_MATCH_RE)
+    # Bracket expressions never match a '/'.
+    return (i, '(?!/)[%s%s]' % ('^' if negated else '', ''.join(items)))
+
+
+class AttrRule(object):
+    """A line of a gitattributes file, other than a macro definition.
+
+    ATTRIBUTES
+        basename_p: True if the pattern should be matched against
+            the file's basename, False if it should be matched against
+            the file's path (relative to the gitattributes file).
+        pattern_re: A compiled regexp implementing the pattern.
+        attrs: A list of (attr_name, attr_value) tuples, where attr_value
+            is the attribute value as returned by "git check-attr"
+            (Eg: 'set', 'unset', 'unspecified', etc).
+    """
+    def __init__(self, pattern, attrs):
+        """The constructor.
+
+        PARAMETERS
+            pattern: The pattern, as found in a gitattributes file,
+                without any trailing '/'.
+            attrs: Same as the attribute.
+        """
+        self.basename_p = '/' not in pattern
+        if pattern.startswith('/'):
+            pattern = pattern[1:]
+        self.pattern_re = re.compile(wildmatch_regexp(pattern), re.DOTALL)
+        self.attrs = attrs
+
+    def matches(self, filename):
+        """Return True if this rule applies to filename, False otherwise.
+
+        PARAMETERS
+            filename: The name of a file, relative to the directory
+                where the gitattributes file containing this rule is.
+        """
+        if self.basename_p:
+            filename = os.path.basename(filename)
+        return self.pattern_re.match(filename) is not None
+
+
+class AttrFile(object):
+    """The parsed contents of a gitattributes file.
+
+    ATTRIBUTES
+        rules: A list of AttrRule objects, in the same order as in
+            the file.
+        macros: A list of (macro_name, attrs) tuples, one for each
+            macro defined in the file, in the same order as in the file.
+            See AttrRule for the description of attrs.
+    """
+    def __init__(self, contents):
+        """The constructor.
+
+        PARAMETERS
+            contents: The contents of the gitattributes file.
+        """
+        self.rules = []
+        self.macros = []
+        if contents.startswith('\xef\xbb\xbf'):
+            # Ignore the UTF-8 BOM, like git does.
+            contents = contents[3:]
+        for line in contents.split('\n'):
+            self.__parse_line(line)
+
+    def __parse_line(self, line):
+        """Parse one line of a gitattributes file.
+
+        Lines which are invalid are ignored, rather than causing
+        an error.
+
+        PARAMETERS
+            line: The line to parse.
+        """
+        line = line.lstrip(BLANKS)
+        if not line or line.startswith('#'):
+            return
+
+        if line.startswith('"'):
+            unquoted = unquote_c_style(line)
+            if unquoted is None:
+                return
+            pattern, states = unquoted
+        else:
+            m = re.match(r'([^%s]*)(.*)' % BLANKS, line, re.DOTALL)
+            pattern, states = m.groups()
+
+        attrs = []
+        for state in states.split():
+            name, equals, value = state.partition('=')
+            if name.startswith('-'):
+                name = name[1:]
+                attr_value = 'unset'
+            elif name.startswith('!'):
+                name = name[1:]
+                attr_value = 'unspecified'
+            elif equals:
+                attr_value = value
+            else:
+                attr_value = 'set'
+            if not attr_name_valid(name):
+                return
+            attrs.append((name, attr_value))
+
+        if (pattern.startswith(MACRO_PREFIX)
+                and len(pattern) > len(MACRO_PREFIX)):
+            macro_name = pattern[len(MACRO_PREFIX):]
+            if attr_name_valid(macro_name):
+                self.macros.append((macro_name, attrs))
+        elif pattern.startswith('!'):
+            # Negative patterns are not supported in gitattributes files.
+            return
+        elif pattern.endswith('/'):
+            # Patterns ending with a '/' only match directories,
+            # and thus are of no use for files.
+            return
+        else:
+            self.rules.append(AttrRule(pattern, attrs))
+
+
+def blob_sha1(contents):
+    """Return the SHA1 git would use for a blob with the given contents.
 
     PARAMETERS
-        commit_rev: Same as git.file_exists.
-        filename: Same as git.file_exists.
+        contents: The blob's contents.
+    """
+    return sha1('blob %d\x00%s' % (len(contents), contents)).hexdigest()
+
+
+def parsed_attr_file(blob_rev, contents=None):
+    """Return the AttrFile object corresponding to the given blob.
+
+    The result is cached, so that the same gitattributes file only
+    gets parsed once, regardless of how many commits it is used in.
+
+    PARAMETERS
+        blob_rev: The SHA1 of the blob containing the gitattributes file.
+        contents: The contents of the blob, or None, in which case
+            the contents are read from the repository.
     """
     # Implement the cache as an attribute of this function,
-    # where the key is a tuple (commit_rev, filename), and
-    # the value the result of the query.
-    if 'cache' not in cached_file_exists.__dict__:
+    # where the key is the blob's SHA1, and the value the
+    # corresponding AttrFile object.
+    if 'cache' not in parsed_attr_file.__dict__:
         # First time call, initialize the attribute.
-        cached_file_exists.cache = {}
+        parsed_attr_file.cache = {}
+
+    if blob_rev not in parsed_attr_file.cache:
+        if contents is None:
+            contents = get_object_contents(blob_rev)
+            if contents is None:
+                raise CalledProcessError(1, 'git cat-file blob %s' % blob_rev)
+        parsed_attr_file.cache[blob_rev] = AttrFile(contents)
+    return parsed_attr_file.cache[blob_rev]
+
+
+def tree_entries(tree_rev):
+    """Return the entries of the given tree object.
+
+    The result is cached, so that a tree which is shared by multiple
+    commits (Eg: a directory which none of the commits being pushed
+    modified) only gets read once.
+
+    PARAMETERS
+        tree_rev: The SHA1 of a tree object.
+
+    RETURN VALUE
+        A dictionary, where the key is the name of each entry in
+        the tree, and the value a tuple (mode, sha1).
+    """
+    # Implement the cache as an attribute of this function,
+    # where the key is the tree's SHA1, and the value the result
+    # of the query.
+    if 'cache' not in tree_entries.__dict__:
+        # First time call, initialize the attribute.
+        tree_entries.cache = {}
+
+    if tree_rev not in tree_entries.cache:
+        # The raw format of a tree object is a sequence of entries,
+        # each entry being "<mode> <name>\0" followed by the entry's
+        # SHA1 in binary form (20 bytes).
+        contents = get_object_contents(tree_rev)
+        if contents is None:
+            raise CalledProcessError(1, 'git cat-file tree %s' % tree_rev)
+        entries = {}
+        i = 0
+        while i < len(contents):
+            space = contents.index(' ', i)
+            nul = contents.index('\x00', space)
+            entries[contents[space + 1:nul]] = (
+                contents[i:space], contents[nul + 1:nul + 21].encode('hex'))
+            i = nul + 21
+        tree_entries.cache[tree_rev] = entries
+    return tree_entries.cache[tree_rev]
+
+
+def tree_gitattributes(tree_rev):
+    """Return the (sha1, AttrFile) of the .gitattributes file in tree_rev.
+
+    PARAMETERS
+        tree_rev: The SHA1 of a tree object.
+
+    RETURN VALUE
+        A tuple with the SHA1 of the .gitattributes file, and the
+        corresponding AttrFile object.  None if tree_rev does not
+        contain a .gitattributes file.
+    """
+    entry = tree_entries(tree_rev).get('.gitattributes')
+    if entry is None or entry[0] not in ('100644', '100755'):
+        return None
+    return (entry[1], parsed_attr_file(entry[1]))
 
-    key = (commit_rev, filename)
-    if key not in cached_file_exists.cache:
-        cached_file_exists.cache[key] = file_exists(commit_rev, filename)
-    return cached_file_exists.cache[key]
+
+def default_attributes_file():
+    """Return the (sha1, AttrFile) of DEFAULT_ATTRIBUTES_FILE.
+
+    The sha1 is the SHA1 git would use for a blob with the same
+    contents as DEFAULT_ATTRIBUTES_FILE.
+
+    Return None if DEFAULT_ATTRIBUTES_FILE does not exist.
+    """
+    if not isfile(DEFAULT_ATTRIBUTES_FILE):
+        return None
+    with open(DEFAULT_ATTRIBUTES_FILE) as f:
+        contents = f.read()
+    blob_rev = blob_sha1(contents)
+    return (blob_rev, parsed_attr_file(blob_rev, contents))
 
 
 def git_attribute(commit_rev, filename_list, attr_name):
@@ -65,121 +474,139 @@ def git_attribute(commit_rev, filename_list, attr_name):
         command would give us our answer immediately.  But in bare
         repositories, the only file read is GIT_DIR/info/attributes.
 
-        Originally, we implemented this way: Starting from the directory
-        where our file is located, find the first .gitattribute file
-        that specifies an attribute value for our file.  Unfortunately,
-        reading the gitattributes(5) man page more careful, we realized
-        that this does not implement gitattributes semantics properly
-        (we don't stop once we found a .gitattributes file with an entry
-        that matches). Also, this approach turned out to be extremely
-        slow, and could cause some updates to take minutes to process
-        for commits where 2-3 thousand files were modified (typical
-        when updating the copyright year, for instance).
-
-        So, instead of trying to re-implement the git-check-attr
-        command ourselves, what we do now, is create a dummy git
-        repository inside which we (lazily) reproduce the directory
-        tree, with their .gitattributes file. And then, from there
-        call `git check-attr'. And, to help with the performance
-        aspect, we call it only once requesting the attribute value
-        for all files all in one go.
+        We used to work around this by creating a dummy git repository
+        inside which we reproduced the directory tree, with their
+        .gitattributes file, and then call `git check-attr' from
+        there.  But this turned out to be fairly costly, and this
+        function is called for every commit being style-checked.
+
+        So, instead, we now implement the gitattributes(5) semantics
+        ourselves, reading the .gitattributes files directly from
+        the commit's tree.  Each .gitattributes file is only parsed
+        once, regardless of the number of commits using it.
+
+        We also provide support for a DEFAULT_ATTRIBUTES_FILE, where
+        the semantics is that, if none of the .gitattributes file
+        have an entry matching our file, then this file is consulted.
+        In other words, it acts as a .gitattributes file placed
+        at the root of the repository, but with a lower priority
+        than the repository's own root .gitattributes file.
     """
-    # Verify that we have a scratch area we can use for create the fake
-    # git repository (see REMARKS section above).
-    assert utils.scratch_dir is not None
-
-    # A copy of the environment, but without the GIT_DIR environment
-    # variable (which gets sets when called by git), pointing to
-    # the repository to which changes are being pushed.  This interferes
-    # with most git commands when we're trying to work with our fake
-    # repository. So we use this copy of the environment without
-    # the GIT_DIR environment variable when needed.
-    tmp_git_dir_env = dict(os.environ)
-    tmp_git_dir_env.pop('GIT_DIR', None)
-
-    tmp_git_dir = mkdtemp('.git', 'check-attr-', utils.scratch_dir)
-    git.init(_cwd=tmp_git_dir, _env=tmp_git_dir_env)
-
-    # There is one extra complication: We want to also provide support
-    # for a DEFAULT_ATTRIBUTES_FILE, where the semantics is that,
-    # if none of the .gitattributes file have an entry matching
-    # our file, then this file is consulted. Once again, to avoid
-    # calling `git check-attr' multiple times, what we do instead
-    # is that we create a the directory tree in a root which is in
-    # a subdir of tmp_git_dir. That way, we can put the default
-    # attribute file in the root of tmp_git_dir, and git-check-attr
-    # will only look at it if checked-in .gitattributes don't define
-    # the attribute of a given file, thus implementing the "default"
-    # behavior.
+    # The list of (sha1, attr_file) tuples for the attribute files
+    # applying at the root of the repository, in increasing order
+    # of priority.
+    builtin_rev = blob_sha1(BUILTIN_ATTRIBUTES)
+    root_tree = commit_tree(commit_rev)
+    root_gitattributes = [(builtin_rev,
+                           parsed_attr_file(builtin_rev, BUILTIN_ATTRIBUTES)),
+                          default_attributes_file(),
+                          tree_gitattributes(root_tree)]
+    root_gitattributes = [gitattributes for gitattributes in root_gitattributes
+                          if gitattributes is not None]
+    root_attr_files = [attr_file for (_, attr_file) in root_gitattributes]
+
+    # Macros can only be defined at the root level. When a macro
+    # is defined multiple times, the last definition wins.
+    macros = {}
+    for attr_file in root_attr_files:
+        for (macro_name, attrs) in attr_file.macros:
+            macros[macro_name] = attrs
+
+    # The attribute value of a file only depends on the .gitattributes
+    # files found in the directories leading to that file.  So, to
+    # avoid computing the same values again and again when checking
+    # multiple commits, we cache the results in git_attribute.cache,
+    # using a key made of the file name, the attribute name, and
+    # the SHA1 of each of these .gitattributes files.
     #
-    # This requires a bit of manipulation, because now, in the fake
-    # git repository, the files we want to check are conceptually
-    # inside the subdir.  So filenames passed to `git check-attr'
-    # have to contain that subdir, and the that subdir needs to be
-    # excised from the command's output.
-
-    if isfile(DEFAULT_ATTRIBUTES_FILE):
-        copy(DEFAULT_ATTRIBUTES_FILE,
-             os.path.join(tmp_git_dir, ".gitattributes"))
-    checkout_subdir = 'src'
-    tmp_checkout_dir = os.path.join(tmp_git_dir, checkout_subdir)
-
-    dirs_with_changes = {}
+    # To find these .gitattributes files, we walk the trees leading
+    # to each file.  Since trees are cached by SHA1 (see tree_entries),
+    # the directories which did not change from one commit to the next
+    # do not need to be read again.
+    if 'cache' not in git_attribute.__dict__:
+        # First time call, initialize the attribute.
+        git_attribute.cache = {}
+        git_attribute.nb_hits = 0
+        git_attribute.nb_lookups = 0
+
+    result = {}
     for filename in filename_list:
         assert not os.path.isabs(filename)
-        dir_path = filename
-        dir_created = False
-        while dir_path:
-            dir_path = os.path.dirname(dir_path)
-            if dir_path in dirs_with_changes:
-                continue
-            gitattributes_rel_file = os.path.join(dir_path, '.gitattributes')
-            if cached_file_exists(commit_rev, gitattributes_rel_file):
-                if not dir_created:
-                    os.makedirs(os.path.join(tmp_checkout_dir, dir_path))
-                    dir_created = True
-                git.show("%s:%s" % (commit_rev, gitattributes_rel_file),
-                         _outfile=os.path.join(tmp_checkout_dir,
-                                               gitattributes_rel_file))
-            dirs_with_changes[dir_path] = True
-
-    # To avoid having to deal with the parsing of quoted filenames,
-    # we use the -z option of "git check-attr". What this does is
-    # that each of the 3 elements of each line is now separated by
-    # a NUL character. Also, each line now ends with a NUL character
-    # as well, instead of LF.
-    #
-    # To parse the output, we split it at each NUL character.
-    # This means that the output gets split into a sequence of
-    # lines which go 3 by 3, with the first line containing
-    # the filename, the second being the name of the attribute
-    # being queried, and the third being the attribute's value
-    # for that file.
-    check_attr_input = '\x00'.join(['%s/%s' % (checkout_subdir, filename)
-                                    for filename in filename_list])
-    attr_info = git.check_attr('-z', '--stdin', attr_name,
-                               _cwd=tmp_git_dir, _env=tmp_git_dir_env,
-                               _input=check_attr_input).split('\x00')
-    if len(attr_info) % 3 == 1 and not attr_info[-1]:
-        # The attribute information for each filename ends with
-        # a NUL character, so the terminating NUL character in
-        # the last entry caused the split to add one empty element
-        # at the end. This is expected, so just remove it.
-        attr_info.pop()
-
-    # As per the above, we should now have a number of lines that's
-    # a multiple of 3.
-    assert len(attr_info) % 3 == 0
 
-    result = {}
-    while attr_info:
-        filename = attr_info.pop(0)
-        attr_info.pop(0)  # Ignore the attribute name...
-        attr_val = attr_info.pop(0)
+        # The list of (dir_path, attr_file) tuples to consult
+        # for our file, in decreasing order of priority.
+        attr_stack = []
+        # The SHA1s of the .gitattributes files in attr_stack
+        # (part of the cache key).
+        attr_shas = [('', blob_rev) for (blob_rev, _) in root_gitattributes]
+        tree = root_tree
+        path_elements = filename.split('/')[:-1]
+        for i in xrange(len(path_elements)):
+            entry = tree_entries(tree).get(path_elements[i])
+            if entry is None or entry[0] != '40000':
+                # This directory does not exist in this commit.
+                break
+            tree = entry[1]
+            gitattributes = tree_gitattributes(tree)
+            if gitattributes is not None:
+                dir_path = '/'.join(path_elements[:i + 1])
+                attr_stack.insert(0, (dir_path, gitattributes[1]))
+                attr_shas.append((dir_path, gitattributes[0]))
+        attr_stack.extend([('', attr_file)
+                           for attr_file in reversed(root_attr_files)])
 
-        assert filename.startswith(checkout_subdir + '/')
-        filename = filename[len(checkout_subdir) + 1:]
+        key = (filename, attr_name, tuple(attr_shas))
+        git_attribute.nb_lookups += 1
+        if key in git_attribute.cache:
+            git_attribute.nb_hits += 1
+        else:
+            git_attribute.cache[key] = attr_value(filename, attr_name,
+                                                  attr_stack, macros)
+        result[filename] = git_attribute.cache[key]
 
-        result[filename] = attr_val
+    debug('git_attribute cache: %d hits out of %d lookups (%d trees read)'
+          % (git_attribute.nb_hits, git_attribute.nb_lookups,
+             len(tree_entries.cache)),
+          level=3)
 
     return result
+
+
+def attr_value(filename, attr_name, attr_stack, macros):
+    """Return filename's attribute value, given a stack of attribute files.
+
+    PARAMETERS
+        filename: The name of the file, relative to the root of
+            the repository.
+        attr_name: The name of the attribute.
+        attr_stack: A list of (dir_path, attr_file) tuples, in decreasing
+            order of priority, where attr_file is an AttrFile object, and
+            dir_path the directory (relative to the root of the
+            repository) where that attr_file is.
+        macros: A dictionary of the macro attributes, where the key
+            is the macro's name, and the value its list of attributes.
+
+    RETURN VALUE
+        Same as each value in the dictionary returned by git_attribute.
+    """
+    # Same as git, we go through the rules from the highest priority
+    # to the lowest, and the first rule to give a value to an attribute
+    # wins.
+    values = {}
+
+    def apply_attrs(attrs):
+        for (name, value) in reversed(attrs):
+            if name not in values:
+                values[name] = value
+                if value == 'set' and name in macros:
+                    apply_attrs(macros[name])
+
+    for (dir_path, attr_file) in attr_stack:
+        rel_filename = filename[len(dir_path) + 1:] if dir_path else filename
+        for rule in reversed(attr_file.rules):
+            if rule.matches(rel_filename):
+                apply_attrs(rule.attrs)
+                if attr_name in values:
+                    return values[attr_name]
+
+    return 'unspecified'
@@ -0,0 +1,170 @@
+"""A thin client forwarding a hook invocation to the hooks server.
+
+Usage: hooks_client.py <hook_name> [<arg>...]
+
+If the GIT_HOOKS_SERVER_SOCKET environment variable is set, this script
+forwards its arguments, standard input, environment and current working
+directory to the hooks server listening on that socket (see hooks_server),
+relays the output of the hook back on stderr, and exits with the hook's
+exit status.
+
+If the server cannot be reached (or refuses the request), it falls back
+to running the hook's script directly, as if the server did not exist.
+
+This script is meant to be started as quickly as possible (Eg: using
+"python -S"), so it should only import the modules it strictly needs.
+"""
+
+import os
+import socket
+import sys
+
+# A map of the names of the hooks that the server handles, with
+# the name of the associated script.
+HOOK_SCRIPTS = {
+    'post-receive': 'post_receive.py',
+    'pre-receive': 'pre_receive.py',
+    'update': 'update.py',
+}
+
+# The tags identifying the various types of messages sent by the server
+# to the client: the server's answer to our connection request (either
+# ACCEPTED or REFUSED), some output from the hook, and the hook's exit
+# status.
+ACCEPTED = 'a'
+REFUSED = 'r'
+OUTPUT = 'o'
+EXIT_STATUS = 'x'
+
+
+def write_netstring(f, data):
+    """Write data to the file object f, as a netstring.
+
+    PARAMETERS
+        f: A file object.
+        data: A string.
+    """
+    f.write('%d:%s,' % (len(data), data))
+
+
+def read_netstring(f):
+    """Read a netstring from the file object f, and return its data.
+
+    Return None if we reached the end of file before reading anything.
+    Raise IOError if the netstring is malformed or truncated.
+
+    PARAMETERS
+        f: A file object.
+    """
+    length = ''
+    while True:
+        c = f.read(1)
+        if not c:
+            if not length:
+                return None
+            raise IOError('truncated netstring')
+        if c == ':':
+            break
+        if not c.isdigit() or len(length) > 12:
+            raise IOError('invalid netstring length')
+        length += c
+    data = f.read(int(length))
+    if len(data) != int(length) or f.read(1) != ',':
+        raise IOError('truncated netstring')
+    return data
+
+
+def run_hook_directly(hook_name, args):
+    """Replace the current process by the hook's script.
+
+    PARAMETERS
+        hook_name: The name of the hook (a key of HOOK_SCRIPTS).
+        args: The hook's command-line arguments.
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          HOOK_SCRIPTS[hook_name])
+    os.execvp('python', ['python', script] + args)
+
+
+def connect(socket_name):
+    """Connect to the hooks server, and return the associated file object.
+
+    Return None if the server could not be reached, or refused
+    our connection.
+
+    PARAMETERS
+        socket_name: The name of the server's Unix socket.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_name)
+        server = sock.makefile('r+b')
+        answer = read_netstring(server)
+    except (IOError, socket.error):
+        return None
+    finally:
+        sock.close()
+    if answer != ACCEPTED:
+        server.close()
+        return None
+    return server
+
+
+def run_hook(hook_name, args):
+    """Run the given hook through the hooks server, and return its status.
+
+    Return None if the server could not run the hook, in which case
+    the hook has not been run at all.
+
+    PARAMETERS
+        hook_name: The name of the hook (a key of HOOK_SCRIPTS).
+        args: The hook's command-line arguments.
+    """
+    socket_name = os.environ.get('GIT_HOOKS_SERVER_SOCKET')
+    if not socket_name:
+        return None
+    server = connect(socket_name)
+    if server is None:
+        return None
+
+    try:
+        write_netstring(server, hook_name)
+        write_netstring(server, os.getcwd())
+        write_netstring(server, str(len(args)))
+        for arg in args:
+            write_netstring(server, arg)
+        write_netstring(server, str(len(os.environ)))
+        for (name, value) in os.environ.items():
+            write_netstring(server, '%s=%s' % (name, value))
+        write_netstring(server, sys.stdin.read())
+        server.flush()
+
+        while True:
+            message = read_netstring(server)
+            if message is None:
+                raise IOError('connection closed by the hooks server')
+            if message[:1] == OUTPUT:
+                sys.stderr.write(message[1:])
+                sys.stderr.flush()
+            elif message[:1] == EXIT_STATUS:
+                return int(message[1:])
+            else:
+                raise IOError('unexpected message from the hooks server')
+    except (IOError, socket.error, ValueError), E:
+        # At this point, the hook might have been run, at least
+        # partially, so we cannot fall back to running it directly.
+        sys.stderr.write('*** hooks server error: %s\n' % E)
+        return 1
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in HOOK_SCRIPTS:
+        sys.stderr.write('Usage: %s {%s} [ARG...]\n'
+                         % (sys.argv[0], '|'.join(sorted(HOOK_SCRIPTS))))
+        sys.exit(2)
+    status = run_hook(sys.argv[1], sys.argv[2:])
+    if status is None:
+        run_hook_directly(sys.argv[1], sys.argv[2:])
+    sys.exit(status)
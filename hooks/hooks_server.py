@@ -0,0 +1,281 @@
+"""A long-lived server running the hooks on behalf of hooks_client.
+
+Usage: hooks_server.py [--max-workers N] SOCKET
+
+Each push normally requires starting several Python processes (one
+for each hook being run), each of them having to import the hooks'
+modules before doing anything useful.  This server imports all these
+modules once, and then waits for hooks_client to connect to its Unix
+socket and to forward the hook invocations to it.
+
+Each request is handled by a child process forked from the server,
+which therefore starts with all the modules already imported, while
+still starting from a clean state (the hooks rely on many global
+variables and caches which are only valid for the duration of one
+push, and for one repository).
+
+If the server runs as root, each child process switches to the user
+who connected to the server before running the hook.  Otherwise,
+the server refuses the connections from any other user, in which
+case hooks_client falls back to running the hook directly.
+"""
+
+from argparse import ArgumentParser
+import errno
+import os
+import pwd
+import runpy
+import socket
+import struct
+import sys
+import tempfile
+import traceback
+
+from hooks_client import (HOOK_SCRIPTS, ACCEPTED, REFUSED, OUTPUT,
+                          EXIT_STATUS, read_netstring, write_netstring)
+
+# Import the modules implementing the hooks, so that they are already
+# loaded when we fork the processes running the hooks.  This includes
+# the modules that the hooks only import when they need them.
+import post_receive
+import pre_receive
+import update
+import argparse
+import email.header
+import email.mime.text
+import email.utils
+import pre_commit_checks
+from updates.factory import REF_CHANGE_MAP, update_class
+for class_id in REF_CHANGE_MAP.values():
+    if class_id is not None:
+        update_class(class_id)
+
+# The size of the chunks of output sent to the client.
+OUTPUT_CHUNK_SIZE = 64 * 1024
+
+# The SO_PEERCRED socket option, which is not always provided by
+# the socket module.
+SO_PEERCRED = getattr(socket, 'SO_PEERCRED', 17)
+
+
+def peer_uid(conn):
+    """Return the user ID of the process at the other end of conn.
+
+    PARAMETERS
+        conn: A connected Unix socket.
+    """
+    creds = conn.getsockopt(socket.SOL_SOCKET, SO_PEERCRED,
+                            struct.calcsize('3i'))
+    (pid, uid, gid) = struct.unpack('3i', creds)
+    return uid
+
+
+def read_request(client):
+    """Read a request from the client, and return it.
+
+    PARAMETERS
+        client: A file object connected to the client.
+
+    RETURN VALUE
+        A tuple with the following elements: The name of the hook,
+        the directory where to run it, its command-line arguments,
+        its environment (a dictionary), and its standard input.
+    """
+    def read():
+        data = read_netstring(client)
+        if data is None:
+            raise IOError('connection closed by the client')
+        return data
+
+    hook_name = read()
+    if hook_name not in HOOK_SCRIPTS:
+        raise IOError('unsupported hook: %s' % hook_name)
+    cwd = read()
+    args = [read() for _ in range(int(read()))]
+    env = dict(read().split('=', 1) for _ in range(int(read())))
+    stdin = read()
+    return (hook_name, cwd, args, env, stdin)
+
+
+def switch_user(uid):
+    """Switch to the given user, if not already running as that user.
+
+    PARAMETERS
+        uid: A user ID.
+    """
+    if os.getuid() == uid:
+        return
+    pw = pwd.getpwuid(uid)
+    os.initgroups(pw.pw_name, pw.pw_gid)
+    os.setgid(pw.pw_gid)
+    os.setuid(uid)
+
+
+def run_hook(hook_name, cwd, args, env, stdin, output_fd):
+    """Run the given hook, in the current process, and return its status.
+
+    PARAMETERS
+        hook_name: The name of the hook (a key of HOOK_SCRIPTS).
+        cwd: The directory where to run the hook.
+        args: The hook's command-line arguments.
+        env: A dictionary with the hook's environment.
+        stdin: The hook's standard input.
+        output_fd: A file descriptor where to redirect the hook's
+            stdout and stderr.
+    """
+    os.environ.clear()
+    os.environ.update(env)
+    os.chdir(cwd)
+    # Force the tempfile module to recompute the location of
+    # the temporary directory using the new environment.
+    tempfile.tempdir = None
+
+    stdin_file = tempfile.TemporaryFile()
+    stdin_file.write(stdin)
+    stdin_file.seek(0)
+    os.dup2(stdin_file.fileno(), 0)
+    stdin_file.close()
+    os.dup2(output_fd, 1)
+    os.dup2(output_fd, 2)
+    os.close(output_fd)
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          HOOK_SCRIPTS[hook_name])
+    sys.argv = [script] + args
+    status = 0
+    try:
+        runpy.run_path(script, run_name='__main__')
+    except SystemExit, E:
+        if E.code is None:
+            status = 0
+        elif isinstance(E.code, int):
+            status = E.code
+        else:
+            print >> sys.stderr, E.code
+            status = 1
+    except Exception:
+        traceback.print_exc()
+        status = 1
+    sys.stdout.flush()
+    sys.stderr.flush()
+    return status
+
+
+def handle_connection(conn):
+    """Handle one connection from a client.
+
+    This function runs in a child process of the server.
+
+    PARAMETERS
+        conn: The socket connected to the client.
+    """
+    client = conn.makefile('r+b')
+    uid = peer_uid(conn)
+    if os.getuid() not in (0, uid):
+        write_netstring(client, REFUSED)
+        client.flush()
+        return
+    write_netstring(client, ACCEPTED)
+    client.flush()
+
+    request = read_request(client)
+
+    # Run the hook in its own process, with its output redirected
+    # to a pipe, so that we can relay it to the client, followed by
+    # the hook's exit status.
+    (output_r, output_w) = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            os.close(output_r)
+            conn.close()
+            client.close()
+            switch_user(uid)
+            status = run_hook(*request, output_fd=output_w)
+        finally:
+            os._exit(status)
+
+    os.close(output_w)
+    while True:
+        data = os.read(output_r, OUTPUT_CHUNK_SIZE)
+        if not data:
+            break
+        write_netstring(client, OUTPUT + data)
+        client.flush()
+    os.close(output_r)
+    (_, status) = os.waitpid(pid, 0)
+    if os.WIFSIGNALED(status):
+        status = 128 + os.WTERMSIG(status)
+    else:
+        status = os.WEXITSTATUS(status)
+    write_netstring(client, EXIT_STATUS + str(status))
+    client.flush()
+    print >> sys.stderr, ('hooks_server: %s (%s, uid=%d) -> %d'
+                          % (request[0], request[1], uid, status))
+
+
+def serve(socket_name, max_workers):
+    """Accept and handle the connections on the given socket, forever.
+
+    PARAMETERS
+        socket_name: The name of the Unix socket to listen on.
+        max_workers: The maximum number of connections handled
+            concurrently.
+    """
+    if os.path.exists(socket_name):
+        os.unlink(socket_name)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_name)
+    # Any user should be allowed to connect (see handle_connection).
+    os.chmod(socket_name, 0777)
+    server.listen(max_workers)
+
+    workers = set()
+    while True:
+        # Reap the workers which have terminated, and wait for one
+        # of them to terminate if we already have too many.
+        while workers:
+            (pid, _) = os.waitpid(-1, 0 if len(workers) >= max_workers
+                                  else os.WNOHANG)
+            if pid == 0:
+                break
+            workers.discard(pid)
+
+        try:
+            (conn, _) = server.accept()
+        except socket.error, E:
+            if E.errno == errno.EINTR:
+                continue
+            raise
+
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                server.close()
+                handle_connection(conn)
+                status = 0
+            except Exception:
+                traceback.print_exc()
+            finally:
+                os._exit(status)
+        conn.close()
+        workers.add(pid)
+
+
+def parse_command_line():
+    """Return a namespace built after parsing the command line.
+    """
+    ap = ArgumentParser(description='Git hooks server.')
+    ap.add_argument('--max-workers', type=int, default=8,
+                    help=('the maximum number of hooks run concurrently'
+                          ' (default: %(default)s)'))
+    ap.add_argument('socket',
+                    help='the name of the Unix socket to listen on')
+    return ap.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_command_line()
+    serve(args.socket, max(args.max_workers, 1))
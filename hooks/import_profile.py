@@ -0,0 +1,93 @@
+"""Report the time spent importing each module (GIT_HOOKS_IMPORT_PROFILE).
+
+When the GIT_HOOKS_IMPORT_PROFILE environment variable is set, importing
+this module installs an import hook which measures the time it takes
+to load each module, and prints a report on stderr when the program
+exits.
+
+For this to be useful, this module should be imported first, before
+any other module, by the scripts implementing the hooks.  It should
+also import as few modules as possible itself.
+"""
+
+import __builtin__
+import atexit
+import os
+import sys
+import time
+
+# The name of the environment variable enabling the import profiling.
+IMPORT_PROFILE_ENV_VAR = 'GIT_HOOKS_IMPORT_PROFILE'
+
+
+class ImportProfiler(object):
+    """An import hook measuring the time spent importing each module.
+
+    ATTRIBUTES
+        records: A list of (module_name, depth, cumulative_time,
+            self_time) tuples, one for each module loaded, in the order
+            in which the modules started loading.  The depth is the
+            number of imports in progress when the module started
+            loading (0 for the modules imported by the main program).
+            The times are in seconds.
+    """
+    def __init__(self):
+        """The constructor."""
+        self.records = []
+        # The time spent importing the modules loaded while importing
+        # each module currently being imported (a stack of floats).
+        self.__children_time = []
+        self.__original_import = __builtin__.__import__
+
+    def install(self):
+        """Start measuring the imports, and print a report at exit."""
+        __builtin__.__import__ = self.__import
+        atexit.register(self.report)
+
+    def __import(self, name, globals=None, locals=None, fromlist=None,
+                 level=-1):
+        """Replaces __builtin__.__import__."""
+        if name in sys.modules:
+            # Fast path: Nothing to load (nor to measure).
+            return self.__original_import(name, globals, locals, fromlist,
+                                          level)
+
+        modules_before = set(sys.modules)
+        depth = len(self.__children_time)
+        index = len(self.records)
+        self.records.append(None)  # Placeholder, to preserve the order.
+        self.__children_time.append(0.0)
+        start = time.time()
+        try:
+            return self.__original_import(name, globals, locals, fromlist,
+                                          level)
+        finally:
+            elapsed = time.time() - start
+            children_time = self.__children_time.pop()
+            if self.__children_time:
+                self.__children_time[-1] += elapsed
+            # Only record the imports which actually loaded a module.
+            # Implicit relative imports, for instance, add None entries
+            # in sys.modules for the relative names that failed.
+            if any(sys.modules[module_name] is not None
+                   for module_name in set(sys.modules) - modules_before):
+                self.records[index] = (name, depth, elapsed,
+                                       elapsed - children_time)
+
+    def report(self):
+        """Print the import profile on stderr."""
+        records = [record for record in self.records if record is not None]
+        total = sum(record[2] for record in records if record[1] == 0)
+        print >> sys.stderr, 'import profile (%s):' % IMPORT_PROFILE_ENV_VAR
+        print >> sys.stderr, '  cumulative       self  module'
+        for (name, depth, cumulative_time, self_time) in records:
+            print >> sys.stderr, ('  %7.1f ms %7.1f ms  %s%s'
+                                  % (cumulative_time * 1000,
+                                     self_time * 1000,
+                                     '  ' * depth, name))
+        print >> sys.stderr, ('  total: %.1f ms (%d modules)'
+                              % (total * 1000, len(records)))
+
+
+if os.environ.get(IMPORT_PROFILE_ENV_VAR):
+    ImportProfiler().install()
@@ -5,17 +5,19 @@ that is updated, stdin contains one line with 3 space-separated
 tokens: the old SHA1, the new SHA1, and the reference name (Eg:
 refs/heads/master).
 """
-from argparse import ArgumentParser
+# This module must be imported first (see import_profile).
+import import_profile
 from collections import OrderedDict
 from subprocess import Popen, PIPE, STDOUT
 import sys
 
 from config import git_config
 from daemon import run_in_daemon
-from git import git_show_ref
+from git import commit_store, git_show_ref
+from updates.email_spool import EmailSpool
 from updates.emails import EmailQueue
 from updates.factory import new_update
-from utils import (debug, warn)
+from utils import (debug, warn, ArgsNamespace)
 
 
 def post_receive_one(ref_name, old_rev, new_rev, refs, submitter_email):
@@ -63,12 +65,20 @@ def post_receive(updated_refs, submitter_email):
         (old_rev, new_rev) = updated_refs[ref_name]
         post_receive_one(ref_name, old_rev, new_rev, refs,
                          submitter_email)
-
-    # Flush the email queue.  Since this involves creating a daemon,
-    # only do so if there is at least one email to be sent.
-    email_queue = EmailQueue()
-    if email_queue.queue:
-        run_in_daemon(email_queue.flush)
+        # Do not let the commit store grow with the commits
+        # of every update.
+        commit_store.clear()
+
+    # Flush the email queue into the spool, and then deliver
+    # the spooled emails from a daemon, so as not to keep the user
+    # waiting.  This also delivers any email left in the spool
+    # by a previous delivery which did not complete.  Since this
+    # involves creating a daemon, only do so if there is at least
+    # one email to be sent.
+    EmailQueue().flush()
+    email_spool = EmailSpool()
+    if email_spool.pending():
+        run_in_daemon(email_spool.deliver)
 
 
 def maybe_post_receive_hook(post_receive_data):
@@ -93,6 +103,13 @@ def parse_command_line(args):
     PARAMETERS
         args: A sequence of arguments to be used as the command-line.
     """
+    # In the usual case, there are no options, just the 3 arguments
+    # taken from stdin, so handle that case by hand, rather than paying
+    # for the cost of loading the argparse module.
+    if len(args) == 3 and not any(arg.startswith('-') for arg in args):
+        return ArgsNamespace(submitter_email=None, old_rev=args[0],
+                             new_rev=args[1], ref_name=args[2])
+
     # The command-line interface is very simple, so we could possibly
     # handle it by hand.  But it's nice to have features such as
     # -h/--help switches which come for free if we use argparse.
@@ -100,6 +117,7 @@ def parse_command_line(args):
     # We use ArgumentParser, which means that we are requiring
     # Python version 2.7 or later, because it handles mandatory
     # command-line arguments for us as well.
+    from argparse import ArgumentParser
     ap = ArgumentParser(description='Git "update" hook.')
     ap.add_argument('--submitter-email',
                     help=('Use this email address instead as the sender'
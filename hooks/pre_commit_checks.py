@@ -1,12 +1,19 @@
+from multiprocessing.pool import ThreadPool
 import os
 from pipes import quote
 import re
+from shutil import rmtree
 from subprocess import Popen, PIPE, STDOUT
+from tempfile import mkdtemp
+import threading
 
 from config import git_config
 from errors import InvalidUpdate
-from git import git, diff_tree, file_exists
+from git import (git, commit_changes, commit_tree, file_exists,
+                 get_object_contents, get_raw_revlog, prefetch_commit_changes)
+from filename_index_cache import FilenameIndexCache
 from git_attrs import git_attribute
+from style_check_cache import StyleCheckCache, checker_identity
 import utils
 from utils import debug, warn
 
@@ -22,6 +29,166 @@ yet?
 """
 
 
+class StyleCheckJob(object):
+    """A run of the style checker over a set of files from a given commit.
+
+    Creating a StyleCheckJob object performs all the preparatory work
+    (retrieving the files to be checked into the job's scratch directory,
+    etc), which requires access to the repository.  Running the style
+    checker itself (see the "run" method) does not, and can therefore
+    be performed in parallel with other jobs.
+
+    ATTRIBUTES
+        filename_list: The list of files to be checked.
+        commit_rev: The associated commit sha1.
+        scratch_dir: The directory where the files get checked.
+        checker_cmd: The command to use to call the style checker
+            (a list).  None if the files do not need to be checked.
+        returncode: The style checker's exit status (None if not run).
+        out: The style checker's output (None if not run).
+        error: An InvalidUpdate exception if the style checker could
+            not be run, None otherwise.
+    """
+    def __init__(self, filename_list, commit_rev, project_name, scratch_dir):
+        """The constructor.
+
+        Raise InvalidUpdate if the style checker config file is missing.
+
+        PARAMETERS
+            filename_list: Same as the attribute.
+            commit_rev: Same as the attribute.  This piece of information
+                helps us find the correct version of the files to be
+                checked.
+            project_name: The name of the project (same as the attribute
+                in updates.emails.EmailInfo).
+            scratch_dir: Same as the attribute.
+        """
+        debug("style_check_files (commit_rev=%s):\n%s"
+              % (commit_rev,
+                 '\n'.join([" - `%s'" % fname for fname in filename_list])),
+              level=3)
+
+        self.commit_rev = commit_rev
+        self.scratch_dir = scratch_dir
+        self.checker_cmd = None
+        self.returncode = None
+        self.out = None
+        self.error = None
+
+        config_file = git_config('hooks.style-checker-config-file')
+
+        # Auxilary list of files we need to fetch from the same reference
+        # for purposes other than checking their contents.
+        aux_files = []
+        if config_file is not None and config_file not in filename_list:
+            if not file_exists(commit_rev, config_file):
+                info = (STYLE_CHECKER_CONFIG_FILE_MISSING_ERR_MSG
+                        % {'config_filename': config_file,
+                           'commit_rev': commit_rev}).splitlines()
+                raise InvalidUpdate(*info)
+            aux_files.append(config_file)
+
+        # For testing purposes, provide a back-door allowing the user
+        # to override the style-checking program to be used.  That way,
+        # the testsuite has a way to control what the program returns,
+        # and easily test all execution paths without having to maintain
+        # some sources specifically designed to trigger the various
+        # error conditions.
+        if 'GIT_HOOKS_STYLE_CHECKER' in os.environ:
+            style_checker = os.environ['GIT_HOOKS_STYLE_CHECKER']
+        else:
+            style_checker = git_config('hooks.style-checker')
+
+        # Skip the files which are already known to pass the style checks.
+        self.cache = StyleCheckCache(checker_identity(style_checker),
+                                     config_file, project_name)
+        self.filename_list = self.cache.uncached_files(commit_rev,
+                                                       filename_list)
+        if not self.filename_list:
+            debug('style_check_files: all files found in style-check cache',
+                  level=3)
+            return
+
+        # Get a copy of all the files and save them in our scratch dir.
+        # In order to allow us to call the style-checker using
+        # the full path (from the project's root directory) of
+        # the files being checked, we re-create the path to those
+        # filenames, and then copy the files at the same path.
+        #
+        # Providing the path as part of the filename argument is useful,
+        # because it allows the messages printed by the style-checker
+        # to be unambiguous in the situation where the same project
+        # has multiple files sharing the same name. More generally,
+        # it can also be useful to quickly locate a file in the project
+        # when trying to make the needed corrections outlined by the
+        # style-checker.
+        for filename in self.filename_list + aux_files:
+            path_to_filename = "%s/%s" % (scratch_dir,
+                                          os.path.dirname(filename))
+            if not os.path.exists(path_to_filename):
+                os.makedirs(path_to_filename)
+            contents = get_object_contents("%s:%s" % (commit_rev, filename))
+            if contents is None:
+                raise InvalidUpdate(
+                    "Error: Unable to read file %s in commit %s"
+                    % (filename, commit_rev))
+            with open("%s/%s" % (scratch_dir, filename), 'w') as f:
+                f.write(contents)
+
+        self.checker_cmd = [style_checker]
+        if config_file is not None:
+            self.checker_cmd.extend(['--config', config_file])
+        self.checker_cmd.append(project_name)
+
+    def run(self):
+        """Call the style checker, and record its results.
+
+        This method does not access the repository, nor does it print
+        anything, so it can be called from any thread.
+        """
+        if self.checker_cmd is None:
+            return
+
+        try:
+            p = Popen(self.checker_cmd, stdin=PIPE, stdout=PIPE,
+                      stderr=STDOUT, cwd=self.scratch_dir)
+        except OSError as E:
+            info = (['failed to execute style checker (commit %s):'
+                     % self.commit_rev,
+                     '$ %s' % ' '.join([quote(arg)
+                                        for arg in self.checker_cmd])] +
+                    str(E).splitlines())
+            self.error = InvalidUpdate(*info)
+            return
+
+        self.out, _ = p.communicate('\n'.join(self.filename_list))
+        self.returncode = p.returncode
+
+    def report(self):
+        """Report the results of the style checker.
+
+        Raise InvalidUpdate if one or more style violations were detected.
+        """
+        if self.error is not None:
+            raise self.error
+        if self.checker_cmd is None:
+            return
+
+        if self.returncode != 0:
+            info = (["pre-commit check failed for commit: %s"
+                     % self.commit_rev] + self.out.splitlines())
+            raise InvalidUpdate(*info)
+
+        # If we reach this point, it means that the style-checker returned
+        # zero (success). Print any output, it might be a non-fatal warning.
+        if self.out:
+            warn(*self.out.splitlines())
+        else:
+            # Only cache the files which produced no output at all, so that
+            # any non-fatal warning keeps being printed at every push.
+            self.cache.add(self.commit_rev, self.filename_list)
+
+
 def style_check_files(filename_list, commit_rev, project_name):
     """Check a file for style violations if appropriate.
 
@@ -36,83 +203,10 @@ def style_check_files(filename_list, commit_rev, project_name):
         project_name: The name of the project (same as the attribute
             in updates.emails.EmailInfo).
     """
-    debug("style_check_files (commit_rev=%s):\n%s"
-          % (commit_rev,
-             '\n'.join([" - `%s'" % fname for fname in filename_list])),
-          level=3)
-
-    config_file = git_config('hooks.style-checker-config-file')
-
-    # Auxilary list of files we need to fetch from the same reference
-    # for purposes other than checking their contents.
-    aux_files = []
-    if config_file is not None and config_file not in filename_list:
-        if not file_exists(commit_rev, config_file):
-            info = (STYLE_CHECKER_CONFIG_FILE_MISSING_ERR_MSG
-                    % {'config_filename': config_file,
-                       'commit_rev': commit_rev}).splitlines()
-            raise InvalidUpdate(*info)
-        aux_files.append(config_file)
-
-    # Get a copy of all the files and save them in our scratch dir.
-    # In order to allow us to call the style-checker using
-    # the full path (from the project's root directory) of
-    # the files being checked, we re-create the path to those
-    # filenames, and then copy the files at the same path.
-    #
-    # Providing the path as part of the filename argument is useful,
-    # because it allows the messages printed by the style-checker
-    # to be unambiguous in the situation where the same project
-    # has multiple files sharing the same name. More generally,
-    # it can also be useful to quickly locate a file in the project
-    # when trying to make the needed corrections outlined by the
-    # style-checker.
-    for filename in filename_list + aux_files:
-        path_to_filename = "%s/%s" % (utils.scratch_dir,
-                                      os.path.dirname(filename))
-        if not os.path.exists(path_to_filename):
-            os.makedirs(path_to_filename)
-        git.show("%s:%s" % (commit_rev, filename),
-                 _outfile="%s/%s" % (utils.scratch_dir, filename))
-
-    # Call the style-checker.
-
-    # For testing purposes, provide a back-door allowing the user
-    # to override the style-checking program to be used.  That way,
-    # the testsuite has a way to control what the program returns,
-    # and easily test all execution paths without having to maintain
-    # some sources specifically designed to trigger the various
-    # error conditions.
-    if 'GIT_HOOKS_STYLE_CHECKER' in os.environ:
-        style_checker = os.environ['GIT_HOOKS_STYLE_CHECKER']
-    else:
-        style_checker = git_config('hooks.style-checker')
-
-    checker_cmd = [style_checker]
-    if config_file is not None:
-        checker_cmd.extend(['--config', config_file])
-    checker_cmd.append(project_name)
-
-    try:
-        p = Popen(checker_cmd, stdin=PIPE, stdout=PIPE, stderr=STDOUT,
-                  cwd=utils.scratch_dir)
-    except OSError as E:
-        info = (['failed to execute style checker (commit %s):' % commit_rev,
-                 '$ %s' % ' '.join([quote(arg) for arg in checker_cmd])] +
-                str(E).splitlines())
-        raise InvalidUpdate(*info)
-
-    out, _ = p.communicate('\n'.join(filename_list))
-
-    if p.returncode != 0:
-        info = (["pre-commit check failed for commit: %s" % commit_rev] +
-                out.splitlines())
-        raise InvalidUpdate(*info)
-
-    # If we reach this point, it means that the style-checker returned
-    # zero (success). Print any output, it might be a non-fatal warning.
-    if out:
-        warn(*out.splitlines())
+    job = StyleCheckJob(filename_list, commit_rev, project_name,
+                        utils.scratch_dir)
+    job.run()
+    job.report()
 
 
 def ensure_iso_8859_15_only(rev, raw_rh):
@@ -335,8 +429,7 @@ def check_revision_history(rev):
     PARAMETERS
         rev: The commit to be checked.
     """
-    raw_body = git.log(rev, max_count='1', pretty='format:%B',
-                       _split_lines=True)
+    raw_body = get_raw_revlog(rev).splitlines()
 
     for line in raw_body:
         if 'no-rh-check' in line:
@@ -351,40 +444,175 @@ def check_revision_history(rev):
     check_missing_ticket_number(rev, raw_body)
 
 
-def check_filename_collisions(rev):
+class CaseFoldedIndex(object):
+    """A case-folded index of all the files in a given commit.
+
+    ATTRIBUTES
+        rev: The commit whose files are in the index.
+        filename_map: A dictionary, where the key is a case-folded
+            filename, and the value the list of the commit's files
+            whose case-folded name is that key.
+    """
+    def __init__(self, rev, cache=None):
+        """The constructor.
+
+        PARAMETERS
+            rev: Same as the attribute.
+            cache: If not None, a FilenameIndexCache object where
+                to look for the list of files in rev before computing
+                it, and where to save that list after having computed it.
+        """
+        self.rev = rev
+        self.filename_map = {}
+        all_files = None
+        if cache is not None:
+            all_files = cache.get(commit_tree(rev))
+        if all_files is None:
+            # Use the -z option to avoid having to deal with quoted
+            # filenames.  The list of files can be very large, so read
+            # it as "git ls-tree" produces it.
+            all_files = list(git.ls_tree('--full-tree', '--name-only', '-r',
+                                         '-z', rev, _iter_records=True))
+            if cache is not None:
+                cache.add(commit_tree(rev), all_files)
+        for filename in all_files:
+            self.add(filename)
+
+    def filenames(self):
+        """Return the list of all the files in the index."""
+        return [filename for filename_list in self.filename_map.itervalues()
+                for filename in filename_list]
+
+    def add(self, filename):
+        """Add filename to the index.
+
+        PARAMETERS
+            filename: The name of the file, relative to the root
+                of the repository.
+        """
+        key = filename.lower()
+        if key not in self.filename_map:
+            self.filename_map[key] = [filename]
+        else:
+            self.filename_map[key].append(filename)
+
+    def remove(self, filename):
+        """Remove filename from the index.
+
+        PARAMETERS
+            filename: The name of the file, relative to the root
+                of the repository.
+        """
+        key = filename.lower()
+        self.filename_map[key].remove(filename)
+        if not self.filename_map[key]:
+            del self.filename_map[key]
+
+    def update(self, rev):
+        """Update the index so as to contain the files of another commit.
+
+        PARAMETERS
+            rev: The new commit.
+
+        RETURN VALUE
+            The list of files which have been added to the index.
+        """
+        added = []
+        for item in commit_changes(self.rev, rev):
+            (old_mode, new_mode, old_sha1, new_sha1, status, filename) = item
+            if status == 'A':
+                self.add(filename)
+                added.append(filename)
+            elif status == 'D':
+                self.remove(filename)
+        self.rev = rev
+        return added
+
+    def collisions(self, filename_list):
+        """Return the collisions involving any file in filename_list.
+
+        PARAMETERS
+            filename_list: A list of filenames, relative to the root
+                of the repository.
+
+        RETURN VALUE
+            A list with one element per group of files whose names
+            only differ in casing, each element being the sorted list
+            of the filenames in that group.
+        """
+        collisions_map = {}
+        for filename in filename_list:
+            key = filename.lower()
+            if len(self.filename_map.get(key, ())) > 1:
+                collisions_map[key] = sorted(self.filename_map[key])
+        return [collisions_map[k] for k in collisions_map.keys()]
+
+
+def check_filename_collisions(commit_list):
     """raise InvalidUpdate if the name of two files only differ in casing.
 
+    Only the files added by each commit are checked, against all
+    the other files in that commit.
+
     PARAMETERS
-        rev: The commit to be checked.
+        commit_list: A list of CommitInfo objects to be checked,
+            in chronological order.
     """
-    all_files = git.ls_tree('--full-tree', '--name-only', '-r', rev,
-                            _split_lines=True)
-    filename_map = {}
-    for filename in all_files:
-        key = filename.lower()
-        if key not in filename_map:
-            filename_map[key] = [filename]
+    if not commit_list:
+        return
+
+    # Get the list of files changed by all these commits at once.
+    # These lists are also used by the style checks.
+    prefetch_commit_changes([(commit.base_rev_for_git(), commit.rev)
+                             for commit in commit_list])
+
+    # Rather than listing all the files of each and every commit
+    # (which is expensive in large repositories), we create an index
+    # of the files in the first commit's parent, and then update
+    # that index from one commit to the next, using the difference
+    # between the two commits.
+    #
+    # Also, the index of the first commit's parent is very often
+    # one we already computed during a previous push, so use
+    # a persistent cache to avoid computing it again.
+    cache = FilenameIndexCache()
+    index = CaseFoldedIndex(commit_list[0].base_rev_for_git(), cache)
+    for commit in commit_list:
+        base_rev = commit.base_rev_for_git()
+        if index.rev == base_rev:
+            added = index.update(commit.rev)
         else:
-            filename_map[key].append(filename)
-    collisions = [filename_map[k] for k in filename_map.keys()
-                  if len(filename_map[k]) > 1]
-    if collisions:
-        raw_body = git.log(rev, max_count='1', pretty='format:%B',
-                           _split_lines=True)
-        info = [
-            'The following filename collisions have been detected.',
-            'These collisions happen when the name of two or more files',
-            'differ in casing only (Eg: "hello.txt" and "Hello.txt").',
-            'Please re-do your commit, chosing names that do not collide.',
-            '',
-            '    Commit: %s' % rev,
-            '    Subject: %s' % raw_body[0],
-            '',
-            'The matching files are:']
-        for matching_names in collisions:
-            info.append('')  # Empty line to separate each group...
-            info += ['    %s' % filename for filename in matching_names]
-        raise InvalidUpdate(*info)
+            # The files added to the index are not necessarily
+            # the ones added by this commit (Eg: the previous commit
+            # we checked is not our parent). Compute the latter
+            # separately.
+            index.update(commit.rev)
+            added = [item[5] for item in commit_changes(base_rev, commit.rev)
+                     if item[4] == 'A']
+        collisions = index.collisions(added)
+        if collisions:
+            raw_body = get_raw_revlog(commit.rev).splitlines()
+            info = [
+                'The following filename collisions have been detected.',
+                'These collisions happen when the name of two or more files',
+                'differ in casing only (Eg: "hello.txt" and "Hello.txt").',
+                'Please re-do your commit, chosing names that do not collide.',
+                '',
+                '    Commit: %s' % commit.rev,
+                '    Subject: %s' % raw_body[0],
+                '',
+                'The matching files are:']
+            for matching_names in collisions:
+                info.append('')  # Empty line to separate each group...
+                info += ['    %s' % filename for filename in matching_names]
+            raise InvalidUpdate(*info)
+
+    # Save the index of the last commit as well, as the next push
+    # is likely to be made on top of it (unless already in the cache,
+    # in which case there is no need to write it again).
+    tree_rev = commit_tree(index.rev)
+    if tree_rev not in cache:
+        cache.add(tree_rev, index.filenames())
 
 
 MERGE_NOT_ALLOWED_ERROR_MSG = """\
@@ -417,30 +645,30 @@ def reject_commit_if_merge(commit, ref_name):
                                  'subject': commit.subject}).splitlines())
 
 
-def style_check_commit(old_rev, new_rev, project_name):
-    """Call check_file for every file changed between old_rev and new_rev.
-
-    Raise InvalidUpdate if one or more style violation are detected.
+def files_to_style_check(old_rev, new_rev):
+    """Return the list of files to style-check in new_rev.
 
     PARAMETERS
         old_rev: The commit to be used as a reference to determine
             the list of files that have been modified/added by
             the new commit.  Must be a valid revision.
         new_rev: The commit to be checked.
-        project_name: The name of the project (same as the attribute
-            in updates.emails.EmailInfo).
+
+    RETURN VALUE
+        The list of files modified/added by new_rev which need
+        to be style-checked (possibly empty).
     """
     debug('style_check_commit(old_rev=%s, new_rev=%s)' % (old_rev, new_rev))
 
     # We allow users to explicitly disable pre-commit checks for
     # specific commits via the use of a special keyword placed anywhere
     # in the revision log. If found, then return immediately.
-    raw_revlog = git.log('-1', new_rev, pretty='format:%B')
+    raw_revlog = get_raw_revlog(new_rev)
     if 'no-precommit-check' in raw_revlog:
         debug('pre-commit checks explicity disabled for commit %s' % new_rev)
-        return
+        return []
 
-    changes = diff_tree('-r', old_rev, new_rev)
+    changes = commit_changes(old_rev, new_rev)
     files_to_check = []
 
     for item in changes:
@@ -481,6 +709,134 @@ def style_check_commit(old_rev, new_rev, project_name):
     files_to_check = filter(needs_style_check_p, files_to_check)
     if not files_to_check:
         debug('style_check_commit: no files to style-check')
+    return files_to_check
+
+
+def style_check_commit(old_rev, new_rev, project_name):
+    """Call check_file for every file changed between old_rev and new_rev.
+
+    Raise InvalidUpdate if one or more style violation are detected.
+
+    PARAMETERS
+        old_rev: Same as in files_to_style_check.
+        new_rev: Same as in files_to_style_check.
+        project_name: The name of the project (same as the attribute
+            in updates.emails.EmailInfo).
+    """
+    files_to_check = files_to_style_check(old_rev, new_rev)
+    if files_to_check:
+        style_check_files(files_to_check, new_rev, project_name)
+
+
+def style_check_commits(rev_pairs, project_name):
+    """Style-check a sequence of commits, using parallel jobs if configured.
+
+    This is equivalent to calling style_check_commit for each commit,
+    in order.  However, if hooks.style-check-jobs is greater than 1,
+    the style checker is run on up to that many commits in parallel.
+    The results are still reported in the same order, so the error
+    reported is always the one of the first commit failing the checks.
+
+    Raise InvalidUpdate if one or more style violation are detected.
+
+    PARAMETERS
+        rev_pairs: A list of (old_rev, new_rev) tuples, in chronological
+            order, where old_rev and new_rev are the same as in
+            files_to_style_check.
+        project_name: The name of the project (same as the attribute
+            in updates.emails.EmailInfo).
+    """
+    # Get the list of files changed by all these commits at once.
+    prefetch_commit_changes(rev_pairs)
+
+    nb_jobs = git_config('hooks.style-check-jobs')
+    if nb_jobs <= 1 or len(rev_pairs) <= 1:
+        for (old_rev, new_rev) in rev_pairs:
+            style_check_commit(old_rev, new_rev, project_name)
         return
 
-    style_check_files(files_to_check, new_rev, project_name)
+    # Each job is prepared (determining the files to be checked, and
+    # retrieving them into the job's own scratch directory, since
+    # different commits may have different versions of the same file)
+    # by the thread running it, so that the preparation of a job
+    # overlaps with the style checker running for the other jobs,
+    # and so that no more than nb_jobs scratch directories exist
+    # at the same time.  However, accessing the repository cannot
+    # be done by several threads at the same time, hence repo_lock.
+    #
+    # An error during the preparation of a job must not be reported
+    # before the results of the jobs which come before it, so such
+    # errors are returned as the result of the job.
+    repo_lock = threading.Lock()
+    # The index (in rev_pairs) of the first commit known to fail
+    # the checks, so far.  There is no point in starting the jobs
+    # after that commit, but the jobs before it must still be run,
+    # even if they complete after it.  This is a list, so that
+    # run_job can update it; it is protected by repo_lock.
+    first_failure = [len(rev_pairs)]
+
+    def record_failure(index):
+        """Record that the commit at the given index failed the checks.
+
+        PARAMETERS
+            index: The index in rev_pairs of the commit.
+
+        REMARKS
+            The caller must hold repo_lock.
+        """
+        first_failure[0] = min(first_failure[0], index)
+
+    def run_job(indexed_rev_pair):
+        """Prepare and run the style check job for the given commit.
+
+        PARAMETERS
+            indexed_rev_pair: An (index, (old_rev, new_rev)) tuple,
+                where index is the index of the commit in rev_pairs.
+
+        RETURN VALUE
+            The StyleCheckJob object, or an InvalidUpdate exception
+            if the job could not be prepared, or None if there is
+            nothing to check (or the job was skipped).
+        """
+        (index, (old_rev, new_rev)) = indexed_rev_pair
+        with repo_lock:
+            if index > first_failure[0]:
+                return None
+            files_to_check = files_to_style_check(old_rev, new_rev)
+            if not files_to_check:
+                return None
+            job_scratch_dir = mkdtemp('', 'style-check-', utils.scratch_dir)
+            try:
+                job = StyleCheckJob(files_to_check, new_rev, project_name,
+                                    job_scratch_dir)
+            except InvalidUpdate as E:
+                record_failure(index)
+                rmtree(job_scratch_dir)
+                return E
+        try:
+            job.run()
+        finally:
+            rmtree(job_scratch_dir)
+        if job.error is not None or job.returncode != 0:
+            with repo_lock:
+                record_failure(index)
+        return job
+
+    debug('style_check_commits: %d commits (%d in parallel)'
+          % (len(rev_pairs), nb_jobs), level=2)
+    pool = ThreadPool(nb_jobs)
+    try:
+        for job in pool.imap(run_job, enumerate(rev_pairs)):
+            if job is None:
+                continue
+            if isinstance(job, InvalidUpdate):
+                raise job
+            with repo_lock:
+                job.report()
+    finally:
+        # Do not start the remaining jobs, if any, but wait for
+        # the jobs currently running to complete (ThreadPool.terminate
+        # does not wait for its threads), so that none of them is still
+        # running when we exit.
+        pool.terminate()
+        pool.join()
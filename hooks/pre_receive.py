@@ -0,0 +1,112 @@
+"""Implements git's pre-receive hook.
+
+The arguments for this hook are passed via stdin: For each reference
+that is being updated, stdin contains one line with 3 space-separated
+tokens: the old SHA1, the new SHA1, and the reference name (Eg:
+refs/heads/master).
+
+This hook only does something when the hooks.pre-receive-checks
+config option is set.  In that case, all the reference updates
+of a push are validated here, in a single process, and the "update"
+hook does nothing.  Otherwise, the "update" hook validates each
+reference update separately.
+"""
+# This module must be imported first (see import_profile).
+import import_profile
+from collections import OrderedDict
+from shutil import rmtree
+import sys
+
+from config import git_config
+from errors import InvalidUpdate
+from git import commit_store, git_show_ref, is_ignored_ref, is_null_rev
+from update import get_update, update_needs_exclusive_lock
+from utils import debug, warn, create_scratch_dir, UpdateLock
+# We have to import utils, because we cannot import scratch_dir
+# directly into this module.  Otherwise, our scratch_dir seems
+# to not see the update when create_scratch_dir is called.
+import utils
+
+
+def check_updates(updated_refs):
+    """Validate all the given reference updates.
+
+    Each update is validated the same way the "update" hook would,
+    and in the same order, except that the validation of all
+    updates shares the same configuration, scratch directory,
+    and snapshot of all references.
+
+    Any update which cannot be accepted causes the rejection reason
+    to be printed, and the next update to be checked (allowing
+    the user to see all the rejections at once).
+
+    PARAMETERS
+        updated_refs: An OrderedDict, indexed by the name of the ref
+            being updated, and containing 2-elements tuple.  This tuple
+            contains the previous revision, and the new revision of the
+            reference.
+
+    RETURN VALUE
+        True if all updates can be accepted, False otherwise.
+
+    REMARKS
+        This function assumes that scratch_dir has been initialized.
+    """
+    all_refs = git_show_ref()
+    all_ok = True
+
+    with UpdateLock(updated_refs.keys(),
+                    exclusive=any(update_needs_exclusive_lock(ref_name)
+                                  for ref_name in updated_refs)):
+        for ref_name in updated_refs.keys():
+            (old_rev, new_rev) = updated_refs[ref_name]
+            debug('check_update(ref_name=%s, old_rev=%s, new_rev=%s)'
+                  % (ref_name, old_rev, new_rev),
+                  level=2)
+            try:
+                # Use a copy of all_refs, since we are going to update
+                # it before checking the next update.
+                update = get_update(ref_name, old_rev, new_rev,
+                                    dict(all_refs))
+                update.validate()
+            except InvalidUpdate, E:
+                warn(*E)
+                all_ok = False
+                continue
+            finally:
+                # Do not let the commit store grow with the commits
+                # of every update.
+                commit_store.clear()
+
+            # When using the "update" hook, git updates each reference
+            # before calling the hook for the next one.  Reproduce that
+            # in our snapshot of all references, so that the next update
+            # sees the repository in the same state.
+            if is_null_rev(new_rev):
+                all_refs.pop(ref_name, None)
+            elif not is_ignored_ref(ref_name):
+                all_refs[ref_name] = new_rev
+
+    return all_ok
+
+
+if __name__ == '__main__':
+    refs_data = OrderedDict()
+    for line in sys.stdin.read().splitlines():
+        (old_rev, new_rev, ref_name) = line.strip().split()
+        refs_data[ref_name] = (old_rev, new_rev)
+    try:
+        if not git_config('hooks.pre-receive-checks'):
+            # The reference updates are validated by the "update"
+            # hook instead.
+            sys.exit(0)
+        create_scratch_dir()
+        if not check_updates(refs_data):
+            sys.exit(1)
+    except InvalidUpdate, E:
+        warn(*E)
+        sys.exit(1)
+    finally:
+        # Delete our scratch directory.
+        if utils.scratch_dir is not None:
+            rmtree(utils.scratch_dir)
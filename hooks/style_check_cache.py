@@ -0,0 +1,243 @@
+"""A persistent cache of the files known to pass the style checks.
+
+Running the style_checker is expensive, and the same file contents
+often get checked over and over again (Eg: when creating a new branch
+from an already-checked branch, or when pushing commits that were
+cherry-picked or rebased).  This module provides a cache, stored
+inside the repository, of the files which the style_checker already
+accepted.
+
+Each entry is keyed on everything which can influence the result of
+the style checker: the contents of the file (its blob SHA1), the name
+of the file, the style_checker program, the contents of the style_checker
+config file (if any), and the project name.
+
+The cache is shared by all the users pushing to the repository, so
+its entries are created group-writable.  Being only a cache, errors
+accessing it are ignored (Eg: an entry whose last use cannot be
+recorded is still used, and an entry which cannot be created is
+simply not recorded).
+"""
+
+from hashlib import sha1
+import os
+
+from config import git_config
+from git import get_object_info
+from utils import debug, make_shared_dir
+
+# The name of the directory where the cache is stored.  This directory
+# is relative to the root of the (bare) repository.
+STYLE_CHECK_CACHE_DIR = 'git-hooks::style-check-cache'
+
+
+def checker_identity(style_checker):
+    """Return a string identifying the given style_checker program.
+
+    PARAMETERS
+        style_checker: The name of the style_checker program, either
+            as an absolute filename, or as a program to be searched
+            in the PATH.
+
+    RETURN VALUE
+        A string which changes whenever the style_checker program
+        is replaced, or None if the program could not be found.
+    """
+    if os.path.isabs(style_checker):
+        candidates = [style_checker]
+    else:
+        candidates = [os.path.join(path, style_checker)
+                      for path in os.environ.get('PATH', '').split(':')]
+    for candidate in candidates:
+        if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+            st = os.stat(candidate)
+            return '%s:%d:%d' % (os.path.realpath(candidate),
+                                 st.st_size, st.st_mtime)
+    return None
+
+
+class StyleCheckCache(object):
+    """A persistent cache of the files known to pass the style checks.
+
+    The cache is implemented as a directory, with one (empty) file
+    per entry, whose name is the entry's key.  The modification time
+    of each file records the last time the entry was used, so as to
+    evict the least recently used entries when the cache grows over
+    its maximum size (see the hooks.style-check-cache-size config
+    option).
+
+    Adding entries does not evict any entry, as this requires listing
+    the whole cache.  Instead, evict_style_check_cache should be called
+    once all the style checks have been performed.
+
+    ATTRIBUTES
+        checker_id: The identity of the style_checker program (see
+            checker_identity).
+        config_file: The name of the style_checker config file,
+            or None if there isn't one.
+        project_name: The name of the project (same as the attribute
+            in updates.emails.EmailInfo).
+        max_entries: The maximum number of entries in the cache.
+    """
+    # True if entries were added to the cache since the last call
+    # to evict_style_check_cache.
+    entries_added = False
+
+    def __init__(self, checker_id, config_file, project_name):
+        """The constructor.
+
+        PARAMETERS
+            checker_id: Same as the attribute.
+            config_file: Same as the attribute.
+            project_name: Same as the attribute.
+        """
+        self.checker_id = checker_id
+        self.config_file = config_file
+        self.project_name = project_name
+        self.max_entries = git_config('hooks.style-check-cache-size')
+        # A dictionary, indexed by commit revision, of the SHA1 of
+        # the style_checker config file in that commit ('' if none).
+        self.__config_revs = {}
+
+    @property
+    def enabled(self):
+        """True if the cache can be used, False otherwise."""
+        return self.checker_id is not None and self.max_entries > 0
+
+    def key(self, commit_rev, filename):
+        """Return the key of the given file at commit_rev.
+
+        PARAMETERS
+            commit_rev: The commit where the file is being checked.
+            filename: The name of the file, relative to the root
+                of the repository.
+        """
+        file_info = get_object_info('%s:%s' % (commit_rev, filename))
+        return sha1('\x00'.join([
+            file_info[0] if file_info is not None else '',
+            filename,
+            self.checker_id,
+            self.__config_rev(commit_rev),
+            self.project_name])).hexdigest()
+
+    def uncached_files(self, commit_rev, filename_list):
+        """Return the files from filename_list not found in the cache.
+
+        PARAMETERS
+            commit_rev: The commit where the files are being checked.
+            filename_list: A list of filenames, relative to the root
+                of the repository.
+
+        RETURN VALUE
+            A list containing the elements of filename_list (in the
+            same order) which are not known to pass the style checks.
+        """
+        if not self.enabled:
+            return filename_list
+
+        result = []
+        for filename in filename_list:
+            entry = os.path.join(STYLE_CHECK_CACHE_DIR,
+                                 self.key(commit_rev, filename))
+            if os.path.exists(entry):
+                debug('style-check cache hit: %s' % filename, level=2)
+                # Record this use of the entry.
+                try:
+                    os.utime(entry, None)
+                except OSError:
+                    # The entry is still valid, it just risks being
+                    # evicted earlier than it should.
+                    pass
+            else:
+                result.append(filename)
+        return result
+
+    def add(self, commit_rev, filename_list):
+        """Record that the given files pass the style checks.
+
+        PARAMETERS
+            commit_rev: The commit where the files were checked.
+            filename_list: A list of filenames, relative to the root
+                of the repository.
+        """
+        if not self.enabled:
+            return
+
+        try:
+            make_shared_dir(STYLE_CHECK_CACHE_DIR)
+        except OSError:
+            # The cache cannot be created (Eg: the repository is not
+            # writable by the user).  Just do without it.
+            return
+        for filename in filename_list:
+            entry = os.path.join(STYLE_CHECK_CACHE_DIR,
+                                 self.key(commit_rev, filename))
+            if os.path.exists(entry):
+                continue
+            try:
+                open(entry, 'a').close()
+                os.chmod(entry, 0664)
+            except (IOError, OSError):
+                # Same as above, just do without this entry.
+                pass
+        StyleCheckCache.entries_added = True
+
+    def __config_rev(self, commit_rev):
+        """Return the SHA1 of the style_checker config file in commit_rev.
+
+        PARAMETERS
+            commit_rev: A commit revision.
+
+        RETURN VALUE
+            The SHA1 of the config file, or the empty string if there is
+            no config file (or if it does not exist in that commit).
+        """
+        if commit_rev not in self.__config_revs:
+            config_info = None
+            if self.config_file is not None:
+                config_info = get_object_info('%s:%s'
+                                              % (commit_rev, self.config_file))
+            self.__config_revs[commit_rev] = (
+                config_info[0] if config_info is not None else '')
+        return self.__config_revs[commit_rev]
+
+
+def evict_style_check_cache(max_entries=None):
+    """Evict the least recently used entries of the cache, if too many.
+
+    Nothing is done if no entry was added to the cache since the last
+    call to this function.
+
+    PARAMETERS
+        max_entries: The maximum number of entries in the cache.
+            If None, use the hooks.style-check-cache-size config option.
+    """
+    if not StyleCheckCache.entries_added:
+        return
+    StyleCheckCache.entries_added = False
+
+    if max_entries is None:
+        max_entries = git_config('hooks.style-check-cache-size')
+    try:
+        entries = os.listdir(STYLE_CHECK_CACHE_DIR)
+    except OSError:
+        # No cache (see StyleCheckCache.add).
+        return
+    if len(entries) <= max_entries:
+        return
+
+    def last_use(entry):
+        try:
+            return os.path.getmtime(
+                os.path.join(STYLE_CHECK_CACHE_DIR, entry))
+        except OSError:
+            # The entry was probably evicted concurrently.
+            return 0
+
+    entries.sort(key=last_use)
+    for entry in entries[:len(entries) - max_entries]:
+        try:
+            os.unlink(os.path.join(STYLE_CHECK_CACHE_DIR, entry))
+        except OSError:
+            # Same as above, already evicted.
+            pass
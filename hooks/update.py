@@ -1,10 +1,12 @@
-from argparse import ArgumentParser
+# This module must be imported first (see import_profile).
+import import_profile
 from shutil import rmtree
 import sys
 
 from errors import InvalidUpdate
 from git import get_object_type, git_show_ref
-from utils import debug, warn, create_scratch_dir, FileLock
+from utils import (debug, warn, create_scratch_dir, ArgsNamespace,
+                   UpdateLock)
 # We have to import utils, because we cannot import scratch_dir
 # directly into this module.  Otherwise, our scratch_dir seems
 # to not see the update when create_scratch_dir is called.
@@ -16,6 +18,14 @@ from updates.factory import new_update
 def parse_command_line():
     """Return a namespace built after parsing the command line.
     """
+    # Git always calls this hook with exactly 3 arguments, so handle
+    # that case by hand, rather than paying for the cost of loading
+    # the argparse module.
+    args = sys.argv[1:]
+    if len(args) == 3 and not any(arg.startswith('-') for arg in args):
+        return ArgsNamespace(ref_name=args[0], old_rev=args[1],
+                             new_rev=args[2])
+
     # The command-line interface is very simple, so we could possibly
     # handle it by hand.  But it's nice to have features such as
     # -h/--help switches which come for free if we use argparse.
@@ -23,6 +33,7 @@ def parse_command_line():
     # We use ArgumentParser, which means that we are requiring
     # Python version 2.7 or later, because it handles mandatory
     # command-line arguments for us as well.
+    from argparse import ArgumentParser
     ap = ArgumentParser(description='Git "update" hook.')
     ap.add_argument('ref_name',
                     help='the name of the reference being updated')
@@ -52,14 +63,46 @@ def check_update(ref_name, old_rev, new_rev):
     debug('check_update(ref_name=%s, old_rev=%s, new_rev=%s)'
           % (ref_name, old_rev, new_rev),
           level=2)
-    update_cls = new_update(ref_name, old_rev, new_rev, git_show_ref(),
+    update_cls = get_update(ref_name, old_rev, new_rev, git_show_ref())
+    with UpdateLock([ref_name],
+                    exclusive=update_needs_exclusive_lock(ref_name)):
+        update_cls.validate()
+
+
+def update_needs_exclusive_lock(ref_name):
+    """Return True if updating ref_name requires an exclusive repository lock.
+
+    Updates to most references only need to lock the reference itself
+    (see utils.UpdateLock), and can thus be validated concurrently with
+    updates of other references.  The exception is the reference holding
+    the hooks' configuration, since changing it affects the validation
+    of all the other updates.
+
+    PARAMETERS
+        ref_name: The name of the reference being updated.
+    """
+    return ref_name == 'refs/meta/config'
+
+
+def get_update(ref_name, old_rev, new_rev, all_refs):
+    """Return the AbstractUpdate object handling the given update.
+
+    Raises InvalidUpdate if this type of update is not supported.
+
+    PARAMETERS
+        ref_name: Same as in check_update.
+        old_rev: Same as in check_update.
+        new_rev: Same as in check_update.
+        all_refs: A dictionary containing all references, as described
+            in git_show_ref.
+    """
+    update_cls = new_update(ref_name, old_rev, new_rev, all_refs,
                             submitter_email=None)
     if update_cls is None:
         raise InvalidUpdate(
             "This type of update (%s,%s) is currently unsupported."
             % (ref_name, get_object_type(new_rev)))
-    with FileLock('git-hooks::update.token'):
-        update_cls.validate()
+    return update_cls
 
 
 if __name__ == "__main__":
@@ -1,20 +1,20 @@
 """The updates root module."""
 
-from config import git_config, SUBJECT_MAX_SUBJECT_CHARS
+from config import (git_config, git_config_ref_matcher,
+                    SUBJECT_MAX_SUBJECT_CHARS)
 from errors import InvalidUpdate
 from git import (git, get_object_type, is_null_rev, commit_parents,
-                 commit_rev, is_revert_commit)
+                 commit_rev, commit_logs, is_revert_commit,
+                 prefetch_raw_revlogs, prefetch_commit_changes)
 from os.path import expanduser, isfile, getmtime
-from pre_commit_checks import (check_revision_history, style_check_commit,
-                               check_filename_collisions,
-                               reject_commit_if_merge)
 import re
 import shlex
 from syslog import syslog
 import time
-from updates.commits import commit_info_list
+from updates.commits import commit_info_list, RevSet
 from updates.emails import EmailInfo, Email
-from updates.mailinglists import expanded_mailing_list
+from updates.mailinglists import (expanded_mailing_list,
+                                  batch_expand_mailing_lists)
 from utils import debug, warn, get_user_name
 
 
@@ -217,14 +217,20 @@ class AbstractUpdate(object):
             # new commit.
             return
 
+        # The pre_commit_checks module is fairly expensive to load,
+        # and is not needed by many updates (Eg: reference deletions),
+        # so only import it when we know we need it.
+        from pre_commit_checks import (check_revision_history,
+                                       check_filename_collisions,
+                                       reject_commit_if_merge)
+
         # Check to see if any of the entries in hooks.no-precommit-check
         # might be matching our reference name...
-        for exp in git_config('hooks.no-precommit-check'):
-            exp = exp.strip()
-            if re.match(exp, self.ref_name):
-                # Pre-commit checks are explicitly disabled on this branch.
-                debug("(hooks.no-precommit-check match: `%s')" % exp)
-                return
+        exp = self.search_config_option_list('hooks.no-precommit-check')
+        if exp is not None:
+            # Pre-commit checks are explicitly disabled on this branch.
+            debug("(hooks.no-precommit-check match: `%s')" % exp)
+            return
 
         if self.__no_cvs_check_user_override():
             # Just return. All necessary traces have already been
@@ -237,6 +243,12 @@ class AbstractUpdate(object):
         # users to quickly revert a commit if need be, without having
         # to worry about bumping into any check of any kind.
         added = self.added_commits
+
+        # Most of the checks below need the revision log of each
+        # of these commits.  Get them all at once, rather than
+        # calling git for each commit and each check.
+        prefetch_raw_revlogs([commit.rev for commit in added])
+
         for commit in added:
             if is_revert_commit(commit.rev):
                 debug('revert commit detected,'
@@ -277,9 +289,8 @@ class AbstractUpdate(object):
         # so do not provide the option of doing the check on the
         # final commit only (following hooks.combined-style-checking).
         # Do it on all new commits.
-        for commit in added:
-            if not commit.pre_existing_p:
-                check_filename_collisions(commit.rev)
+        check_filename_collisions([commit for commit in added
+                                   if not commit.pre_existing_p])
 
         self.__do_style_checks()
 
@@ -320,6 +331,13 @@ class AbstractUpdate(object):
         # Prevent this from happening by putting an artificial
         # character at the start of the format string, and then
         # by stripping it from the output.
+        #
+        # Also, the diff can be extremely large (Eg: when importing
+        # a new version of some third-party sources), so we stop
+        # reading it once we know it is going to be truncated anyway
+        # (see Email.__email_body_with_diff). Since the diff is
+        # prefixed by our artificial character, we need to read
+        # one extra byte for that.
 
         body = git.log(commit.rev, max_count="1") + '\n'
         if git_config('hooks.commit-url') is not None:
@@ -332,8 +350,10 @@ class AbstractUpdate(object):
         if git_config('hooks.disable-email-diff'):
             diff = None
         else:
+            max_diff_size = git_config('hooks.max-email-diff-size')
             diff = git.show(commit.rev, p=True, M=True, stat=True,
-                            pretty="format:|")[1:]
+                            pretty="format:|",
+                            _max_output_size=max_diff_size + 1)[1:]
 
         filer_cmd = git_config('hooks.file-commit-cmd')
         if filer_cmd is not None:
@@ -368,21 +388,13 @@ class AbstractUpdate(object):
         """
         if ref_name is None:
             ref_name = self.ref_name
-        ref_re_list = git_config(option_name)
-        for ref_re in ref_re_list:
-            ref_re = ref_re.strip()
-            if re.match(ref_re, ref_name):
-                return ref_re
-        return None
+        return git_config_ref_matcher(option_name).match(ref_name)
 
     def get_refs_matching_config(self, config_name):
         """Return the list of references matching the given config option."""
-        result = []
-        for ref_name in self.all_refs.keys():
-            if self.search_config_option_list(config_name,
-                                              ref_name) is not None:
-                result.append(ref_name)
-        return result
+        ref_matcher = git_config_ref_matcher(config_name)
+        return [ref_name for ref_name in self.all_refs.keys()
+                if ref_matcher.match(ref_name) is not None]
 
     def summary_of_changes(self):
         """A summary of changes to be added at the end of the ref-update email.
@@ -406,9 +418,11 @@ class AbstractUpdate(object):
             summary.append('')
             for commit in reversed(self.lost_commits):
                 summary.append('  ' + commit.oneline_str())
-            for commit in reversed(self.lost_commits):
+            for log in commit_logs([commit.rev for commit
+                                    in reversed(self.lost_commits)],
+                                   pretty='medium'):
                 summary.append('')
-                summary.append(git.log('-n1', commit.rev, pretty='medium'))
+                summary.append(log)
 
         if self.added_commits:
             has_silent = False
@@ -439,24 +453,25 @@ class AbstractUpdate(object):
 
             # Print a more verbose description of the added commits.
             #
-            # We do this by calling "git log -n1" for each and every
-            # commit in self.added_commits. This not ideal, as this list
-            # can be pretty long. We still do it this way, because
-            # it's very simple, and allows us to be certain that
-            # the list of commits in the "verbose" section is the exact
-            # same as the "short" list above.
+            # We do this by getting the log of each and every commit
+            # in self.added_commits, rather than trying to produce
+            # the full log using a revision range. This allows us
+            # to be certain that the list of commits in the "verbose"
+            # section is the exact same as the "short" list above.
+            # Otherwise, because of merge commits, it's not sufficient
+            # to only exclude the parent of the base commit. One must
+            # exclude all parents which are not in self.added_commits,
+            # or else the log will be including commits accessible
+            # from the merge's other parents.
             #
-            # If it turns out to be unnacceptable, we can try producing
-            # the full log using a single git command. Because of
-            # merge commits, it's not sufficient to only exclude
-            # the parent of the base commit. One must exclude all
-            # parents which are not in self.added_commits.  Otherwise,
-            # the log will be including commits accessible from
-            # the merge's other parents.
+            # This list can be pretty long, so use commit_logs to get
+            # all the logs using a single git command.
 
-            for commit in reversed(self.added_commits):
+            for log in commit_logs([commit.rev for commit
+                                    in reversed(self.added_commits)],
+                                   pretty='medium'):
                 summary.append('')
-                summary.append(git.log('-n1', '--pretty=medium', commit.rev))
+                summary.append(log)
 
         # We do not want that summary to be used for filing purposes.
         # So add a "Diff:" marker.
@@ -518,9 +533,13 @@ class AbstractUpdate(object):
         # new in the repository.
         #
         # Note that we do not use the commit_info_list function for
-        # that, because we only need the commit hashes, and a list
-        # of commit hashes is more convenient for what we want to do
-        # than a list of CommitInfo objects.
+        # that, because we only need the commit hashes, and a RevSet
+        # is more convenient for what we want to do than a list of
+        # CommitInfo objects.
+        #
+        # The list of exclusions is passed via stdin rather than via
+        # the command line, as repositories can have a large number
+        # of references.
 
         exclude = ['^%s' % self.all_refs[ref_name]
                    for ref_name in self.all_refs.keys()
@@ -528,8 +547,8 @@ class AbstractUpdate(object):
         if not is_null_rev(self.old_rev):
             exclude.append('^%s' % self.old_rev)
 
-        new_repo_revs = git.rev_list(self.new_rev, *exclude, reverse=True,
-                                     _split_lines=True)
+        new_repo_revs = RevSet.from_rev_list(self.new_rev, reverse=True,
+                                             _stdin_revs=exclude)
 
         # If this is a reference creation (base_rev is null), try to
         # find a commit which can serve as base_rev.  We try to find
@@ -589,7 +608,7 @@ class AbstractUpdate(object):
 
         exclude = ['^%s' % self.all_refs[rev]
                    for rev in self.all_refs.keys()]
-        commit_list = commit_info_list(self.old_rev, *exclude)
+        commit_list = commit_info_list(self.old_rev, _stdin_revs=exclude)
 
         return commit_list
 
@@ -661,28 +680,37 @@ class AbstractUpdate(object):
             debug('no style check on this branch (hooks.no-style-checks)')
             return
 
+        # See pre_commit_checks above.
+        from pre_commit_checks import style_check_commit, style_check_commits
+        from style_check_cache import evict_style_check_cache
+
         added = self.__added_commits
-        if git_config('hooks.combined-style-checking'):
-            # This project prefers to perform the style check on
-            # the cumulated diff, rather than commit-per-commit.
-            # Behave as if the update only added one commit (new_rev),
-            # with a single parent being old_rev.  If old_rev is nul
-            # (branch creation), then use the first parent of the oldest
-            # added commit.
-            debug('(combined style checking)')
-            if not added[-1].pre_existing_p:
-                base_rev = (
-                    added[0].base_rev_for_git() if is_null_rev(self.old_rev)
-                    else self.old_rev)
-                style_check_commit(base_rev, self.new_rev,
-                                   self.email_info.project_name)
-        else:
-            debug('(commit-per-commit style checking)')
-            # Perform the pre-commit checks, as needed...
-            for commit in added:
-                if not commit.pre_existing_p:
-                    style_check_commit(commit.base_rev_for_git(), commit.rev,
+        try:
+            if git_config('hooks.combined-style-checking'):
+                # This project prefers to perform the style check on
+                # the cumulated diff, rather than commit-per-commit.
+                # Behave as if the update only added one commit (new_rev),
+                # with a single parent being old_rev.  If old_rev is nul
+                # (branch creation), then use the first parent of the
+                # oldest added commit.
+                debug('(combined style checking)')
+                if not added[-1].pre_existing_p:
+                    base_rev = (
+                        added[0].base_rev_for_git()
+                        if is_null_rev(self.old_rev) else self.old_rev)
+                    style_check_commit(base_rev, self.new_rev,
                                        self.email_info.project_name)
+            else:
+                debug('(commit-per-commit style checking)')
+                # Perform the pre-commit checks, as needed...
+                style_check_commits([(commit.base_rev_for_git(), commit.rev)
+                                     for commit in added
+                                     if not commit.pre_existing_p],
+                                    self.email_info.project_name)
+        finally:
+            # Only evict the old entries of the style-check cache (if
+            # needed) once all the style checks have been performed.
+            evict_style_check_cache()
 
     def __email_ref_update(self):
         """Send the email describing to the reference update.
@@ -708,9 +736,17 @@ class AbstractUpdate(object):
     def __email_new_commits(self):
         """Send one email per new (non-pre-existing) commit.
         """
-        for commit in self.added_commits:
-            if commit.send_email_p:
-                self.email_commit(commit)
+        commit_list = [commit for commit in self.added_commits
+                       if commit.send_email_p]
+        # Computing the recipients of these emails may require the list
+        # of files changed by each commit.  If so, get them all at once.
+        prefetch_commit_changes([(commit.base_rev_for_git(), commit.rev)
+                                 for commit in commit_list])
+        # Evaluate the hooks.mailinglist scripts for all these commits
+        # at once, if possible.
+        batch_expand_mailing_lists(commit_list)
+        for commit in commit_list:
+            self.email_commit(commit)
 
     def __set_send_email_p_attr(self, commit_list):
         # Make sure we have at least one commit in the list.  Otherwise,
@@ -730,8 +766,8 @@ class AbstractUpdate(object):
             # Also reduce the list already present in this branch
             # prior to the update.
             exclude.append('^%s' % base_rev)
-        included_refs = git.rev_list(self.new_rev, *exclude,
-                                     _split_lines=True)
+        included_refs = RevSet.from_rev_list(self.new_rev,
+                                             _stdin_revs=exclude)
 
         # Also, we always send emails for first-parent commits.
         # This is useful in the following scenario:
@@ -756,8 +792,8 @@ class AbstractUpdate(object):
         first_parents_expr = [self.new_rev]
         if base_rev is not None:
             first_parents_expr.append('^%s' % base_rev)
-        first_parents = git.rev_list(*first_parents_expr, first_parent=True,
-                                     _split_lines=True)
+        first_parents = RevSet.from_rev_list(*first_parents_expr,
+                                             first_parent=True)
 
         for commit in commit_list:
             commit.send_email_p = (commit.rev in included_refs or
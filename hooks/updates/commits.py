@@ -1,6 +1,7 @@
 """Management of git commits during updates..."""
 
-from git import git, commit_parents, empty_tree_rev, diff_tree
+from git import (git, commit_parents, commit_store, empty_tree_rev,
+                 commit_changes, commit_record_logs)
 from updates.mailinglists import expanded_mailing_list
 from utils import debug
 
@@ -66,7 +67,7 @@ class CommitInfo(object):
         """
         if self.__files_changed is None:
             self.__files_changed = []
-            all_changes = diff_tree('-r', self.base_rev_for_git(), self.rev)
+            all_changes = commit_changes(self.base_rev_for_git(), self.rev)
             for item in all_changes:
                 (old_mode, new_mode, old_sha1, new_sha1, status, filename) \
                     = item
@@ -135,24 +136,64 @@ class CommitInfo(object):
         return base_rev
 
 
-def commit_info_list(*args):
+class RevSet(object):
+    """An ordered set of revisions (SHA1s).
+
+    This class is meant to be used in place of the list of revisions
+    returned by "git rev-list", whenever we need to check whether
+    some revisions are part of that list.  With a list, each such
+    check is linear in the size of the list, which becomes prohibitive
+    when both the list and the number of revisions to check are large
+    (Eg: when pushing a branch with tens of thousands of new commits).
+
+    ATTRIBUTES
+        revs: A tuple with all the revisions, in the same order
+            as provided during construction.
+    """
+    def __init__(self, revs):
+        """The constructor.
+
+        PARAMETERS
+            revs: An iterable of revisions.
+        """
+        self.revs = tuple(revs)
+        self.__rev_set = frozenset(self.revs)
+
+    @classmethod
+    def from_rev_list(cls, *args, **kwargs):
+        """Return the RevSet of the revisions returned by "git rev-list".
+
+        PARAMETERS
+            Same as git.rev_list, except for _split_lines which
+            should not be used.
+        """
+        return cls(git.rev_list(*args, _split_lines=True, **kwargs))
+
+    def __contains__(self, rev):
+        return rev in self.__rev_set
+
+    def __iter__(self):
+        return iter(self.revs)
+
+    def __len__(self):
+        return len(self.revs)
+
+    def __getitem__(self, index):
+        return self.revs[index]
+
+
+def commit_info_list(*args, **kwargs):
     """Return a list of CommitInfo objects in chronological order.
 
+    The metadata of all these commits is also added to the commit_store.
+
     PARAMETERS
         Same as in the "git rev-list" command.
+        _stdin_revs: Same as in git.git_run.
     """
-    rev_info = git.rev_list(*args, pretty='format:%P%n%an <%ae>%n%s',
-                            _split_lines=True, reverse=True)
-    # Each commit should generate 4 lines of output.
-    assert len(rev_info) % 4 == 0
-
-    result = []
-    while rev_info:
-        commit_keyword, rev = rev_info.pop(0).split(None, 1)
-        parents = rev_info.pop(0).split()
-        author = rev_info.pop(0)
-        subject = rev_info.pop(0)
-        assert commit_keyword == 'commit'
-        result.append(CommitInfo(rev, author, subject, parents))
-
-    return result
+    # Get all the information needed by the commit_store at the same
+    # time, including the raw revision log.
+    logs = commit_record_logs(*args, reverse=True, **kwargs)
+    return [CommitInfo(record.rev, record.author, record.subject,
+                       list(record.parents))
+            for record in commit_store.add_logs(logs)]
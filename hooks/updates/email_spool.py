@@ -0,0 +1,344 @@
+"""A persistent spool of the emails waiting to be delivered.
+
+Emails are first written to the spool, stored inside the repository,
+and then delivered by a worker (normally running as a daemon, so as
+not to keep the user waiting).  This way, the emails which could
+not be delivered (Eg: because the machine was rebooted during
+the delivery) are not lost: They stay in the spool, and get
+delivered by the next worker.
+
+To preserve the order of the emails of a given repository, each
+email gets a sequence number when added to the spool, and emails
+are delivered in that order, by one worker at a time.  Each email
+also gets a Date: header which is always later than the Date: header
+of the emails spooled before it, which helps the recipients' email
+clients sort the emails in the same order.
+
+An email which could not be delivered stays in the spool (along with
+all the emails spooled after it), and the next worker tries again.
+Note that no retry is scheduled: The next worker only gets started
+by the next push to the repository (which need not have any email
+of its own to send).  If the delivery keeps failing, or fails
+permanently (Eg: the SMTP server rejects the email), the email is
+moved to a subdirectory of the spool, so as not to block the delivery
+of the other emails.
+
+The spool is shared by all the users pushing to the repository, so
+its directories and files are created group-writable.
+"""
+
+import errno
+import fcntl
+import marshal
+import os
+from subprocess import Popen, PIPE, STDOUT
+from tempfile import mkstemp
+import time
+
+from config import git_config
+from updates.sendmail import EmailTransport, is_permanent_failure
+from utils import debug, make_shared_dir, open_lock_file, warn
+
+# The name of the directory where the spool is stored.  This directory
+# is relative to the root of the (bare) repository.
+EMAIL_SPOOL_DIR = 'git-hooks::email-spool'
+
+# The name of the file (inside the spool directory) recording
+# the sequence number and the date of the last email spooled.
+EMAIL_SPOOL_STATE_FILENAME = 'state'
+
+# The name of the files (inside the spool directory) used to lock
+# the spool when adding emails to it, and when delivering them.
+EMAIL_SPOOL_LOCK_FILENAME = 'spool.lock'
+EMAIL_DELIVERY_LOCK_FILENAME = 'delivery.lock'
+
+# The suffix of the files holding the emails in the spool.
+EMAIL_SPOOL_ENTRY_SUFFIX = '.email'
+
+# The name of the directory (inside the spool directory) where
+# the emails which could not be delivered are moved.
+EMAIL_SPOOL_FAILED_DIR = 'failed'
+
+# The maximum number of attempts at delivering a given email,
+# before giving up on it.
+EMAIL_DELIVERY_MAX_ATTEMPTS = 3
+
+
+class EmailSpool(object):
+    """A persistent spool of the emails waiting to be delivered.
+
+    Each email in the spool is a dictionary (saved using marshal,
+    in a file whose name is made of its sequence number), with
+    the following keys:
+      - 'seq': The sequence number of the email;
+      - 'date': The date of the email (a number of seconds since
+        the epoch);
+      - 'from': The email address of the sender;
+      - 'recipients': The list of the email addresses of the recipients;
+      - 'message': The email's header and body, not including
+        the Date: header;
+      - 'filer_cmd': If not None, a command to be called after
+        the email is sent, with 'filer_input' on its standard input
+        (see Email.filer_cmd);
+      - 'attempts': The number of failed attempts at delivering
+        the email (missing if none).
+
+    REMARKS
+        An email might be delivered twice if the worker delivering it
+        gets interrupted right after the delivery, before being able to
+        remove it from the spool.
+
+    ATTRIBUTES
+        spool_dir: The absolute name of the directory holding the spool.
+        smtp_server: The SMTP server to deliver the emails to, or None
+            to use the SMTP server on localhost (or, if there is none,
+            the sendmail program).
+        use_sendmail: True if the emails should be delivered using
+            the sendmail program (if available) rather than through
+            an SMTP session.  This forks one process per email.
+    """
+    def __init__(self):
+        """The constructor."""
+        # Use an absolute path, since the emails are usually delivered
+        # from a daemon process, which no longer runs in the repository.
+        self.spool_dir = os.path.abspath(EMAIL_SPOOL_DIR)
+        self.smtp_server = git_config('hooks.smtp-server')
+        self.use_sendmail = git_config('hooks.use-sendmail')
+
+    def add(self, entries):
+        """Add the given emails to the spool, in that order.
+
+        PARAMETERS
+            entries: A list of dictionaries, describing each email
+                as documented in the class' description, but without
+                the 'seq' and 'date' keys (those are set by this method).
+        """
+        if not entries:
+            return
+        make_shared_dir(self.spool_dir)
+
+        with open_lock_file(
+                self.__filename(EMAIL_SPOOL_LOCK_FILENAME)) as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            (seq, date) = self.__read_state()
+            for entry in entries:
+                seq += 1
+                # The Date: header only has a resolution of one second,
+                # so make sure consecutive emails are at least one
+                # second apart.
+                date = max(int(time.time()), date + 1)
+                entry = dict(entry, seq=seq, date=date)
+                self.__write(self.__entry_filename(seq),
+                             marshal.dumps(entry))
+            self.__write(self.__filename(EMAIL_SPOOL_STATE_FILENAME),
+                         '%d %d\n' % (seq, date))
+
+    def pending(self):
+        """Return the sorted list of the files of the emails in the spool.
+        """
+        try:
+            return sorted(
+                filename for filename in os.listdir(self.spool_dir)
+                if filename.endswith(EMAIL_SPOOL_ENTRY_SUFFIX))
+        except OSError:
+            return []
+
+    def deliver(self):
+        """Deliver all the emails in the spool, in order.
+
+        If another worker is already delivering emails from this spool,
+        return immediately, leaving the delivery of our emails to that
+        other worker.  If an email could not be delivered, this email,
+        as well as all the emails after it, stay in the spool, unless
+        that email should be given up on (see deliver_entry).
+        """
+        while self.pending():
+            with open_lock_file(
+                    self.__filename(EMAIL_DELIVERY_LOCK_FILENAME)) as lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except IOError, E:
+                    if E.errno not in (errno.EAGAIN, errno.EACCES):
+                        raise
+                    # The other worker checks the spool again after
+                    # releasing its lock, so it will see our emails.
+                    return
+                # Use the same transport for all the emails, so as
+                # to reuse the same SMTP session.
+                transport = EmailTransport(
+                    self.smtp_server or 'localhost',
+                    use_sendmail=self.use_sendmail,
+                    sendmail_fallback=self.smtp_server is None)
+                try:
+                    for filename in self.pending():
+                        if not self.deliver_entry(filename, transport):
+                            # Preserve the order of the emails: Leave
+                            # this email and the ones after it to
+                            # the next worker.
+                            return
+                finally:
+                    transport.close()
+
+    def deliver_entry(self, filename, transport):
+        """Deliver the given email from the spool.
+
+        The email is removed from the spool as soon as it has been sent,
+        before calling its filer command (if any), so that a failure
+        of that command does not cause the email to be sent again.
+        If the email could not be sent, it stays in the spool, unless
+        the failure is permanent, or the email already failed to be
+        delivered EMAIL_DELIVERY_MAX_ATTEMPTS times, in which case
+        it is moved to the EMAIL_SPOOL_FAILED_DIR subdirectory.
+
+        PARAMETERS
+            filename: The name of the file holding the email, relative
+                to the spool directory.
+            transport: The EmailTransport object to use.
+
+        RETURN VALUE
+            False if the email stays in the spool, True otherwise.
+        """
+        entry_filename = self.__filename(filename)
+        try:
+            with open(entry_filename, 'rb') as f:
+                entry = marshal.load(f)
+        except (IOError, EOFError, ValueError, TypeError):
+            warn('invalid email in spool: %s' % filename)
+            self.__set_aside(filename)
+            return True
+
+        permanent_failure = False
+        try:
+            sent = deliver_email(entry, transport)
+        except Exception, E:
+            warn('failed to deliver email %s: %s' % (filename, E))
+            sent = False
+            permanent_failure = is_permanent_failure(E)
+
+        if sent:
+            os.unlink(entry_filename)
+            file_email(entry)
+            return True
+
+        attempts = entry.get('attempts', 0) + 1
+        if permanent_failure or attempts >= EMAIL_DELIVERY_MAX_ATTEMPTS:
+            warn('giving up on email %s (moved to %s)'
+                 % (filename, EMAIL_SPOOL_FAILED_DIR))
+            self.__set_aside(filename)
+            return True
+        self.__write(entry_filename, marshal.dumps(dict(entry,
+                                                        attempts=attempts)))
+        return False
+
+    def failed(self):
+        """Return the sorted list of the files of the emails given up on.
+        """
+        try:
+            return sorted(os.listdir(self.__filename(EMAIL_SPOOL_FAILED_DIR)))
+        except OSError:
+            return []
+
+    def __read_state(self):
+        """Return the sequence number and date of the last email spooled.
+        """
+        try:
+            with open(self.__filename(EMAIL_SPOOL_STATE_FILENAME)) as f:
+                (seq, date) = f.read().split()
+            return (int(seq), int(date))
+        except (IOError, ValueError):
+            # No email spooled yet (or the state file got corrupted,
+            # in which case we start over, while still making sure
+            # that we do not reuse the name of an email still in
+            # the spool).
+            seq = max([int(filename[:-len(EMAIL_SPOOL_ENTRY_SUFFIX)])
+                       for filename in self.pending()] + [0])
+            return (seq, 0)
+
+    def __write(self, filename, contents):
+        """Atomically create (or replace) filename with the given contents.
+
+        PARAMETERS
+            filename: The name of the file to write.
+            contents: The new contents of the file.
+        """
+        (tmp_fd, tmp_file) = mkstemp(prefix='tmp-', dir=self.spool_dir)
+        try:
+            # Let the other users pushing to this repository update
+            # the file as well (mkstemp creates it with mode 0600).
+            os.fchmod(tmp_fd, 0664)
+            os.write(tmp_fd, contents)
+        finally:
+            os.close(tmp_fd)
+        os.rename(tmp_file, filename)
+
+    def __set_aside(self, filename):
+        """Move the given email to the EMAIL_SPOOL_FAILED_DIR directory.
+
+        PARAMETERS
+            filename: The name of the file holding the email, relative
+                to the spool directory.
+        """
+        failed_dir = self.__filename(EMAIL_SPOOL_FAILED_DIR)
+        make_shared_dir(failed_dir)
+        os.rename(self.__filename(filename),
+                  os.path.join(failed_dir, filename))
+
+    def __entry_filename(self, seq):
+        """Return the name of the file holding the email with the given seq.
+        """
+        return self.__filename('%012d%s' % (seq, EMAIL_SPOOL_ENTRY_SUFFIX))
+
+    def __filename(self, basename):
+        """Return the full name of the given file inside the spool."""
+        return os.path.join(self.spool_dir, basename)
+
+
+def deliver_email(entry, transport):
+    """Deliver the given email.
+
+    PARAMETERS
+        entry: A dictionary describing the email (see EmailSpool).
+        transport: The EmailTransport object to use.
+
+    RETURN VALUE
+        True if the email was sent, False otherwise.
+
+    REMARKS
+        If the GIT_HOOKS_TESTSUITE_MODE environment variable
+        is set, then a trace of the email is printed, instead
+        of sending it.  This is for testing purposes.  The Date:
+        header is also omitted from that trace, since it would
+        make the output depend on when the testsuite is run.
+    """
+    if 'GIT_HOOKS_TESTSUITE_MODE' in os.environ:
+        # Use debug level 0 to make sure that the trace is always
+        # printed.
+        debug(entry['message'], level=0)
+        return True
+    else:  # pragma: no cover (do not want real emails during testing)
+        from email.utils import formatdate
+        return transport.sendmail(
+            entry['from'], entry['recipients'],
+            'Date: %s\n%s' % (formatdate(entry['date'], localtime=True),
+                              entry['message']))
+
+
+def file_email(entry):
+    """Call the filer command of the given email, if any.
+
+    Failures are only reported, since the email has already been sent
+    at this point.
+
+    PARAMETERS
+        entry: A dictionary describing the email (see EmailSpool).
+    """
+    if entry['filer_cmd'] is None:
+        return
+    try:
+        p = Popen(entry['filer_cmd'], stdin=PIPE, stdout=PIPE, stderr=STDOUT)
+        out, _ = p.communicate(entry['filer_input'])
+    except OSError, E:
+        warn('failed to run %s: %s' % (entry['filer_cmd'][0], E))
+        return
+    if p.returncode != 0:
+        print out
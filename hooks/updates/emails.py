@@ -1,28 +1,17 @@
 """Email helpers for sending update-related emails."""
 
 from config import git_config
-from email.header import Header
-from email.mime.text import MIMEText
-from email.utils import getaddresses, parseaddr
 from errors import InvalidUpdate
 from git import get_module_name
 import os
 from string import strip
-from subprocess import Popen, PIPE, STDOUT
-from time import sleep
-from updates.sendmail import sendmail
-from utils import debug, get_user_name, get_user_full_name
+from updates.email_spool import EmailSpool
+from utils import get_user_name, get_user_full_name
 
 # All commit emails should be sent to the following email address
 # for filing/archiving purposes...
 FILER_EMAIL = 'file-ci@gnat.com'
 
-# The delay (in seconds) between each email being sent out.
-# The purpose of the delay is to help separate each email
-# in time, in order to increase our chances of having each
-# one of them delivered in order.
-EMAIL_DELAY_IN_SECONDS = 5
-
 
 class EmailInfo(object):
     """Aggregates various pieces of info needed to send emails.
@@ -89,34 +78,13 @@ class EmailQueue(object):
         self.queue.append(email)
 
     def flush(self):
-        """Send all enqueued emails...
-
-        ... in the same order that they were enqueued.  A delay
-        of EMAIL_DELAY_IN_SECONDS is also introduced between
-        emails.
+        """Spool all enqueued emails...
 
-        REMARKS
-            If the GIT_HOOKS_TESTSUITE_MODE environment variable
-            is set, then a trace of the delay is printed, instead
-            of actually delaying the execution.  Since emails are
-            not actually sent when in GIT_HOOKS_TESTSUITE_MODE,
-            there is no point in waiting for this delay.
+        ... in the same order that they were enqueued.  The emails
+        are only added to the EmailSpool, and still need to be
+        delivered afterwards (see EmailSpool.deliver).
         """
-        nb_emails_left = len(self.queue)
-        for email in self.queue:
-            email.send()
-            nb_emails_left -= 1
-            if nb_emails_left > 0:
-                # Need a small delay until we can send the next one.
-                if 'GIT_HOOKS_TESTSUITE_MODE' in os.environ:
-                    # For the testsuite, print a debug trace in place
-                    # of delaying the execution.  Use debug level 0
-                    # to make sure it is always printed (to make sure
-                    # the testsuite always alerts us if there is any
-                    # change in the delay policy).
-                    debug('inter-email delay...', level=0)
-                else:  # pragma: no cover (do not want delays during testing)
-                    sleep(EMAIL_DELAY_IN_SECONDS)
+        EmailSpool().add([email.spool_entry() for email in self.queue])
         self.queue = []
 
 
@@ -186,18 +154,21 @@ class Email(object):
         """
         EmailQueue().enqueue(self)
 
-    def send(self):
-        """Perform all send operations related to this email...
+    def spool_entry(self):
+        """Return the description of this email to be added to the spool.
 
-        These consists in:
-            - send the notification email;
-            - call self.filer_cmd if not None.
-
-        REMARKS
-            If the GIT_HOOKS_TESTSUITE_MODE environment variable
-            is set, then a trace of the email is printed, instead
-            of sending it.  This is for testing purposes.
+        Sending an email consists in:
+            - sending the notification email;
+            - calling self.filer_cmd if not None.
+        This method returns a dictionary with all the information
+        needed to perform these operations (see EmailSpool).
         """
+        # The email package is fairly expensive to load, so only
+        # import it when we actually need it.  This is the case
+        # in the other functions of this module as well.
+        from email.mime.text import MIMEText
+        from email.utils import getaddresses
+
         e_msg = MIMEText(self.__email_body_with_diff)
 
         # Create the email's header.
@@ -226,16 +197,12 @@ class Email(object):
                                             + e_msg.get_all('Cc', [])
                                             + e_msg.get_all('Bcc', []))]
 
-        if 'GIT_HOOKS_TESTSUITE_MODE' in os.environ:
-            # Use debug level 0 to make sure that the trace is always
-            # printed.
-            debug(e_msg.as_string(), level=0)
-        else:  # pragma: no cover (do not want real emails during testing)
-            sendmail(self.email_info.email_from, email_recipients,
-                     e_msg.as_string(), 'localhost')
-
-        if self.filer_cmd is not None:
-            self.__call_filer_cmd()
+        return {'from': self.email_info.email_from,
+                'recipients': email_recipients,
+                'message': e_msg.as_string(),
+                'filer_cmd': self.filer_cmd,
+                'filer_input': (self.__filer_input
+                                if self.filer_cmd is not None else None)}
 
     @property
     def __email_body_with_diff(self):
@@ -264,30 +231,23 @@ class Email(object):
             email_body += diff
         return email_body
 
-    def __call_filer_cmd(self):
-        """Call self.filer_cmd to get self.email_body filed.
+    @property
+    def __filer_input(self):
+        """Return the contents to be filed by self.filer_cmd.
 
         The contents that gets filed is a slightly augmented version
-        of self.email to provide a little context of what's being
+        of self.email_body to provide a little context of what's being
         changed.
-
-        Prints a message on stdout in case of error returned during
-        the call.
         """
         ref_name = self.ref_name
         if ref_name.startswith('refs/heads/'):
             # Replace the reference name by something a little more
             # intelligible for normal users.
             ref_name = 'The %s branch' % ref_name[11:]
-        to_be_filed = ('%s has been updated by %s:'
-                       % (ref_name, self.email_info.email_from)
-                       + '\n\n'
-                       + self.email_body)
-
-        p = Popen(self.filer_cmd, stdin=PIPE, stdout=PIPE, stderr=STDOUT)
-        out, _ = p.communicate(to_be_filed)
-        if p.returncode != 0:
-            print out
+        return ('%s has been updated by %s:'
+                % (ref_name, self.email_info.email_from)
+                + '\n\n'
+                + self.email_body)
 
 
 def sanitized_email_header_field(field_body):
@@ -326,6 +286,7 @@ def sanitized_email_header_field(field_body):
         # that situation, and just send the header as is.
         return field_body
 
+    from email.header import Header
     return Header(field_body, encoding).encode()
 
 
@@ -340,6 +301,8 @@ def sanitized_email_address(email_address):
     PARAMETERS
         email_address: A string containing an email address.
     """
+    from email.utils import parseaddr
+
     email_address = strip(email_address)
     gecos, email_spec = parseaddr(email_address)
     if not gecos:
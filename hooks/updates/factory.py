@@ -1,18 +1,6 @@
 """A module providing an AbstractUpdate factory."""
 
 from git import is_null_rev, get_object_type
-from updates.branches.creation import BranchCreation
-from updates.branches.deletion import BranchDeletion
-from updates.branches.update import BranchUpdate
-from updates.notes.creation import NotesCreation
-from updates.notes.deletion import NotesDeletion
-from updates.notes.update import NotesUpdate
-from updates.tags.atag_creation import AnnotatedTagCreation
-from updates.tags.atag_update import AnnotatedTagUpdate
-from updates.tags.atag_deletion import AnnotatedTagDeletion
-from updates.tags.ltag_creation import LightweightTagCreation
-from updates.tags.ltag_update import LightweightTagUpdate
-from updates.tags.ltag_deletion import LightweightTagDeletion
 
 # The different types of reference updates:
 #    - CREATE: The reference is new and has just been created;
@@ -22,31 +10,47 @@ from updates.tags.ltag_deletion import LightweightTagDeletion
 # These constants act as poor-man's enumerations.
 (CREATE, DELETE, UPDATE) = range(3)
 
+# The classes handling each type of update.  Each class is identified
+# by the name of the module where it is defined, and its name; this
+# allows us to only import the modules we actually need.
+BRANCH_CREATION = ('updates.branches.creation', 'BranchCreation')
+BRANCH_DELETION = ('updates.branches.deletion', 'BranchDeletion')
+BRANCH_UPDATE = ('updates.branches.update', 'BranchUpdate')
+NOTES_CREATION = ('updates.notes.creation', 'NotesCreation')
+NOTES_DELETION = ('updates.notes.deletion', 'NotesDeletion')
+NOTES_UPDATE = ('updates.notes.update', 'NotesUpdate')
+ATAG_CREATION = ('updates.tags.atag_creation', 'AnnotatedTagCreation')
+ATAG_DELETION = ('updates.tags.atag_deletion', 'AnnotatedTagDeletion')
+ATAG_UPDATE = ('updates.tags.atag_update', 'AnnotatedTagUpdate')
+LTAG_CREATION = ('updates.tags.ltag_creation', 'LightweightTagCreation')
+LTAG_DELETION = ('updates.tags.ltag_deletion', 'LightweightTagDeletion')
+LTAG_UPDATE = ('updates.tags.ltag_update', 'LightweightTagUpdate')
+
 REF_CHANGE_MAP = {
-    ('refs/heads/',        CREATE, 'commit'): BranchCreation,
-    ('refs/heads/',        DELETE, 'commit'): BranchDeletion,
-    ('refs/heads/',        UPDATE, 'commit'): BranchUpdate,
-    ('refs/for/',          CREATE, 'commit'): BranchCreation,
-    ('refs/for/',          DELETE, 'commit'): BranchDeletion,
-    ('refs/for/',          UPDATE, 'commit'): BranchUpdate,
-    ('refs/meta/',         CREATE, 'commit'): BranchCreation,
-    ('refs/meta/',         UPDATE, 'commit'): BranchUpdate,
+    ('refs/heads/',        CREATE, 'commit'): BRANCH_CREATION,
+    ('refs/heads/',        DELETE, 'commit'): BRANCH_DELETION,
+    ('refs/heads/',        UPDATE, 'commit'): BRANCH_UPDATE,
+    ('refs/for/',          CREATE, 'commit'): BRANCH_CREATION,
+    ('refs/for/',          DELETE, 'commit'): BRANCH_DELETION,
+    ('refs/for/',          UPDATE, 'commit'): BRANCH_UPDATE,
+    ('refs/meta/',         CREATE, 'commit'): BRANCH_CREATION,
+    ('refs/meta/',         UPDATE, 'commit'): BRANCH_UPDATE,
     ('refs/meta/',         DELETE, 'commit'): None,  # Not allowed for now.
-    ('refs/publish/',      CREATE, 'commit'): BranchCreation,
-    ('refs/publish/',      DELETE, 'commit'): BranchDeletion,
-    ('refs/publish/',      UPDATE, 'commit'): BranchUpdate,
-    ('refs/drafts/',       CREATE, 'commit'): BranchCreation,
-    ('refs/drafts/',       DELETE, 'commit'): BranchDeletion,
-    ('refs/drafts/',       UPDATE, 'commit'): BranchUpdate,
-    ('refs/notes/commits', CREATE, 'commit'): NotesCreation,
-    ('refs/notes/commits', DELETE, 'commit'): NotesDeletion,
-    ('refs/notes/commits', UPDATE, 'commit'): NotesUpdate,
-    ('refs/tags/',         CREATE, 'tag'):    AnnotatedTagCreation,
-    ('refs/tags/',         DELETE, 'tag'):    AnnotatedTagDeletion,
-    ('refs/tags/',         UPDATE, 'tag'):    AnnotatedTagUpdate,
-    ('refs/tags/',         CREATE, 'commit'): LightweightTagCreation,
-    ('refs/tags/',         DELETE, 'commit'): LightweightTagDeletion,
-    ('refs/tags/',         UPDATE, 'commit'): LightweightTagUpdate,
+    ('refs/publish/',      CREATE, 'commit'): BRANCH_CREATION,
+    ('refs/publish/',      DELETE, 'commit'): BRANCH_DELETION,
+    ('refs/publish/',      UPDATE, 'commit'): BRANCH_UPDATE,
+    ('refs/drafts/',       CREATE, 'commit'): BRANCH_CREATION,
+    ('refs/drafts/',       DELETE, 'commit'): BRANCH_DELETION,
+    ('refs/drafts/',       UPDATE, 'commit'): BRANCH_UPDATE,
+    ('refs/notes/commits', CREATE, 'commit'): NOTES_CREATION,
+    ('refs/notes/commits', DELETE, 'commit'): NOTES_DELETION,
+    ('refs/notes/commits', UPDATE, 'commit'): NOTES_UPDATE,
+    ('refs/tags/',         CREATE, 'tag'):    ATAG_CREATION,
+    ('refs/tags/',         DELETE, 'tag'):    ATAG_DELETION,
+    ('refs/tags/',         UPDATE, 'tag'):    ATAG_UPDATE,
+    ('refs/tags/',         CREATE, 'commit'): LTAG_CREATION,
+    ('refs/tags/',         DELETE, 'commit'): LTAG_DELETION,
+    ('refs/tags/',         UPDATE, 'commit'): LTAG_UPDATE,
 }
 
 
@@ -83,5 +87,17 @@ def new_update(ref_name, old_rev, new_rev, all_refs, submitter_email):
     if new_cls is None:
         return None
 
+    new_cls = update_class(new_cls)
     return new_cls(ref_name, old_rev, new_rev, all_refs,
                    submitter_email)
+
+
+def update_class(class_id):
+    """Return the class identified by class_id, importing it if needed.
+
+    PARAMETERS
+        class_id: One of the class identifiers used in REF_CHANGE_MAP.
+    """
+    (module_name, class_name) = class_id
+    module = __import__(module_name, fromlist=[class_name])
+    return getattr(module, class_name)
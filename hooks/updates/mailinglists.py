@@ -3,7 +3,12 @@
 from config import git_config
 import os
 from subprocess import Popen, PIPE
-from utils import warn
+from utils import debug, warn
+
+# A dictionary of the email addresses returned by the hooks.mailinglist
+# scripts, indexed by (script_filename, frozenset_of_changed_files).
+# The order of the files passed to the script is assumed not to matter.
+MAILINGLIST_SCRIPT_MEMO = {}
 
 
 def is_mailinglist_script(name):
@@ -28,19 +33,84 @@ def get_emails_from_script(script_filename, changed_files):
     convention, passing nothing via stdin (no file changed) should
     trigger the script to return all email addresses.
 
+    The result is memoized (see MAILINGLIST_SCRIPT_MEMO), so the script
+    is only called once for any given set of changed files (unless
+    it fails).
+
     PARAMETERS
         script_filename: The name of the script to execute.
         changed_files: A list of files to pass to the script (via stdin).
             None is also accepted in place of an empty list.
     """
-    input_str = '' if changed_files is None else '\n'.join(changed_files)
+    key = (script_filename, frozenset(changed_files or ()))
+    if key not in MAILINGLIST_SCRIPT_MEMO:
+        input_str = '' if changed_files is None else '\n'.join(changed_files)
+
+        p = Popen([script_filename], stdin=PIPE, stdout=PIPE)
+        (output, _) = p.communicate(input=input_str)
+        if p.returncode != 0:
+            warn('!!! %s failed with error code: %d.'
+                 % (script_filename, p.returncode))
+            # Do not memoize failures, so that we try again
+            # next time.
+            return output.splitlines()
+        MAILINGLIST_SCRIPT_MEMO[key] = output.splitlines()
+    return MAILINGLIST_SCRIPT_MEMO[key]
+
+
+def get_emails_from_script_batch(script_filename, commit_files):
+    """Run the given script once to get the emails for several commits.
+
+    The script is called with the "--batch" command-line option, and
+    the following input on stdin: For each commit, a line with the word
+    "commit", the commit's SHA1, and the number of files changed by
+    the commit (space-separated), followed by the names of these files
+    (one per line).  The script's output is expected to contain,
+    for each commit, a line with the word "commit" and the commit's
+    SHA1 (space-separated), followed by the email addresses for that
+    commit (one per line).
+
+    The result for each commit is added to MAILINGLIST_SCRIPT_MEMO.
+    If the script fails or returns some invalid output, this function
+    records nothing, so that the script gets called again for each
+    commit, using the line-based protocol (see get_emails_from_script).
+
+    PARAMETERS
+        script_filename: The name of the script to execute.
+        commit_files: A list of (commit SHA1, list of files changed
+            by that commit) tuples.
+    """
+    input_lines = []
+    for (rev, changed_files) in commit_files:
+        input_lines.append('commit %s %d' % (rev, len(changed_files)))
+        input_lines.extend(changed_files)
 
-    p = Popen([script_filename], stdin=PIPE, stdout=PIPE)
-    (output, _) = p.communicate(input=input_str)
+    p = Popen([script_filename, '--batch'], stdin=PIPE, stdout=PIPE)
+    (output, _) = p.communicate(input=''.join('%s\n' % line
+                                              for line in input_lines))
     if p.returncode != 0:
-        warn('!!! %s failed with error code: %d.'
-             % (script_filename, p.returncode))
-    return output.splitlines()
+        debug('%s --batch failed with error code: %d'
+              % (script_filename, p.returncode), level=2)
+        return
+
+    emails_map = {}
+    emails = None
+    for line in output.splitlines():
+        if line.startswith('commit '):
+            emails = emails_map.setdefault(line[7:].strip(), [])
+        elif emails is not None:
+            emails.append(line)
+        else:
+            break
+    if emails is None or set(emails_map) != set(rev for (rev, _)
+                                                in commit_files):
+        debug('%s --batch returned invalid output' % script_filename,
+              level=2)
+        return
+
+    for (rev, changed_files) in commit_files:
+        MAILINGLIST_SCRIPT_MEMO[(script_filename, frozenset(changed_files))] \
+            = emails_map[rev]
 
 
 def expanded_mailing_list(get_files_changed_cb):
@@ -68,3 +138,39 @@ def expanded_mailing_list(get_files_changed_cb):
         else:
             result.append(entry)
     return result
+
+
+def batch_expand_mailing_lists(commit_list):
+    """Prepare the expansion of hooks.mailinglist for all given commits.
+
+    If the hooks.mailinglist-batch config option is set, call each
+    hooks.mailinglist script once for all commits (using the "batch"
+    protocol, see get_emails_from_script_batch), rather than once
+    per commit.  The result is memoized, so that the subsequent calls
+    to expanded_mailing_list for these commits do not need to call
+    the scripts again.
+
+    PARAMETERS
+        commit_list: A list of CommitInfo objects.
+    """
+    if not git_config('hooks.mailinglist-batch') or len(commit_list) < 2:
+        return
+    scripts = [entry for entry in git_config('hooks.mailinglist')
+               if is_mailinglist_script(entry)]
+    if not scripts:
+        return
+
+    for script_filename in scripts:
+        # The files changed by each commit whose recipients are not
+        # known yet (only one commit for any given set of files).
+        commit_files = []
+        known_file_sets = set()
+        for commit in commit_list:
+            file_set = frozenset(commit.files_changed())
+            if ((script_filename, file_set) in MAILINGLIST_SCRIPT_MEMO
+                    or file_set in known_file_sets):
+                continue
+            known_file_sets.add(file_set)
+            commit_files.append((commit.rev, commit.files_changed()))
+        if commit_files:
+            get_emails_from_script_batch(script_filename, commit_files)
@@ -19,19 +19,161 @@ def sendmail(from_email, to_emails, mail_as_string, smtp_server):
         We prefer running sendmail over using smtplib because
         sendmail queues the email and retries a few times if
         the target server is unable to receive the email.
+
+        To send several emails, prefer using an EmailTransport object,
+        which reuses the same SMTP session for all the emails.
+    """
+    transport = EmailTransport(smtp_server)
+    try:
+        return transport.sendmail(from_email, to_emails, mail_as_string)
+    finally:
+        transport.close()
+
+
+def find_sendmail():
+    """Return the name of the sendmail program, or None if not found.
     """
     for sendmail in ('/usr/lib/sendmail', '/usr/sbin/sendmail'):
         if os.path.exists(sendmail):
-            p = Popen([sendmail] + to_emails,
-                      stdin=PIPE, stdout=PIPE, stderr=STDOUT)
-            out, _ = p.communicate(mail_as_string)
-            if p.returncode != 0:
-                print out
-            return p.returncode == 0
-
-    # Else try using smtplib
+            return sendmail
+    return None
+
+
+def is_permanent_failure(exception):
+    """Return True if exception reports a permanent delivery failure.
+
+    PARAMETERS
+        exception: An exception raised while sending an email
+            (see EmailTransport.sendmail).
+
+    RETURN VALUE
+        True if the exception means that the SMTP server rejected
+        the email (SMTP reply codes 5xx), and thus that trying again
+        would be pointless.  False otherwise.
+    """
     import smtplib
-    s = smtplib.SMTP(smtp_server)
-    s.sendmail(from_email, to_emails, mail_as_string)
-    s.quit()
-    return True
+
+    if isinstance(exception, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500
+                   for (code, _) in exception.recipients.itervalues())
+    return (isinstance(exception, smtplib.SMTPResponseException)
+            and exception.smtp_code >= 500)
+
+
+class EmailTransport(object):
+    """An object sending emails, with sendmail or smtplib.
+
+    When using smtplib, the SMTP session is kept open between
+    emails, so as to avoid the cost of opening a new connection
+    (and of the associated handshake) for each email.  If the session
+    gets closed by the server (Eg: after being idle for too long),
+    we reconnect and try again, once.
+
+    ATTRIBUTES
+        smtp_server: The SMTP server to use when sending emails
+            with smtplib ("host" or "host:port").
+        sendmail_exe: The name of the sendmail program to use,
+            or None if emails should be sent using smtplib.
+        sendmail_fallback: If True, and the first SMTP session
+            cannot be opened (Eg: no SMTP server listening on
+            localhost), use the sendmail program instead, if
+            available.
+        smtp: The SMTP session currently open (an smtplib.SMTP
+            object), or None if not connected.
+    """
+    def __init__(self, smtp_server, use_sendmail=True,
+                 sendmail_fallback=False):
+        """The constructor.
+
+        PARAMETERS
+            smtp_server: Same as the attribute.
+            use_sendmail: If True, use the sendmail program if
+                available (see the "sendmail" function above).
+                Otherwise, use smtplib.
+            sendmail_fallback: Same as the attribute.
+        """
+        self.smtp_server = smtp_server
+        self.sendmail_exe = find_sendmail() if use_sendmail else None
+        self.sendmail_fallback = sendmail_fallback
+        self.smtp = None
+
+    def sendmail(self, from_email, to_emails, mail_as_string):
+        """Send an email.
+
+        PARAMETERS
+            Same as the "sendmail" function above.
+
+        RETURNS
+            A boolean (sent / not sent)
+        """
+        if self.sendmail_exe is not None:
+            return self.__run_sendmail(to_emails, mail_as_string)
+
+        # The smtplib module is fairly expensive to load, so only
+        # import it when we actually need it.
+        import smtplib
+        import socket
+
+        if self.sendmail_fallback:
+            # Only fall back on the sendmail program when we cannot
+            # open the first session, so that all the emails get sent
+            # the same way.
+            self.sendmail_fallback = False
+            try:
+                self.smtp = smtplib.SMTP(self.smtp_server)
+            except socket.error:
+                self.sendmail_exe = find_sendmail()
+                if self.sendmail_exe is None:
+                    raise
+                return self.__run_sendmail(to_emails, mail_as_string)
+
+        for retry in (False, True):
+            try:
+                if self.smtp is None:
+                    self.smtp = smtplib.SMTP(self.smtp_server)
+                self.smtp.sendmail(from_email, to_emails, mail_as_string)
+                return True
+            except (smtplib.SMTPServerDisconnected, socket.error):
+                if retry:
+                    raise
+            except smtplib.SMTPResponseException, E:
+                # Error 421 means that the server is closing the
+                # session; anything else is a real delivery error.
+                if retry or E.smtp_code != 421:
+                    raise
+            # The session is no longer usable.  Try again with
+            # a new one.
+            self.close()
+
+    def __run_sendmail(self, to_emails, mail_as_string):
+        """Send an email using the sendmail program.
+
+        PARAMETERS
+            Same as self.sendmail, minus from_email (sendmail gets it
+            from the email's header).
+
+        RETURNS
+            A boolean (sent / not sent)
+        """
+        p = Popen([self.sendmail_exe] + to_emails,
+                  stdin=PIPE, stdout=PIPE, stderr=STDOUT)
+        out, _ = p.communicate(mail_as_string)
+        if p.returncode != 0:
+            print out
+        return p.returncode == 0
+
+    def close(self):
+        """Close the SMTP session, if open."""
+        if self.smtp is None:
+            return
+
+        import smtplib
+        import socket
+
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, socket.error):
+            # The session is probably already closed on the server
+            # side.  Make sure it is closed on our side too.
+            self.smtp.close()
+        self.smtp = None
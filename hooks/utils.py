@@ -1,10 +1,12 @@
-from datetime import datetime
+import errno
+import fcntl
 from os import environ
 import os
 import pwd
 import re
 import sys
 from tempfile import mkdtemp
+import time
 
 from config import git_config
 from errors import InvalidUpdate
@@ -155,52 +157,259 @@ def indent(text, indentation):
     return ''.join(indented)
 
 
-class FileLock(object):
-    """An object implementing file locking (work in "with" statement only).
+class ArgsNamespace(object):
+    """A simple object holding the command-line arguments as attributes.
 
-    The locking is relying on os.link being atomic, and thus only
-    works on Unix systems.
+    This is a lightweight replacement for argparse.Namespace, for
+    the scripts which parse their command-line by hand in the most
+    common case, to avoid the cost of loading the argparse module.
     """
-    def __init__(self, filename):
+    def __init__(self, **kwargs):
         """The constructor.
 
         PARAMETERS
-            filename: The name of the file to be locking.  If the file
-                does not exist at the time this class is instantiated,
-                it is automatically created.
+            **kwargs: The attributes of the new object, and their value.
         """
-        self.filename = filename
-        self.lock_filename = self.filename + '.lock'
-        # Make sure the file to be locked exists; if not, create it now.
-        if not os.path.exists(self.filename):
-            # Use mode 'a' instead of 'w' to avoid truncating the file
-            # if someone opens the same file at the same time.
-            open(self.filename, 'a').close()
-            os.chmod(self.filename, 0664)
+        self.__dict__.update(kwargs)
+
+
+# The name of the file used to lock the whole repository.
+REPO_LOCK_FILENAME = 'git-hooks::update.token'
+
+# The name of the directory containing the files used to lock
+# each reference individually.
+REF_LOCKS_DIR = 'git-hooks::ref-locks'
+
+# The initial and maximum delays (in seconds) between two attempts
+# at acquiring a lock (see UpdateLock).
+LOCK_RETRY_INITIAL_DELAY = 0.1
+LOCK_RETRY_MAX_DELAY = 2.0
+
+
+def warn_concurrent_push():
+    """Warn the user that another push is preventing the current one.
+    """
+    warn('-' * 69,
+         '--  Another user is currently pushing changes to this'
+         ' repository.  --',
+         '--  Please try again in another minute or two.       '
+         '              --',
+         '-' * 69,
+         prefix='')
+
+
+class UpdateLock(object):
+    """A lock for validating the update of some references (work in
+    "with" statement only).
+
+    Two locks are acquired: A lock on the whole repository, which is
+    shared unless the exclusive attribute is True, followed by one
+    exclusive lock for each of the references being updated.  This way,
+    pushes updating different references can be validated in parallel,
+    while the pushes which need the repository for themselves can still
+    be serialized with all the others.
+
+    The locks are implemented using fcntl.flock, and are thus released
+    automatically by the system if the process dies while holding them.
+    For compatibility with older versions of these hooks, the existence
+    of the REPO_LOCK_FILENAME + '.lock' file is considered as an exclusive
+    lock on the repository (Eg: created by an older version of these
+    hooks still running, or by an administrator wanting to temporarily
+    forbid all pushes), unless left behind by a process which no longer
+    exists (see is_stale_lock_file).
+
+    If a lock is already held by someone else, we retry with an
+    exponential backoff, until the hooks.lock-timeout config option
+    expires, after which the update is rejected.
+
+    ATTRIBUTES
+        ref_names: A sorted list of the names of the references
+            to lock.  The ordering guarantees that two pushes updating
+            the same references cannot deadlock.
+        exclusive: True if the lock on the repository is exclusive.
+        timeout: The maximum number of seconds to wait for the locks.
+    """
+    def __init__(self, ref_names, exclusive=False):
+        """The constructor.
+
+        PARAMETERS
+            ref_names: An iterable of the names of the references
+                to be locked.
+            exclusive: True if the lock on the whole repository should
+                be exclusive, False if it should be shared.
+        """
+        self.ref_names = sorted(set(ref_names))
+        self.exclusive = exclusive
+        self.timeout = max(git_config('hooks.lock-timeout'), 0)
+        # The file objects holding the locks we currently own.
+        self.__lock_files = []
 
     def __enter__(self):
+        deadline = time.time() + self.timeout
         try:
-            os.link(self.filename, self.lock_filename)
-            # Just in case the lock is accidently left behind, write
-            # some information that helps us track the author of
-            # the lock.
-            with open(self.lock_filename, 'w') as f:
-                f.write('locked by user %s at %s (pid = %d)\n'
-                        % (get_user_name(), str(datetime.now()), os.getpid()))
+            self.__acquire(REPO_LOCK_FILENAME,
+                           fcntl.LOCK_EX if self.exclusive
+                           else fcntl.LOCK_SH,
+                           deadline)
+            if self.ref_names and not os.path.isdir(REF_LOCKS_DIR):
+                try:
+                    os.mkdir(REF_LOCKS_DIR)
+                    os.chmod(REF_LOCKS_DIR, 0775)
+                except OSError:
+                    # Most likely created concurrently by another push.
+                    if not os.path.isdir(REF_LOCKS_DIR):
+                        raise
+            for ref_name in self.ref_names:
+                self.__acquire(ref_lock_filename(ref_name), fcntl.LOCK_EX,
+                               deadline)
         except:
-            # It would be better if the warning was part of the InvalidUpdate
-            # exception date, since a client handling the lock failure
-            # might have prefered to silence the warning???  But that would
-            # require us to add a keyword argument to handle error message
-            # prefixes. Good enough for now.
-            warn('-' * 69,
-                 '--  Another user is currently pushing changes to this'
-                 ' repository.  --',
-                 '--  Please try again in another minute or two.       '
-                 '              --',
-                 '-' * 69,
-                 prefix='')
-            raise InvalidUpdate
+            self.__release()
+            raise
+        return self
 
     def __exit__(self, type, value, traceback):
-        os.unlink(self.lock_filename)
+        self.__release()
+
+    def __acquire(self, filename, operation, deadline):
+        """Acquire a lock on the given file, waiting for it if needed.
+
+        Raise InvalidUpdate if the lock could not be acquired before
+        the deadline.
+
+        PARAMETERS
+            filename: The name of the file to lock.  It is created
+                if it does not exist.
+            operation: fcntl.LOCK_SH or fcntl.LOCK_EX.
+            deadline: The time after which we should give up waiting.
+        """
+        f = open_lock_file(filename)
+        self.__lock_files.append(f)
+
+        delay = LOCK_RETRY_INITIAL_DELAY
+        while True:
+            if (filename != REPO_LOCK_FILENAME
+                    or not legacy_lock_file_exists(filename + '.lock')):
+                try:
+                    fcntl.flock(f, operation | fcntl.LOCK_NB)
+                    return
+                except IOError, E:
+                    if E.errno not in (errno.EAGAIN, errno.EACCES):
+                        raise
+            if time.time() + delay > deadline:
+                warn_concurrent_push()
+                raise InvalidUpdate
+            debug('%s locked, retrying in %.1f seconds' % (filename, delay),
+                  level=3)
+            time.sleep(delay)
+            delay = min(delay * 2, LOCK_RETRY_MAX_DELAY)
+
+    def __release(self):
+        """Release all the locks we currently hold."""
+        # Release the locks in the reverse order of their acquisition.
+        while self.__lock_files:
+            # Closing the file releases the lock.
+            self.__lock_files.pop().close()
+
+
+def open_lock_file(filename):
+    """Open the given file, for locking it with fcntl.flock.
+
+    The file is created if it does not exist.  It is also closed
+    automatically in the programs we execute, since any of them
+    still running (Eg: a "git cat-file --batch" process) would
+    otherwise keep the lock for as long as it runs.
+
+    PARAMETERS
+        filename: The name of the file to open.
+
+    RETURN VALUE
+        A file object.
+    """
+    if not os.path.exists(filename):
+        # Use mode 'a' instead of 'w' to avoid truncating the file
+        # if someone opens the same file at the same time.
+        open(filename, 'a').close()
+        os.chmod(filename, 0664)
+    f = open(filename)
+    fcntl.fcntl(f, fcntl.F_SETFD,
+                fcntl.fcntl(f, fcntl.F_GETFD) | fcntl.FD_CLOEXEC)
+    return f
+
+
+def make_shared_dir(dirname):
+    """Create the given directory, if it does not exist.
+
+    The directory is made group-writable, since it is meant to be
+    shared by all the users pushing to the repository.
+
+    PARAMETERS
+        dirname: The name of the directory to create.
+    """
+    if not os.path.isdir(dirname):
+        try:
+            os.mkdir(dirname)
+            os.chmod(dirname, 0775)
+        except OSError:
+            # Most likely created concurrently by another push.
+            if not os.path.isdir(dirname):
+                raise
+
+
+def legacy_lock_file_exists(filename):
+    """Return True if the given lock file exists, and is not stale.
+
+    A stale lock file is deleted.
+
+    PARAMETERS
+        filename: The name of the lock file.
+    """
+    if not os.path.exists(filename):
+        return False
+    if not is_stale_lock_file(filename):
+        return True
+    debug('removing stale lock file: %s' % filename, level=2)
+    try:
+        os.unlink(filename)
+    except OSError:
+        # Most likely removed concurrently by another push.
+        pass
+    return False
+
+
+def is_stale_lock_file(filename):
+    """Return True if filename was left behind by a process now gone.
+
+    Older versions of these hooks recorded the PID of the process
+    owning the lock inside the lock file, as "(pid = <pid>)".  Lock
+    files without this information (Eg: created by hand) are never
+    considered stale.
+
+    PARAMETERS
+        filename: The name of the lock file.
+    """
+    try:
+        with open(filename) as f:
+            m = re.search(r'\(pid = (\d+)\)', f.read())
+    except IOError:
+        # The lock was probably released in the meantime.
+        return False
+    if m is None:
+        return False
+    try:
+        os.kill(int(m.group(1)), 0)
+    except OSError, E:
+        return E.errno == errno.ESRCH
+    return False
+
+
+def ref_lock_filename(ref_name):
+    """Return the name of the file used to lock the given reference.
+
+    PARAMETERS
+        ref_name: The name of a reference (Eg: refs/heads/master).
+    """
+    # Escape the '/' characters (and the '%' character used to
+    # escape them, so that different references always use
+    # different lock files).
+    return os.path.join(REF_LOCKS_DIR,
+                        ref_name.replace('%', '%25').replace('/', '%2F'))
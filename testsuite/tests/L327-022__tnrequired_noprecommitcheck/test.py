@@ -109,7 +109,6 @@ remote:
 remote:     This commit comes from an external source, and thus does not have
 remote:     a ticket number in the rh.  But that's OK, because it is on a branch
 remote:     for which pre-commit-checks are disabled.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -45,7 +45,6 @@ remote:
 remote: The branch 'headless' was created pointing to:
 remote:
 remote:  902092f... Forgot to update this.txt in the previous commit.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -85,7 +84,6 @@ remote: --- /dev/null
 remote: +++ b/this.txt
 remote: @@ -0,0 +1 @@
 remote: +some stuff.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -125,7 +123,6 @@ remote: --- /dev/null
 remote: +++ b/there
 remote: @@ -0,0 +1 @@
 remote: +That's where you can find it.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -192,7 +189,6 @@ remote:
 remote: The branch 'one-commit' was created pointing to:
 remote:
 remote:  ef3ab84... Initial commit.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -64,7 +64,6 @@ remote: Author: Joel Brobecker <brobecker@adacore.com>
 remote: Date:   Mon Jun 25 15:10:13 2012 -0700
 remote:
 remote:     Put some contents in file `a'.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
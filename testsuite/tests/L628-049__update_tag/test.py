@@ -73,7 +73,6 @@ remote: Author: Joel Brobecker <brobecker@adacore.com>
 remote: Date:   Thu Jun 28 11:24:42 2012 -0700
 remote:
 remote:     Added bar.c, and updated foo.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -66,7 +66,6 @@ remote: +Second line, in the middle.
 remote: +In the middle too!
 remote:  Third line.
 remote: +
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -100,7 +99,6 @@ remote:  Some file.
 remote: -Second line, in the middle.
 remote:  In the middle too!
 remote:  Third line.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
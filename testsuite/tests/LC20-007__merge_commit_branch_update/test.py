@@ -76,7 +76,6 @@ remote:
 remote:     New file README. Update a.
 remote:
 remote:     Some revision history info.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -26,7 +26,6 @@ remote:
 remote: The branch 'topic/resync' was created pointing to:
 remote:
 remote:  ffb05b4... Merge topic branch fsf-head.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -70,7 +69,6 @@ remote: +++ b/a
 remote: @@ -0,0 +1,2 @@
 remote: +Some stuff about a.
 remote: +Hello world.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -118,7 +116,6 @@ remote: --- /dev/null
 remote: +++ b/c
 remote: @@ -0,0 +1 @@
 remote: +Some other stuff about c.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
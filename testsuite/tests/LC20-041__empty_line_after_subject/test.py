@@ -132,7 +132,6 @@ remote:     Add second bottom to top.
 remote:     The second line should have been an empty line.
 remote:     This is very bad, so try to reject the update if detected on
 remote:     a branch that does not have noprecommitcheck.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
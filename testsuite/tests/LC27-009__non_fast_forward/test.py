@@ -54,7 +54,6 @@ remote: Author: Joel Brobecker <brobecker@adacore.com>
 remote: Date:   Sat May 5 15:23:36 2012 -0700
 remote:
 remote:     Minor modifications.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
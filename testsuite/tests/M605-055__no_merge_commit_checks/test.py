@@ -47,7 +47,6 @@ remote: --- /dev/null
 remote: +++ b/b
 remote: @@ -0,0 +1 @@
 remote: +A second file. No chance of conflict.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -65,7 +65,6 @@ remote:  int second (void)
 remote:  {
 remote: +  return 1;
 remote:  }
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
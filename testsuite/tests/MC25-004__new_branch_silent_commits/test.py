@@ -72,7 +72,6 @@ remote: Author: Joel Brobecker <brobecker@adacore.com>
 remote: Date:   Wed Dec 25 11:05:54 2013 +0400
 remote:
 remote:     Add .gitignore file.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -105,7 +104,6 @@ remote: +++ b/.gitignore
 remote: @@ -0,0 +1,2 @@
 remote: +# Backup files.
 remote: +*~
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -133,7 +131,6 @@ remote: Diff:
 remote:
 remote:  source.c | 1 +
 remote:  1 file changed, 1 insertion(+)
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -54,7 +54,6 @@ remote:
 remote: The branch 'config' was created in namespace 'refs/meta' pointing to:
 remote:
 remote:  85d4247... Initial config for project
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
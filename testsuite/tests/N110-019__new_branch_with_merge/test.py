@@ -57,7 +57,6 @@ remote: Author: Joel Brobecker <brobecker@adacore.com>
 remote: Date:   Fri Jan 10 16:39:17 2014 +0400
 remote:
 remote:     New file: c.txt (currently nearly empty).
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -48,7 +48,6 @@ remote: --- /dev/null
 remote: +++ b/testsuite/tests/.gitattributes
 remote: @@ -0,0 +1 @@
 remote: +*/test.py       no-precommit-check
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
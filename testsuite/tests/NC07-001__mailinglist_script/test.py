@@ -264,7 +264,6 @@ remote: Author: Joel Brobecker <brobecker@adacore.com>
 remote: Date:   Sat Dec 13 19:09:43 2014 -0500
 remote:
 remote:     Implement new GDB feature.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -413,7 +412,6 @@ remote: --- /dev/null
 remote: +++ b/4207b94cadc3c1be0edb4f6df5670f0311c267f3
 remote: @@ -0,0 +1 @@
 remote: +A bfd note.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -448,7 +446,6 @@ remote: --- /dev/null
 remote: +++ b/cd2f5d40776eee5a47dc821eddd9a7c6c0ed436d
 remote: @@ -0,0 +1 @@
 remote: +A short GDB note.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -70,7 +70,6 @@ remote: +struct bfd
 remote: +{
 remote: +  int handle;
 remote: +};
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -103,7 +102,6 @@ remote: @@ -1 +1,3 @@
 remote:  /* top.h */
 remote: +
 remote: +extern void start_mainloop (void);
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -149,7 +147,6 @@ remote: --- /dev/null
 remote: +++ b/gdb/README
 remote: @@ -0,0 +1 @@
 remote: +Note that GDB depends on BFD.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -89,7 +89,6 @@ remote: +++ b/a
 remote: @@ -0,0 +1,2 @@
 remote: +Some stuff about a.
 remote: +Hello world.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -137,7 +136,6 @@ remote: --- /dev/null
 remote: +++ b/c
 remote: @@ -0,0 +1 @@
 remote: +Some other stuff about c.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -27,7 +27,6 @@ remote: Date:   Sat May 5 15:23:36 2012 -0700
 remote:
 remote:     Minor modifications.
 remote:
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -47,7 +46,6 @@ remote: Date:   Thu May 10 15:20:05 2012 -0700
 remote:
 remote:     1 modified file, 1 new file.
 remote:
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -67,7 +65,6 @@ remote: Date:   Thu May 10 15:21:06 2012 -0700
 remote:
 remote:     Modify `c', delete `b'.
 remote:
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
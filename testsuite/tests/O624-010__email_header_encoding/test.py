@@ -40,7 +40,6 @@ remote: @@ -1,2 +1,3 @@
 remote:  This is a file
 remote:  with a second line.
 remote: +And now a third line.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 8bit
@@ -54,7 +54,6 @@ remote:
 remote: The branch 'fixed' was created pointing to:
 remote:
 remote:  8a43f9e... fix defaultbranch name in .gitreview
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -86,7 +85,6 @@ remote: +++ b/a
 remote: @@ -1 +1,2 @@
 remote:  Some file.
 remote: +----------
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -73,7 +73,6 @@ remote: Author: Joel Brobecker <brobecker@adacore.com>
 remote: Date:   Sat Apr 23 19:16:57 2016 -0400
 remote:
 remote:     2016 copyright header yearly update.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -137,7 +137,6 @@ remote:     Updated a.
 remote:
 remote:     Just added a little bit of text inside file a.
 remote:     Thought about doing something else, but not really necessary.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
@@ -30,7 +30,6 @@ remote:
 remote: The branch 'github/pull/19' was created pointing to:
 remote:
 remote:  863805d... Update a.
-remote: DEBUG: inter-email delay...
 remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
 remote: MIME-Version: 1.0
 remote: Content-Transfer-Encoding: 7bit
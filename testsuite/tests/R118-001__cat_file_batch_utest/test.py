@@ -0,0 +1,43 @@
+from support import *
+
+
+class TestRun(TestCase):
+    def test_cat_file_batch(self):
+        """Unit test the git module's cat-file batch process.
+        """
+        self.enable_unit_test()
+
+        from git import (CalledProcessError, file_exists, get_object_contents,
+                         get_object_info, get_object_type, is_valid_commit)
+
+        self.assertEqual(get_object_info('master:a'),
+                         ('01d0f124f86599aac247a7471aa98a583ecd027e',
+                          'blob', 36))
+        self.assertEqual(get_object_type('master'), 'commit')
+        self.assertTrue(is_valid_commit(
+            'd065089ff184d97934c010ccd0e7e8ed94cb7165'))
+        self.assertFalse(is_valid_commit(
+            '8ef2d60c830f70e70268ce886209805f5010db1f'))
+        self.assertTrue(file_exists('master', 'a'))
+        self.assertFalse(file_exists('master', 'b'))
+        self.assertFalse(file_exists('master', 'b\nc'))
+
+        # The contents should be returned untouched (no stripping).
+        self.assertEqual(get_object_contents('master:a'),
+                         'Some file.\nSecond line.\nThird line.\n')
+        self.assertIsNone(get_object_contents('master:b'))
+
+        with self.assertRaises(CalledProcessError):
+            get_object_type('8ef2d60c830f70e70268ce886209805f5010db1f')
+
+        # Verify that queries made after changing the current
+        # directory are answered using the new repository.
+        cd('%s/repo' % TEST_DIR)
+        self.assertEqual(get_object_contents('HEAD:a'),
+                         'Some file.\nSecond line, in the middle.\n'
+                         'In the middle too!\nThird line.\n\n')
+        self.assertFalse(file_exists('HEAD', 'project.config'))
+
+
+if __name__ == '__main__':
+    runtests()
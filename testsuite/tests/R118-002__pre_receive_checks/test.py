@@ -0,0 +1,253 @@
+from support import *
+
+class TestRun(TestCase):
+    def test_push_commits_and_tag(self):
+        """Push multiple references validated by the pre-receive hook.
+        """
+        cd ('%s/repo' % TEST_DIR)
+
+        self.set_debug_level(1)
+
+        # Push master along with a lightweight tag, which is not
+        # allowed in this repository.  The pre-receive hook should
+        # validate both updates, and reject the entire push.
+        p = Run('git push origin master some-tag'.split())
+        expected_out = """\
+remote: DEBUG: validate_ref_update (refs/heads/master, 426fba3571947f6de7f967e885a3168b9df7004a, dd6165c96db712d3e918fb5c61088b171b5e7cab)
+remote: DEBUG: update base: 426fba3571947f6de7f967e885a3168b9df7004a
+remote: DEBUG: (commit-per-commit style checking)
+remote: DEBUG: style_check_commit(old_rev=426fba3571947f6de7f967e885a3168b9df7004a, new_rev=4f0f08f46daf6f5455cf90cdc427443fe3b32fa3)
+remote: *** cvs_check: `repo' < `a' `b' `c'
+remote: DEBUG: style_check_commit(old_rev=4f0f08f46daf6f5455cf90cdc427443fe3b32fa3, new_rev=4a325b31f594b1dc2c66ac15c4b6b68702bd0cdf)
+remote: *** cvs_check: `repo' < `c' `d'
+remote: DEBUG: style_check_commit(old_rev=4a325b31f594b1dc2c66ac15c4b6b68702bd0cdf, new_rev=cc8d2c2637bda27f0bc2125181dd2f8534d16222)
+remote: *** cvs_check: `repo' < `c'
+remote: DEBUG: style_check_commit(old_rev=cc8d2c2637bda27f0bc2125181dd2f8534d16222, new_rev=dd6165c96db712d3e918fb5c61088b171b5e7cab)
+remote: *** cvs_check: `repo' < `d'
+remote: DEBUG: validate_ref_update (refs/tags/some-tag, 0000000000000000000000000000000000000000, 4a325b31f594b1dc2c66ac15c4b6b68702bd0cdf)
+remote: *** Lightweight tags (some-tag) are not allowed in this repository.
+remote: *** Use 'git tag [ -a | -s ]' for tags you want to propagate.
+To ../bare/repo.git
+ ! [remote rejected] master -> master (pre-receive hook declined)
+ ! [remote rejected] some-tag -> some-tag (pre-receive hook declined)
+error: failed to push some refs to '../bare/repo.git'
+"""
+
+        self.assertNotEqual(p.status, 0, p.image)
+        self.assertRunOutputEqual(p, expected_out)
+
+        # Now, push master along with a new branch pointing to
+        # the same commit.  Since the updates are validated in
+        # order, the commits being pushed should only be checked
+        # once (for master).
+        p = Run('git push origin master master:new-branch'.split())
+        expected_out = """\
+remote: DEBUG: validate_ref_update (refs/heads/master, 426fba3571947f6de7f967e885a3168b9df7004a, dd6165c96db712d3e918fb5c61088b171b5e7cab)
+remote: DEBUG: update base: 426fba3571947f6de7f967e885a3168b9df7004a
+remote: DEBUG: (commit-per-commit style checking)
+remote: DEBUG: style_check_commit(old_rev=426fba3571947f6de7f967e885a3168b9df7004a, new_rev=4f0f08f46daf6f5455cf90cdc427443fe3b32fa3)
+remote: *** cvs_check: `repo' < `a' `b' `c'
+remote: DEBUG: style_check_commit(old_rev=4f0f08f46daf6f5455cf90cdc427443fe3b32fa3, new_rev=4a325b31f594b1dc2c66ac15c4b6b68702bd0cdf)
+remote: *** cvs_check: `repo' < `c' `d'
+remote: DEBUG: style_check_commit(old_rev=4a325b31f594b1dc2c66ac15c4b6b68702bd0cdf, new_rev=cc8d2c2637bda27f0bc2125181dd2f8534d16222)
+remote: *** cvs_check: `repo' < `c'
+remote: DEBUG: style_check_commit(old_rev=cc8d2c2637bda27f0bc2125181dd2f8534d16222, new_rev=dd6165c96db712d3e918fb5c61088b171b5e7cab)
+remote: *** cvs_check: `repo' < `d'
+remote: DEBUG: validate_ref_update (refs/heads/new-branch, 0000000000000000000000000000000000000000, dd6165c96db712d3e918fb5c61088b171b5e7cab)
+remote: DEBUG: update base: dd6165c96db712d3e918fb5c61088b171b5e7cab
+remote: DEBUG: post_receive_one(ref_name=refs/heads/master
+remote:                         old_rev=426fba3571947f6de7f967e885a3168b9df7004a
+remote:                         new_rev=dd6165c96db712d3e918fb5c61088b171b5e7cab)
+remote: DEBUG: update base: 426fba3571947f6de7f967e885a3168b9df7004a
+remote: DEBUG: post_receive_one(ref_name=refs/heads/new-branch
+remote:                         old_rev=0000000000000000000000000000000000000000
+remote:                         new_rev=dd6165c96db712d3e918fb5c61088b171b5e7cab)
+remote: DEBUG: update base: dd6165c96db712d3e918fb5c61088b171b5e7cab
+remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
+remote: MIME-Version: 1.0
+remote: Content-Transfer-Encoding: 7bit
+remote: From: Test Suite <testsuite@adacore.com>
+remote: To: git-hooks-ci@example.com, user@example.com
+remote: Bcc: file-ci@gnat.com
+remote: Subject: [repo] Minor modifications.
+remote: X-Act-Checkin: repo
+remote: X-Git-Author: Joel Brobecker <brobecker@adacore.com>
+remote: X-Git-Refname: refs/heads/master
+remote: X-Git-Oldrev: 426fba3571947f6de7f967e885a3168b9df7004a
+remote: X-Git-Newrev: 4f0f08f46daf6f5455cf90cdc427443fe3b32fa3
+remote:
+remote: commit 4f0f08f46daf6f5455cf90cdc427443fe3b32fa3
+remote: Author: Joel Brobecker <brobecker@adacore.com>
+remote: Date:   Sat May 5 15:23:36 2012 -0700
+remote:
+remote:     Minor modifications.
+remote:
+remote: Diff:
+remote: ---
+remote:  a | 2 +-
+remote:  b | 2 +-
+remote:  c | 1 -
+remote:  3 files changed, 2 insertions(+), 3 deletions(-)
+remote:
+remote: diff --git a/a b/a
+remote: index 78822b6..0a89c71 100644
+remote: --- a/a
+remote: +++ b/a
+remote: @@ -1,2 +1,2 @@
+remote:  This is a file
+remote: -with a second line.
+remote: +with a 2nd line.
+remote: diff --git a/b b/b
+remote: index 373ad20..6ac1308 100644
+remote: --- a/b
+remote: +++ b/b
+remote: @@ -1,3 +1,3 @@
+remote:  some contents inside
+remote:  that file
+remote: -that isn't really all that interesting.
+remote: +that is not really all that interesting.
+remote: diff --git a/c b/c
+remote: index 4bc3eed..e0f1ee1 100644
+remote: --- a/c
+remote: +++ b/c
+remote: @@ -1,2 +1 @@
+remote:  hello world.
+remote: -ZZ
+remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
+remote: MIME-Version: 1.0
+remote: Content-Transfer-Encoding: 7bit
+remote: From: Test Suite <testsuite@adacore.com>
+remote: To: git-hooks-ci@example.com, user@example.com
+remote: Bcc: file-ci@gnat.com
+remote: Subject: [repo] 1 modified file, 1 new file.
+remote: X-Act-Checkin: repo
+remote: X-Git-Author: Joel Brobecker <brobecker@adacore.com>
+remote: X-Git-Refname: refs/heads/master
+remote: X-Git-Oldrev: 4f0f08f46daf6f5455cf90cdc427443fe3b32fa3
+remote: X-Git-Newrev: 4a325b31f594b1dc2c66ac15c4b6b68702bd0cdf
+remote:
+remote: commit 4a325b31f594b1dc2c66ac15c4b6b68702bd0cdf
+remote: Author: Joel Brobecker <brobecker@adacore.com>
+remote: Date:   Thu May 10 15:20:05 2012 -0700
+remote:
+remote:     1 modified file, 1 new file.
+remote:
+remote: Diff:
+remote: ---
+remote:  c | 1 +
+remote:  d | 1 +
+remote:  2 files changed, 2 insertions(+)
+remote:
+remote: diff --git a/c b/c
+remote: index e0f1ee1..11ba4d0 100644
+remote: --- a/c
+remote: +++ b/c
+remote: @@ -1 +1,2 @@
+remote:  hello world.
+remote: +This is file number C.
+remote: diff --git a/d b/d
+remote: new file mode 100644
+remote: index 0000000..6434b13
+remote: --- /dev/null
+remote: +++ b/d
+remote: @@ -0,0 +1 @@
+remote: +This is a new file.
+remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
+remote: MIME-Version: 1.0
+remote: Content-Transfer-Encoding: 7bit
+remote: From: Test Suite <testsuite@adacore.com>
+remote: To: git-hooks-ci@example.com, user@example.com
+remote: Bcc: file-ci@gnat.com
+remote: Subject: [repo] Modify `c', delete `b'.
+remote: X-Act-Checkin: repo
+remote: X-Git-Author: Joel Brobecker <brobecker@adacore.com>
+remote: X-Git-Refname: refs/heads/master
+remote: X-Git-Oldrev: 4a325b31f594b1dc2c66ac15c4b6b68702bd0cdf
+remote: X-Git-Newrev: cc8d2c2637bda27f0bc2125181dd2f8534d16222
+remote:
+remote: commit cc8d2c2637bda27f0bc2125181dd2f8534d16222
+remote: Author: Joel Brobecker <brobecker@adacore.com>
+remote: Date:   Thu May 10 15:21:06 2012 -0700
+remote:
+remote:     Modify `c', delete `b'.
+remote:
+remote: Diff:
+remote: ---
+remote:  b | 3 ---
+remote:  c | 2 +-
+remote:  2 files changed, 1 insertion(+), 4 deletions(-)
+remote:
+remote: diff --git a/b b/b
+remote: deleted file mode 100644
+remote: index 6ac1308..0000000
+remote: --- a/b
+remote: +++ /dev/null
+remote: @@ -1,3 +0,0 @@
+remote: -some contents inside
+remote: -that file
+remote: -that is not really all that interesting.
+remote: diff --git a/c b/c
+remote: index 11ba4d0..ef3fe05 100644
+remote: --- a/c
+remote: +++ b/c
+remote: @@ -1,2 +1,2 @@
+remote:  hello world.
+remote: -This is file number C.
+remote: +This is file number c.
+remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
+remote: MIME-Version: 1.0
+remote: Content-Transfer-Encoding: 7bit
+remote: From: Test Suite <testsuite@adacore.com>
+remote: To: git-hooks-ci@example.com, user@example.com
+remote: Bcc: file-ci@gnat.com
+remote: Subject: [repo] Modify file `d' alone.
+remote: X-Act-Checkin: repo
+remote: X-Git-Author: Joel Brobecker <brobecker@adacore.com>
+remote: X-Git-Refname: refs/heads/master
+remote: X-Git-Oldrev: cc8d2c2637bda27f0bc2125181dd2f8534d16222
+remote: X-Git-Newrev: dd6165c96db712d3e918fb5c61088b171b5e7cab
+remote:
+remote: commit dd6165c96db712d3e918fb5c61088b171b5e7cab
+remote: Author: Joel Brobecker <brobecker@adacore.com>
+remote: Date:   Thu May 10 15:21:57 2012 -0700
+remote:
+remote:     Modify file `d' alone.
+remote:
+remote: Diff:
+remote: ---
+remote:  d | 1 +
+remote:  1 file changed, 1 insertion(+)
+remote:
+remote: diff --git a/d b/d
+remote: index 6434b13..2def2d6 100644
+remote: --- a/d
+remote: +++ b/d
+remote: @@ -1 +1,2 @@
+remote: +Title: D
+remote:  This is a new file.
+remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
+remote: MIME-Version: 1.0
+remote: Content-Transfer-Encoding: 7bit
+remote: From: Test Suite <testsuite@adacore.com>
+remote: To: git-hooks-ci@example.com, user@example.com
+remote: Subject: [repo] Created branch 'new-branch'
+remote: X-Act-Checkin: repo
+remote: X-Git-Author: Test Suite <testsuite@adacore.com>
+remote: X-Git-Refname: refs/heads/new-branch
+remote: X-Git-Oldrev: 0000000000000000000000000000000000000000
+remote: X-Git-Newrev: dd6165c96db712d3e918fb5c61088b171b5e7cab
+remote:
+remote: The branch 'new-branch' was created pointing to:
+remote:
+remote:  dd6165c... Modify file `d' alone.
+To ../bare/repo.git
+   426fba3..dd6165c  master -> master
+ * [new branch]      master -> new-branch
+"""
+
+        self.assertEqual(p.status, 0, p.image)
+        self.assertRunOutputEqual(p, expected_out)
+
+
+if __name__ == '__main__':
+    runtests()
@@ -0,0 +1,53 @@
+from support import *
+
+
+class TestRun(TestCase):
+    def test_revset(self):
+        """Unit test updates.commits.RevSet.
+        """
+        self.enable_unit_test()
+
+        from updates.commits import RevSet
+
+        cd('%s/repo' % TEST_DIR)
+
+        revs = RevSet.from_rev_list('HEAD', reverse=True)
+        self.assertEqual(len(revs), 2)
+        self.assertEqual(list(revs),
+                         ['d065089ff184d97934c010ccd0e7e8ed94cb7165',
+                          'a60540361d47901d3fe254271779f380d94645f7'])
+        self.assertEqual(revs[0], 'd065089ff184d97934c010ccd0e7e8ed94cb7165')
+        self.assertTrue('a60540361d47901d3fe254271779f380d94645f7' in revs)
+        self.assertFalse('8ef2d60c830f70e70268ce886209805f5010db1f' in revs)
+
+        # An empty rev-list should produce an empty RevSet.
+        revs = RevSet.from_rev_list('HEAD', '^HEAD')
+        self.assertEqual(len(revs), 0)
+        self.assertFalse('a60540361d47901d3fe254271779f380d94645f7' in revs)
+
+    def test_revset_stdin_revs(self):
+        """Unit test RevSet.from_rev_list with revisions passed via stdin.
+        """
+        self.enable_unit_test()
+
+        from git import unique_revs
+        from updates.commits import RevSet
+
+        cd('%s/repo' % TEST_DIR)
+
+        exclude = ['^d065089ff184d97934c010ccd0e7e8ed94cb7165',
+                   '^master~1',
+                   '^d065089ff184d97934c010ccd0e7e8ed94cb7165']
+        self.assertEqual(unique_revs(exclude), exclude[:2])
+
+        revs = RevSet.from_rev_list('HEAD', _stdin_revs=exclude)
+        self.assertEqual(list(revs),
+                         ['a60540361d47901d3fe254271779f380d94645f7'])
+
+        revs = RevSet.from_rev_list(_stdin_revs=['HEAD'] + exclude)
+        self.assertEqual(list(revs),
+                         ['a60540361d47901d3fe254271779f380d94645f7'])
+
+
+if __name__ == '__main__':
+    runtests()
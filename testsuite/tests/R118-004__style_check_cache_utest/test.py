@@ -0,0 +1,83 @@
+from support import *
+import os
+from shutil import rmtree
+
+
+class TestRun(TestCase):
+    def test_style_check_cache(self):
+        """Unit test the style_check_cache module.
+        """
+        self.enable_unit_test()
+
+        from style_check_cache import (STYLE_CHECK_CACHE_DIR,
+                                       StyleCheckCache, checker_identity,
+                                       evict_style_check_cache)
+
+        checker = '%s/style_checker' % TEST_DIR
+        with open(checker, 'w') as f:
+            f.write('#! /bin/sh\n')
+        os.chmod(checker, 0755)
+        checker_id = checker_identity(checker)
+        self.assertIsNotNone(checker_id)
+        self.assertIsNone(checker_identity('/no/such/style_checker'))
+
+        cache = StyleCheckCache(checker_id, None, 'repo')
+        self.assertTrue(cache.enabled)
+        self.assertFalse(os.path.exists(STYLE_CHECK_CACHE_DIR))
+        self.assertEqual(cache.uncached_files('master', ['a']), ['a'])
+
+        cache.add('master', ['a'])
+        self.assertEqual(len(os.listdir(STYLE_CHECK_CACHE_DIR)), 1)
+        # The cache is shared by all the users pushing to the repository.
+        self.assertEqual(os.stat(STYLE_CHECK_CACHE_DIR).st_mode & 0777, 0775)
+        self.assertEqual(
+            os.stat(os.path.join(STYLE_CHECK_CACHE_DIR,
+                                 os.listdir(STYLE_CHECK_CACHE_DIR)[0]))
+            .st_mode & 0777, 0664)
+        self.assertEqual(cache.uncached_files('master', ['a']), [])
+
+        # Any change in the checker config file, or in the project name
+        # should invalidate the entry.
+        self.assertEqual(
+            StyleCheckCache(checker_id, 'a', 'repo')
+            .uncached_files('master', ['a']), ['a'])
+        self.assertEqual(
+            StyleCheckCache(checker_id, None, 'other-repo')
+            .uncached_files('master', ['a']), ['a'])
+
+        # Same with the style_checker itself.
+        os.utime(checker, (0, 0))
+        self.assertEqual(
+            StyleCheckCache(checker_identity(checker), None, 'repo')
+            .uncached_files('master', ['a']), ['a'])
+
+        # Verify that the least recently used entries get evicted
+        # when the cache grows too large, but only when asked to.
+        small_cache = StyleCheckCache(checker_id, None, 'other-repo')
+        small_cache.max_entries = 1
+        os.utime(os.path.join(STYLE_CHECK_CACHE_DIR,
+                              os.listdir(STYLE_CHECK_CACHE_DIR)[0]),
+                 (0, 0))
+        small_cache.add('master', ['a'])
+        self.assertEqual(len(os.listdir(STYLE_CHECK_CACHE_DIR)), 2)
+        evict_style_check_cache(1)
+        self.assertEqual(len(os.listdir(STYLE_CHECK_CACHE_DIR)), 1)
+        self.assertEqual(cache.uncached_files('master', ['a']), ['a'])
+        self.assertEqual(small_cache.uncached_files('master', ['a']), [])
+
+        # A cache size of zero disables the cache.
+        small_cache.max_entries = 0
+        self.assertFalse(small_cache.enabled)
+        self.assertEqual(small_cache.uncached_files('master', ['a']), ['a'])
+
+        # Failing to access the cache is not an error: The cache is
+        # simply not used.
+        rmtree(STYLE_CHECK_CACHE_DIR)
+        open(STYLE_CHECK_CACHE_DIR, 'w').close()
+        cache.add('master', ['a'])
+        self.assertEqual(cache.uncached_files('master', ['a']), ['a'])
+        evict_style_check_cache(1)
+
+
+if __name__ == '__main__':
+    runtests()
@@ -0,0 +1,40 @@
+from support import *
+
+class TestRun(TestCase):
+    def test_push_commits_parallel_style_checks(self):
+        """Push new branch with style checks performed in parallel.
+
+        The repository is configured with hooks.style-check-jobs = 4,
+        and the branch contains several commits failing the style
+        checks. The error reported should be the one from the first
+        (chronologically) commit failing the checks, just like when
+        the style checks are performed one commit at a time.
+        """
+        cd ('%s/repo' % TEST_DIR)
+
+        p = Run('git push origin release-0.1-branch'.split())
+        expected_out = """\
+remote: *** cvs_check: `repo' < `b'
+remote: *** pre-commit check failed for commit: 4205e52273adad6b014e19fb1cf1fe1c9b8b4089
+remote: *** cvs_check: `repo' < `a' `c' `d'
+remote: *** ERROR: c: Copyright year in header is not up to date
+remote: error: hook declined to update refs/heads/release-0.1-branch
+To ../bare/repo.git
+ ! [remote rejected] release-0.1-branch -> release-0.1-branch (hook declined)
+error: failed to push some refs to '../bare/repo.git'
+"""
+
+        self.assertTrue(p.status != 0, p.image)
+        self.assertRunOutputEqual(p, expected_out)
+
+        # Verify that the branch does not exist on the remote...
+
+        cd('%s/bare/repo.git' % TEST_DIR)
+
+        p = Run('git show-ref -s release-0.1-branch'.split())
+
+        self.assertTrue(p.status != 0, p.image)
+
+
+if __name__ == '__main__':
+    runtests()
@@ -0,0 +1,102 @@
+from support import *
+
+
+class TestRun(TestCase):
+    def test_git_attribute(self):
+        """Unit test git_attrs.git_attribute.
+        """
+        self.enable_unit_test()
+
+        from git_attrs import git_attribute
+
+        filename_list = ['README', 'a', 'doc/a.txt', 'doc/sub/b.txt',
+                         'src/README', 'src/lib/x.h', 'src/lib/y.c',
+                         'src/other', 'src/x.c', 'with space', 'x.c',
+                         'x.gen']
+
+        # The results should be the same as "git check-attr" in
+        # a non-bare repository.
+        self.assertEqual(
+            git_attribute('master', filename_list, 'no-precommit-check'),
+            {'README': 'set',
+             'a': 'unspecified',
+             'doc/a.txt': 'doc',
+             'doc/sub/b.txt': 'doc',
+             'src/README': 'unspecified',
+             'src/lib/x.h': 'unspecified',
+             'src/lib/y.c': 'set',
+             'src/other': 'unspecified',
+             'src/x.c': 'set',
+             'with space': 'set',
+             'x.c': 'unset',
+             'x.gen': 'set'})
+        self.assertEqual(
+            git_attribute('master', ['x.c', 'x.gen'], 'diff'),
+            {'x.c': 'unspecified',
+             'x.gen': 'unset'})
+
+        # Older commits, where the .gitattributes files did not exist.
+        self.assertEqual(
+            git_attribute('master~', ['README', 'x.c'],
+                          'no-precommit-check'),
+            {'README': 'unspecified',
+             'x.c': 'unspecified'})
+
+        # Now, add a default_attributes file, which should only
+        # be used for the files where the .gitattributes files
+        # do not specify the attribute.
+        with open('info/default_attributes', 'w') as f:
+            f.write('*.gen     -no-precommit-check\n'
+                    'src/other no-precommit-check\n'
+                    'x.c       no-precommit-check\n'
+                    'a         no-precommit-check\n')
+        self.assertEqual(
+            git_attribute('master', ['a', 'src/other', 'x.c', 'x.gen'],
+                          'no-precommit-check'),
+            {'a': 'set',
+             'src/other': 'set',
+             'x.c': 'unset',
+             'x.gen': 'set'})
+        self.assertEqual(
+            git_attribute('master~', ['README', 'a', 'x.c'],
+                          'no-precommit-check'),
+            {'README': 'unspecified',
+             'a': 'set',
+             'x.c': 'set'})
+
+    def test_git_attribute_cache(self):
+        """Unit test the caching performed by git_attrs.git_attribute.
+        """
+        self.enable_unit_test()
+
+        from git_attrs import git_attribute, tree_entries
+
+        filename_list = ['README', 'src/lib/x.h', 'src/lib/y.c']
+        expected = {'README': 'set',
+                    'src/lib/x.h': 'unspecified',
+                    'src/lib/y.c': 'set'}
+        self.assertEqual(
+            git_attribute('master', filename_list, 'no-precommit-check'),
+            expected)
+        nb_hits = git_attribute.nb_hits
+        nb_lookups = git_attribute.nb_lookups
+        nb_trees = len(tree_entries.cache)
+
+        # Querying the same files again, whether using the same
+        # commit or not, should be answered entirely from the cache,
+        # as long as the .gitattributes files are the same.
+        self.assertEqual(
+            git_attribute('master^{commit}', filename_list,
+                          'no-precommit-check'),
+            expected)
+        self.assertEqual(git_attribute.nb_hits, nb_hits + 3)
+        self.assertEqual(git_attribute.nb_lookups, nb_lookups + 3)
+        self.assertEqual(len(tree_entries.cache), nb_trees)
+
+        # A different attribute is a different question.
+        self.assertEqual(
+            git_attribute('master', ['x.gen'], 'diff'), {'x.gen': 'unset'})
+        self.assertEqual(git_attribute.nb_hits, nb_hits + 3)
+
+if __name__ == '__main__':
+    runtests()
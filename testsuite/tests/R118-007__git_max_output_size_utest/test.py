@@ -0,0 +1,38 @@
+from support import *
+
+
+class TestRun(TestCase):
+    def test_max_output_size(self):
+        """Unit test the _max_output_size option of git.git_run.
+        """
+        self.enable_unit_test()
+
+        from git import git
+
+        full_output = git.show('master', p=True, pretty='format:|')
+        size = len(full_output)
+
+        # Output not larger than the maximum: Same as without the option.
+        self.assertEqual(
+            git.show('master', p=True, pretty='format:|',
+                     _max_output_size=size),
+            full_output)
+        self.assertEqual(
+            git.show('master', p=True, pretty='format:|',
+                     _max_output_size=size * 10),
+            full_output)
+
+        # Output larger than the maximum: Truncated to the maximum + 1.
+        self.assertEqual(
+            git.show('master', p=True, pretty='format:|',
+                     _max_output_size=size - 1),
+            full_output)
+        for max_output_size in (0, 1, 10, size - 2):
+            self.assertEqual(
+                git.show('master', p=True, pretty='format:|',
+                         _max_output_size=max_output_size),
+                full_output[:max_output_size + 1])
+
+
+if __name__ == '__main__':
+    runtests()
@@ -0,0 +1,87 @@
+from support import *
+
+
+class TestRun(TestCase):
+    def test_commit_logs(self):
+        """Unit test git.commit_logs.
+        """
+        self.enable_unit_test()
+
+        from git import commit_logs, commit_rev, git
+
+        master = commit_rev('master')
+        meta_config = commit_rev('refs/meta/config')
+
+        self.assertEqual(commit_logs([], pretty='medium'), [])
+
+        # The logs should be returned in the order requested (not
+        # in chronological order), and be the same as the one
+        # "git log -n1" would return.
+        for revs in ([master],
+                     [master, meta_config],
+                     [meta_config, master],
+                     [master, meta_config, master]):
+            for pretty in ('medium', 'format:%B', 'format:%s%n%n%an'):
+                self.assertEqual(
+                    commit_logs(revs, pretty=pretty),
+                    [git.log('-n1', rev, pretty=pretty) for rev in revs])
+
+    def test_raw_revlogs(self):
+        """Unit test git.get_raw_revlog and git.prefetch_raw_revlogs.
+        """
+        self.enable_unit_test()
+
+        from git import (commit_rev, commit_store, get_raw_revlog, git,
+                         prefetch_raw_revlogs)
+
+        master = commit_rev('master')
+        meta_config = commit_rev('refs/meta/config')
+
+        prefetch_raw_revlogs([master, meta_config])
+        self.assertEqual(commit_store.get(master).raw_body, 'New file: a.')
+        self.assertEqual(commit_store.get(meta_config).raw_body,
+                         'Initial config for project')
+        self.assertEqual(get_raw_revlog(master),
+                         git.log('-n1', master, pretty='format:%B'))
+
+        # Revisions not prefetched should work too.
+        self.assertEqual(get_raw_revlog('master'), 'New file: a.')
+
+    def test_commit_store(self):
+        """Unit test git.commit_store.
+        """
+        self.enable_unit_test()
+
+        from git import (commit_oneline, commit_parents, commit_rev,
+                         commit_store, commit_subject, git)
+
+        master = commit_rev('master')
+        record = commit_store.get('master')
+        self.assertEqual(record.rev, master)
+        self.assertEqual(record.short_rev, master[:7])
+        self.assertEqual(record.tree, git.rev_parse('master^{tree}'))
+        self.assertEqual(record.parents, ())
+        self.assertEqual(record.author,
+                         'Joel Brobecker <brobecker@adacore.com>')
+        self.assertEqual(record.subject, 'New file: a.')
+        self.assertEqual(record.raw_body, 'New file: a.')
+        # Records should be shared between the various revisions
+        # designating the same commit.
+        self.assertIs(commit_store.get(master), record)
+
+        self.assertEqual(commit_parents('master'), [])
+        self.assertEqual(commit_subject('master'), 'New file: a.')
+        self.assertEqual(commit_oneline('master'),
+                         '%s... New file: a.' % master[:7])
+
+        # A tag pointing to a tree does not resolve to a commit.
+        self.assertIsNone(commit_store.get('master^{tree}'))
+
+        # Clearing the store removes all its records, which get
+        # loaded again if needed.
+        commit_store.clear()
+        self.assertIsNot(commit_store.get(master), record)
+        self.assertEqual(commit_store.get(master).raw_body, 'New file: a.')
+
+if __name__ == '__main__':
+    runtests()
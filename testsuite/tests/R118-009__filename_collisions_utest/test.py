@@ -0,0 +1,165 @@
+from support import *
+import os
+import shutil
+
+
+class TestRun(TestCase):
+    def test_check_filename_collisions(self):
+        """Unit test pre_commit_checks.check_filename_collisions.
+        """
+        self.enable_unit_test()
+
+        from errors import InvalidUpdate
+        from git import commit_rev
+        from pre_commit_checks import (CaseFoldedIndex,
+                                       check_filename_collisions)
+        from updates.commits import CommitInfo
+
+        def commit_info(rev):
+            return CommitInfo(commit_rev(rev), None, None, None)
+
+        # The index of the files in a given commit.
+        index = CaseFoldedIndex(commit_rev('collide-a~1'))
+        self.assertEqual(index.filename_map,
+                         {'a': ['a'], 'dir/f': ['Dir/f'],
+                          'readme': ['README']})
+        self.assertEqual(index.update(commit_rev('collide-readme')),
+                         ['b', 'dir/F', 'readme'])
+        self.assertEqual(sorted(index.collisions(['b', 'readme'])),
+                         [['README', 'readme']])
+
+        # No collision...
+        check_filename_collisions([])
+        check_filename_collisions([commit_info('collide-a~1'),
+                                   commit_info('other')])
+
+        # A collision introduced by the last commit.
+        with self.assertRaises(InvalidUpdate) as cm:
+            check_filename_collisions([commit_info('collide-a~1'),
+                                       commit_info('collide-a')])
+        info = cm.exception.args
+        self.assertIn('    Commit: %s' % commit_rev('collide-a'), info)
+        self.assertIn('    Subject: Add A (collides with a).', info)
+        self.assertEqual(info[-3:], ('', '    A', '    a'))
+
+        # Two collisions introduced by the same commit.
+        with self.assertRaises(InvalidUpdate) as cm:
+            check_filename_collisions([commit_info('collide-a~1'),
+                                       commit_info('other'),
+                                       commit_info('collide-readme')])
+        info = cm.exception.args
+        self.assertIn('    Commit: %s' % commit_rev('collide-readme'), info)
+        self.assertIn('    README', info)
+        self.assertIn('    readme', info)
+        self.assertIn('    Dir/f', info)
+        self.assertIn('    dir/F', info)
+
+        # Commits that are not children of each other.  The files
+        # removed/added when going from one to the next should not
+        # be mistaken with files added by the commit.
+        with self.assertRaises(InvalidUpdate) as cm:
+            check_filename_collisions([commit_info('other'),
+                                       commit_info('collide-a')])
+        info = cm.exception.args
+        self.assertIn('    Commit: %s' % commit_rev('collide-a'), info)
+        self.assertEqual(info[-3:], ('', '    A', '    a'))
+
+    def test_filename_index_cache(self):
+        """Unit test the filename_index_cache module.
+        """
+        self.enable_unit_test()
+
+        from filename_index_cache import (FILENAME_INDEX_CACHE_DIR,
+                                          FilenameIndexCache)
+        from git import commit_rev, commit_tree
+        from pre_commit_checks import (CaseFoldedIndex,
+                                       check_filename_collisions)
+        from updates.commits import CommitInfo
+
+        def commit_info(rev):
+            return CommitInfo(commit_rev(rev), None, None, None)
+
+        def cache_entries():
+            if not os.path.isdir(FILENAME_INDEX_CACHE_DIR):
+                return []
+            return sorted(os.listdir(FILENAME_INDEX_CACHE_DIR))
+
+        # Start from an empty cache (other tests might have populated it).
+        if os.path.isdir(FILENAME_INDEX_CACHE_DIR):
+            shutil.rmtree(FILENAME_INDEX_CACHE_DIR)
+
+        # Checking some commits should save the index of the first
+        # commit's parent, as well as the index of the last commit.
+        cache = FilenameIndexCache()
+        self.assertTrue(cache.enabled)
+        self.assertIsNone(cache.get(commit_tree('collide-a~2')))
+        check_filename_collisions([commit_info('collide-a~1'),
+                                   commit_info('other')])
+        self.assertEqual(cache_entries(),
+                         sorted([commit_tree('collide-a~2'),
+                                 commit_tree('other')]))
+        self.assertEqual(cache.get(commit_tree('collide-a~2')), ['a'])
+        self.assertEqual(sorted(cache.get(commit_tree('other'))),
+                         ['Dir/f', 'README', 'a', 'b'])
+
+        # The cache is shared by all the users pushing to the repository.
+        self.assertEqual(os.stat(FILENAME_INDEX_CACHE_DIR).st_mode & 0777,
+                         0775)
+        for entry in cache_entries():
+            self.assertEqual(
+                os.stat(os.path.join(FILENAME_INDEX_CACHE_DIR,
+                                     entry)).st_mode & 0777, 0664)
+
+        # Checking the same commits again should not write the entries
+        # already in the cache again.
+        def entry_inode(tree_rev):
+            return os.stat(os.path.join(FILENAME_INDEX_CACHE_DIR,
+                                        tree_rev)).st_ino
+
+        inodes = [entry_inode(commit_tree(rev))
+                  for rev in ('collide-a~2', 'other')]
+        self.assertIn(commit_tree('other'), cache)
+        check_filename_collisions([commit_info('collide-a~1'),
+                                   commit_info('other')])
+        self.assertEqual([entry_inode(commit_tree(rev))
+                          for rev in ('collide-a~2', 'other')], inodes)
+
+        # An index created from the cache should be identical to
+        # an index created from scratch.
+        self.assertEqual(CaseFoldedIndex(commit_rev('other'),
+                                         cache).filename_map,
+                         CaseFoldedIndex(commit_rev('other')).filename_map)
+
+        # Entries which have not been used in a long time should
+        # get evicted.
+        os.utime(os.path.join(FILENAME_INDEX_CACHE_DIR,
+                              commit_tree('collide-a~2')), (0, 0))
+        CaseFoldedIndex(commit_rev('collide-a'), cache)
+        self.assertEqual(cache_entries(),
+                         sorted([commit_tree('collide-a'),
+                                 commit_tree('other')]))
+
+        # As well as the least recently used entries, when the cache
+        # grows too large.
+        cache.max_entries = 1
+        CaseFoldedIndex(commit_rev('collide-readme'), cache)
+        self.assertEqual(cache_entries(), [commit_tree('collide-readme')])
+
+        # A cache size of zero disables the cache.
+        cache.max_entries = 0
+        self.assertFalse(cache.enabled)
+        self.assertIsNone(cache.get(commit_tree('collide-readme')))
+
+        # Failing to access the cache is not an error: The cache is
+        # simply not used.
+        cache.max_entries = 1
+        shutil.rmtree(FILENAME_INDEX_CACHE_DIR)
+        open(FILENAME_INDEX_CACHE_DIR, 'w').close()
+        check_filename_collisions([commit_info('collide-a~1'),
+                                   commit_info('other')])
+        self.assertNotIn(commit_tree('other'), cache)
+        os.unlink(FILENAME_INDEX_CACHE_DIR)
+
+
+if __name__ == '__main__':
+    runtests()
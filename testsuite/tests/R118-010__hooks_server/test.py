@@ -0,0 +1,105 @@
+from support import *
+from subprocess import Popen
+from tempfile import mkdtemp
+import shutil
+import time
+
+
+class TestRun(TestCase):
+    def test_push_commit_on_master(self):
+        """Try pushing one single-file commit through the hooks server.
+        """
+        # Start the hooks server.  Create its socket outside of the
+        # testcase's tmp directory, as this directory should contain
+        # nothing when the testcase ends.
+        socket_dir = mkdtemp('', '', os.environ['GIT_HOOKS_TESTSUITE_TMP'])
+        socket_name = '%s/hooks.sock' % socket_dir
+        server_log = '%s/server.log' % socket_dir
+        with open(server_log, 'w') as f:
+            server = Popen(['python',
+                            '%s/bare/repo.git/hooks/hooks_server.py'
+                            % TEST_DIR, socket_name],
+                           stdout=f, stderr=f)
+        try:
+            for _ in range(100):
+                if os.path.exists(socket_name):
+                    break
+                time.sleep(0.1)
+            self.assertTrue(os.path.exists(socket_name))
+            os.environ['GIT_HOOKS_SERVER_SOCKET'] = socket_name
+
+            cd('%s/repo' % TEST_DIR)
+
+            # Push master to the `origin' remote.  The output should
+            # be the same as without the server.
+            p = Run('git push origin master'.split())
+            expected_out = """\
+remote: *** cvs_check: `repo' < `a'
+remote: DEBUG: Content-Type: text/plain; charset="us-ascii"
+remote: MIME-Version: 1.0
+remote: Content-Transfer-Encoding: 7bit
+remote: From: Test Suite <testsuite@adacore.com>
+remote: To: git-hooks-ci@example.com
+remote: Bcc: file-ci@gnat.com
+remote: Subject: [repo] Updated a.
+remote: X-Act-Checkin: repo
+remote: X-Git-Author: Joel Brobecker <brobecker@adacore.com>
+remote: X-Git-Refname: refs/heads/master
+remote: X-Git-Oldrev: d065089ff184d97934c010ccd0e7e8ed94cb7165
+remote: X-Git-Newrev: a60540361d47901d3fe254271779f380d94645f7
+remote:
+remote: commit a60540361d47901d3fe254271779f380d94645f7
+remote: Author: Joel Brobecker <brobecker@adacore.com>
+remote: Date:   Fri Apr 27 13:08:29 2012 -0700
+remote:
+remote:     Updated a.
+remote:
+remote:     Just added a little bit of text inside file a.
+remote:     Thought about doing something else, but not really necessary.
+remote:
+remote: Diff:
+remote: ---
+remote:  a | 4 +++-
+remote:  1 file changed, 3 insertions(+), 1 deletion(-)
+remote:
+remote: diff --git a/a b/a
+remote: index 01d0f12..a90d851 100644
+remote: --- a/a
+remote: +++ b/a
+remote: @@ -1,3 +1,5 @@
+remote:  Some file.
+remote: -Second line.
+remote: +Second line, in the middle.
+remote: +In the middle too!
+remote:  Third line.
+remote: +
+To ../bare/repo.git
+   d065089..a605403  master -> master
+"""
+
+            self.assertEqual(p.status, 0, p.image)
+            self.assertRunOutputEqual(p, expected_out)
+        finally:
+            server.terminate()
+            server.wait()
+
+        # Verify that both hooks were run by the server.
+        with open(server_log) as f:
+            log = f.read()
+        self.assertIn('hooks_server: update (%s/bare/repo.git, '
+                      % TEST_DIR, log)
+        self.assertIn('hooks_server: post-receive (%s/bare/repo.git, '
+                      % TEST_DIR, log)
+
+        # Now that the server is no longer running, the hooks should
+        # be run directly (the server's socket is still there, but
+        # nobody is listening to it anymore).
+        p = Run('git push origin master:refs/heads/new-branch'.split())
+        self.assertEqual(p.status, 0, p.image)
+        self.assertIn('new-branch', p.cmd_out)
+
+        shutil.rmtree(socket_dir)
+
+
+if __name__ == '__main__':
+    runtests()
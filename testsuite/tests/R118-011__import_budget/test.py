@@ -0,0 +1,84 @@
+from support import *
+from subprocess import Popen, PIPE
+import re
+
+# The startup budget of each hook: the maximum number of modules
+# loaded when importing the hook's main module, and the maximum time
+# (in milliseconds) this import should take.  We measured about 50
+# modules, and 25ms.  The time budget leaves a lot of margin, since
+# the testsuite may be run on slow or busy machines; the number of
+# modules is a more reliable indicator.
+MODULE_COUNT_BUDGET = 60
+IMPORT_TIME_BUDGET = 500
+
+# Some modules that are expensive to load, and yet are not needed
+# by all updates.  They should therefore only be imported when
+# we know that we need them.
+LAZY_MODULES = ('argparse',
+                'email',
+                'multiprocessing',
+                'pre_commit_checks',
+                'updates.branches.update',
+                'updates.notes.update',
+                'updates.tags.atag_update',
+                )
+
+
+class TestRun(TestCase):
+    def import_hook_module(self, module_name):
+        """Import the given module in a new Python process.
+
+        PARAMETERS
+            module_name: The name of the module to import.
+
+        RETURN VALUE
+            A tuple with the list of modules loaded after the import,
+            and the import profile reported on stderr.
+        """
+        env = dict(os.environ)
+        env['GIT_HOOKS_IMPORT_PROFILE'] = 'true'
+        p = Popen(['python', '-c',
+                   'import sys;'
+                   ' sys.path.insert(0, "hooks");'
+                   ' import %s;'
+                   ' print "\\n".join(name for (name, module)'
+                   ' in sys.modules.items() if module is not None)'
+                   % module_name],
+                  cwd='%s/bare/repo.git' % TEST_DIR,
+                  stdout=PIPE, stderr=PIPE, env=env)
+        (out, err) = p.communicate()
+        self.assertEqual(p.returncode, 0, err)
+        return (out.splitlines(), err)
+
+    def check_import_budget(self, module_name):
+        """Check the cost of importing the given hook module.
+
+        PARAMETERS
+            module_name: The name of the module to import.
+        """
+        (modules, profile) = self.import_hook_module(module_name)
+
+        for lazy_module in LAZY_MODULES:
+            self.assertNotIn(lazy_module, modules,
+                             '%s should not be imported by %s'
+                             % (lazy_module, module_name))
+
+        self.assertIn('import profile (GIT_HOOKS_IMPORT_PROFILE):', profile)
+        m = re.search(r'total: ([0-9.]+) ms \(([0-9]+) modules\)', profile)
+        self.assertIsNotNone(m, profile)
+        self.assertLessEqual(int(m.group(2)), MODULE_COUNT_BUDGET, profile)
+        self.assertLess(float(m.group(1)), IMPORT_TIME_BUDGET, profile)
+
+    def test_update_import_budget(self):
+        """Check the cost of importing the update hook's module.
+        """
+        self.check_import_budget('update')
+
+    def test_post_receive_import_budget(self):
+        """Check the cost of importing the post-receive hook's module.
+        """
+        self.check_import_budget('post_receive')
+
+
+if __name__ == '__main__':
+    runtests()
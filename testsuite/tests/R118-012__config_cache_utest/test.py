@@ -0,0 +1,112 @@
+from support import *
+import marshal
+
+
+class TestRun(TestCase):
+    def test_config_cache(self):
+        """Unit test the caching of the project.config file.
+        """
+        self.enable_unit_test()
+
+        from config import (CONFIG_CACHE_FILENAME, config_cache_key,
+                            git_config, initialize_git_config_map)
+        from git import git
+
+        self.assertFalse(os.path.exists(CONFIG_CACHE_FILENAME))
+
+        # Reading the config should create the cache.
+        initialize_git_config_map()
+        self.assertEqual(git_config('hooks.mailinglist'),
+                         ('git-hooks-ci@example.com', ))
+        self.assertEqual(git_config('hooks.max-commit-emails'), 100)
+        self.assertTrue(os.path.exists(CONFIG_CACHE_FILENAME))
+
+        blob_rev = git.rev_parse('refs/meta/config:project.config')
+        with open(CONFIG_CACHE_FILENAME, 'rb') as f:
+            (key, all_configs_map) = marshal.load(f)
+        self.assertEqual(key, config_cache_key(blob_rev))
+        self.assertEqual(all_configs_map,
+                         {'hooks.from-domain': 'adacore.com',
+                          'hooks.mailinglist': ('git-hooks-ci@example.com',
+                                                )})
+
+        # Verify that the cache is used, by modifying it.
+        all_configs_map['hooks.max-commit-emails'] = 12
+        with open(CONFIG_CACHE_FILENAME, 'wb') as f:
+            marshal.dump((key, all_configs_map), f)
+        initialize_git_config_map()
+        self.assertEqual(git_config('hooks.max-commit-emails'), 12)
+
+        # A cache saved for another version of the config file
+        # should be ignored (and replaced).
+        with open(CONFIG_CACHE_FILENAME, 'wb') as f:
+            marshal.dump((config_cache_key('0' * 40), all_configs_map), f)
+        initialize_git_config_map()
+        self.assertEqual(git_config('hooks.max-commit-emails'), 100)
+        with open(CONFIG_CACHE_FILENAME, 'rb') as f:
+            self.assertEqual(marshal.load(f)[0], key)
+
+        # Same if the cache is corrupted.
+        with open(CONFIG_CACHE_FILENAME, 'wb') as f:
+            f.write('corrupted')
+        initialize_git_config_map()
+        self.assertEqual(git_config('hooks.from-domain'), 'adacore.com')
+        with open(CONFIG_CACHE_FILENAME, 'rb') as f:
+            self.assertEqual(marshal.load(f)[0], key)
+
+    def test_ref_matcher(self):
+        """Unit test config.RefMatcher.
+        """
+        self.enable_unit_test()
+
+        from config import RefMatcher, git_config_ref_matcher
+
+        # Literal patterns only.
+        m = RefMatcher([' refs/heads/master ', 'refs/tags/'])
+        self.assertEqual(m.patterns, ['refs/heads/master', 'refs/tags/'])
+        self.assertEqual(m.match('refs/heads/master'), 'refs/heads/master')
+        self.assertEqual(m.match('refs/heads/master-old'),
+                         'refs/heads/master')
+        self.assertEqual(m.match('refs/tags/v1'), 'refs/tags/')
+        self.assertIsNone(m.match('refs/heads/main'))
+
+        # A mix of literal patterns and regular expressions.  The first
+        # matching pattern should be returned.
+        m = RefMatcher(['refs/heads/.*-branch$', 'refs/heads/release',
+                        'refs/heads/(release|stable)-.*'])
+        self.assertEqual(m.match('refs/heads/release-branch'),
+                         'refs/heads/.*-branch$')
+        self.assertEqual(m.match('refs/heads/release-1'),
+                         'refs/heads/release')
+        self.assertEqual(m.match('refs/heads/stable-1'),
+                         'refs/heads/(release|stable)-.*')
+        self.assertIsNone(m.match('refs/heads/branch'))
+        self.assertIsNone(m.match('refs/heads/master'))
+
+        # Patterns with a prefix.
+        m = RefMatcher(['topic/.*', 'dev'], prefix='refs/heads/')
+        self.assertEqual(m.match('refs/heads/topic/a'), 'refs/heads/topic/.*')
+        self.assertEqual(m.match('refs/heads/dev'), 'refs/heads/dev')
+        self.assertIsNone(m.match('topic/a'))
+
+        # Patterns which cannot be merged.
+        m = RefMatcher([r'refs/heads/(a)\1', r'refs/heads/(b)\1'])
+        self.assertEqual(m.match('refs/heads/bb'), r'refs/heads/(b)\1')
+        self.assertIsNone(m.match('refs/heads/ab'))
+        m = RefMatcher(['refs/heads/(?P<n>a)', 'refs/tags/(?P<n>b)'])
+        self.assertEqual(m.match('refs/tags/b'), 'refs/tags/(?P<n>b)')
+        self.assertIsNone(m.match('refs/tags/a'))
+
+        # No pattern at all.
+        self.assertIsNone(RefMatcher([]).match('refs/heads/master'))
+
+        # The matcher of a given option should only be created once.
+        m = git_config_ref_matcher('hooks.ignore-refs')
+        self.assertIs(git_config_ref_matcher('hooks.ignore-refs'), m)
+        self.assertEqual(m.match('refs/changes/20/884120/1'),
+                         'refs/changes/.*')
+        self.assertIsNone(m.match('refs/heads/master'))
+
+
+if __name__ == '__main__':
+    runtests()
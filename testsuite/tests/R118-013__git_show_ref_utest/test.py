@@ -0,0 +1,46 @@
+from support import *
+
+
+class TestRun(TestCase):
+    def test_git_show_ref(self):
+        """Unit test git.git_show_ref.
+        """
+        self.enable_unit_test()
+
+        import git
+        from git import git_show_ref, ignored_refs_exclude_options
+
+        master = 'd065089ff184d97934c010ccd0e7e8ed94cb7165'
+        all_refs = {'refs/heads/master': master,
+                    'refs/heads/refs-changes': master,
+                    'refs/meta/config':
+                    '1681a0fe03f0e1d381b232274d207d50a7b3576e',
+                    'refs/tags/v1': master,
+                    'refs/users/01/1/other': master}
+        self.assertEqual(git_show_ref(), all_refs)
+        # Whether git supports the --exclude option (2.42 or later)
+        # is found out while running the command above.
+        exclude_supported = \
+            not git.ignored_refs_exclude_options.__dict__.get('unsupported')
+        self.assertEqual(exclude_supported, self.git_version() >= '2.42')
+        self.assertEqual(git_show_ref('refs/heads/'),
+                         {'refs/heads/master': master,
+                          'refs/heads/refs-changes': master})
+
+        # The patterns from hooks.ignore-refs which git can exclude
+        # by itself, unless git was found to not support that.
+        self.assertEqual(ignored_refs_exclude_options(),
+                         ['--exclude=refs/changes/'] if exclude_supported
+                         else [])
+        git.ignored_refs_exclude_options.unsupported = False
+        self.assertEqual(ignored_refs_exclude_options(),
+                         ['--exclude=refs/changes/'])
+        git.ignored_refs_exclude_options.unsupported = True
+        self.assertEqual(ignored_refs_exclude_options(), [])
+
+        # The same references are returned either way.
+        self.assertEqual(git_show_ref(), all_refs)
+
+
+if __name__ == '__main__':
+    runtests()
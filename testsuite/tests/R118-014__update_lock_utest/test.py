@@ -0,0 +1,86 @@
+from support import *
+import os
+from subprocess import Popen
+import time
+
+
+class TestRun(TestCase):
+    def test_update_lock(self):
+        """Unit test utils.UpdateLock.
+        """
+        self.enable_unit_test()
+
+        from errors import InvalidUpdate
+        from utils import (UpdateLock, ref_lock_filename,
+                           REPO_LOCK_FILENAME)
+
+        def new_lock(ref_names, exclusive=False, timeout=0):
+            lock = UpdateLock(ref_names, exclusive=exclusive)
+            lock.timeout = timeout
+            return lock
+
+        # The default timeout, from hooks.lock-timeout.
+        self.assertEqual(UpdateLock(['refs/heads/master']).timeout, 30)
+
+        # Each reference gets its own lock file, even when their
+        # names only differ by the characters we need to escape.
+        self.assertNotEqual(ref_lock_filename('refs/heads/a/b'),
+                            ref_lock_filename('refs/heads/a%2Fb'))
+
+        # Updates of different references can proceed in parallel.
+        with new_lock(['refs/heads/master']):
+            with new_lock(['refs/heads/release', 'refs/tags/v1']):
+                pass
+
+            # ... but not updates of the same reference.  Verify that
+            # we wait for the lock before giving up.
+            start = time.time()
+            with self.assertRaises(InvalidUpdate):
+                with new_lock(['refs/heads/a', 'refs/heads/master'],
+                              timeout=1):
+                    pass
+            self.assertGreaterEqual(time.time() - start, 0.5)
+
+            # An exclusive lock on the repository conflicts with
+            # every other update.
+            with self.assertRaises(InvalidUpdate):
+                with new_lock(['refs/meta/config'], exclusive=True):
+                    pass
+
+        # The locks are released when leaving the "with" block
+        # (including the locks acquired before a failure).  Also
+        # verify that, while we hold an exclusive lock on the repository,
+        # no other update can proceed.
+        with new_lock(['refs/heads/a', 'refs/heads/master'], exclusive=True):
+            with self.assertRaises(InvalidUpdate):
+                with new_lock(['refs/heads/release']):
+                    pass
+
+        # For compatibility with older versions of the hooks, a lock file
+        # next to the repository lock locks the whole repository.
+        legacy_lock_filename = REPO_LOCK_FILENAME + '.lock'
+        with open(legacy_lock_filename, 'w') as f:
+            f.write('locked by testsuite\n')
+        try:
+            with self.assertRaises(InvalidUpdate):
+                with new_lock(['refs/heads/master']):
+                    pass
+        finally:
+            os.unlink(legacy_lock_filename)
+        with new_lock(['refs/heads/master']):
+            pass
+
+        # Unless the process which created that lock file no longer
+        # exists, in which case the lock file gets removed.
+        p = Popen(['true'])
+        p.wait()
+        with open(legacy_lock_filename, 'w') as f:
+            f.write('locked by user testsuite at <now> (pid = %d)\n'
+                    % p.pid)
+        with new_lock(['refs/heads/master']):
+            pass
+        self.assertFalse(os.path.exists(legacy_lock_filename))
+
+
+if __name__ == '__main__':
+    runtests()
@@ -0,0 +1,137 @@
+from support import *
+import fcntl
+import marshal
+import os
+
+
+class TestRun(TestCase):
+    def test_email_spool(self):
+        """Unit test updates.email_spool.EmailSpool.
+        """
+        self.enable_unit_test()
+
+        from updates.email_spool import EmailSpool
+
+        # Use the filer command to record the order in which
+        # the emails get delivered.
+        filer_log = os.path.abspath('filer.log')
+
+        def new_entry(name, filer_cmd=('sh', '-c', 'cat >> %s' % filer_log)):
+            return {'from': 'me@example.com',
+                    'recipients': ['git-hooks-ci@example.com'],
+                    'message': 'Subject: %s\n\n%s\n' % (name, name),
+                    'filer_cmd': list(filer_cmd),
+                    'filer_input': '%s\n' % name}
+
+        def delivered():
+            with open(filer_log) as f:
+                return f.read().splitlines()
+
+        spool = EmailSpool()
+        self.assertEqual(spool.pending(), [])
+        spool.add([new_entry('one'), new_entry('two')])
+        self.assertEqual(spool.pending(),
+                         ['000000000001.email', '000000000002.email'])
+
+        # The spool is shared by all the users pushing to the repository.
+        def mode(filename):
+            return os.stat(os.path.join(spool.spool_dir, filename)).st_mode
+
+        self.assertEqual(mode('.') & 0777, 0775)
+        for filename in spool.pending() + ['state']:
+            self.assertEqual(mode(filename) & 0777, 0664)
+
+        # Pretend that the previous worker crashed before delivering
+        # these emails, and spool another email.  The sequence
+        # numbers and dates keep increasing.
+        spool = EmailSpool()
+        spool.add([new_entry('three')])
+        self.assertEqual(spool.pending(),
+                         ['000000000001.email', '000000000002.email',
+                          '000000000003.email'])
+        entries = []
+        for filename in spool.pending():
+            with open(os.path.join(spool.spool_dir, filename), 'rb') as f:
+                entries.append(marshal.load(f))
+        self.assertEqual([entry['seq'] for entry in entries], [1, 2, 3])
+        self.assertLess(entries[0]['date'], entries[1]['date'])
+        self.assertLess(entries[1]['date'], entries[2]['date'])
+
+        # While another worker is delivering emails, we leave it
+        # the delivery of our emails.
+        with open(os.path.join(spool.spool_dir, 'delivery.lock'),
+                  'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            spool.deliver()
+            self.assertEqual(len(spool.pending()), 3)
+
+        # All emails get delivered, in order.
+        spool.deliver()
+        self.assertEqual(spool.pending(), [])
+        self.assertEqual(delivered(), ['one', 'two', 'three'])
+
+        # A failure of the filer command is only reported: The email
+        # has already been sent, so it is not sent again, and does not
+        # prevent the delivery of the next emails.
+        spool.add([new_entry('bad-filer', filer_cmd=['/nonexistent/filer']),
+                   new_entry('four')])
+        spool.deliver()
+        self.assertEqual(spool.pending(), [])
+        self.assertEqual(delivered(), ['one', 'two', 'three', 'four'])
+
+        # An email which could not be sent stays in the spool, and
+        # so do the ones spooled after it, until the number of attempts
+        # reaches the limit.  The email is then set aside, and the next
+        # emails get delivered.
+        import updates.email_spool
+        real_deliver_email = updates.email_spool.deliver_email
+
+        def deliver_email(entry, transport):
+            if entry['message'].startswith('Subject: unsent\n'):
+                return False
+            return real_deliver_email(entry, transport)
+
+        updates.email_spool.deliver_email = deliver_email
+        try:
+            spool.add([new_entry('unsent'), new_entry('five')])
+            for _ in range(updates.email_spool.EMAIL_DELIVERY_MAX_ATTEMPTS
+                           - 1):
+                spool.deliver()
+                self.assertEqual(spool.pending(),
+                                 ['000000000006.email', '000000000007.email'])
+                self.assertEqual(delivered(),
+                                 ['one', 'two', 'three', 'four'])
+            spool.deliver()
+            self.assertEqual(spool.pending(), [])
+            self.assertEqual(spool.failed(), ['000000000006.email'])
+            self.assertEqual(mode('failed') & 0777, 0775)
+            self.assertEqual(delivered(),
+                             ['one', 'two', 'three', 'four', 'five'])
+        finally:
+            updates.email_spool.deliver_email = real_deliver_email
+
+        # An email rejected by the SMTP server is set aside right away.
+        from smtplib import SMTPRecipientsRefused
+
+        def deliver_email(entry, transport):
+            if entry['message'].startswith('Subject: rejected\n'):
+                raise SMTPRecipientsRefused(
+                    dict((recipient, (550, 'No such user'))
+                         for recipient in entry['recipients']))
+            return real_deliver_email(entry, transport)
+
+        updates.email_spool.deliver_email = deliver_email
+        try:
+            spool.add([new_entry('rejected'), new_entry('six')])
+            spool.deliver()
+            self.assertEqual(spool.pending(), [])
+            self.assertEqual(spool.failed(),
+                             ['000000000006.email', '000000000008.email'])
+            self.assertEqual(delivered(),
+                             ['one', 'two', 'three', 'four', 'five', 'six'])
+        finally:
+            updates.email_spool.deliver_email = real_deliver_email
+
+
+if __name__ == '__main__':
+    runtests()
@@ -0,0 +1,145 @@
+from support import *
+import asyncore
+import os
+import smtpd
+import smtplib
+import socket
+import threading
+
+
+class SMTPStandIn(smtpd.SMTPServer):
+    """A local SMTP server, recording the emails it receives.
+
+    ATTRIBUTES
+        nb_connections: The number of connections accepted so far.
+        messages: A list of (mailfrom, rcpttos, data) tuples, one for
+            each email received.
+        nb_421_replies: The number of emails to reject with a 421
+            error before accepting emails again.
+    """
+    def __init__(self):
+        smtpd.SMTPServer.__init__(self, ('127.0.0.1', 0), None)
+        self.nb_connections = 0
+        self.messages = []
+        self.nb_421_replies = 0
+
+    @property
+    def address(self):
+        return '127.0.0.1:%d' % self.socket.getsockname()[1]
+
+    def handle_accept(self):
+        self.nb_connections += 1
+        smtpd.SMTPServer.handle_accept(self)
+
+    def process_message(self, peer, mailfrom, rcpttos, data):
+        if self.nb_421_replies > 0:
+            self.nb_421_replies -= 1
+            return '421 Service not available, closing channel'
+        self.messages.append((mailfrom, rcpttos, data))
+
+
+class TestRun(TestCase):
+    def test_email_transport(self):
+        """Unit test updates.sendmail.EmailTransport.
+        """
+        self.enable_unit_test()
+
+        from updates.sendmail import EmailTransport
+
+        server = SMTPStandIn()
+        done = threading.Event()
+
+        def serve():
+            while not done.is_set():
+                asyncore.loop(timeout=0.05, count=1)
+
+        server_thread = threading.Thread(target=serve)
+        server_thread.start()
+        try:
+            transport = EmailTransport(server.address, use_sendmail=False)
+            self.assertIsNone(transport.sendmail_exe)
+
+            # All emails are sent through the same SMTP session.
+            for n in range(3):
+                self.assertTrue(
+                    transport.sendmail('me@example.com',
+                                       ['git-hooks-ci@example.com'],
+                                       'Subject: email %d\n\nBody.\n' % n))
+            self.assertEqual(server.nb_connections, 1)
+            self.assertEqual(
+                [(mailfrom, rcpttos) for (mailfrom, rcpttos, _)
+                 in server.messages],
+                [('me@example.com', ['git-hooks-ci@example.com'])] * 3)
+            self.assertIn('Subject: email 2', server.messages[2][2])
+
+            # If the session gets closed, we reconnect transparently.
+            transport.smtp.close()
+            self.assertTrue(
+                transport.sendmail('me@example.com', ['a@example.com'],
+                                   'Subject: email 3\n\nBody.\n'))
+            self.assertEqual(server.nb_connections, 2)
+            self.assertEqual(len(server.messages), 4)
+
+            # Same if the server tells us that it closes the session.
+            server.nb_421_replies = 1
+            self.assertTrue(
+                transport.sendmail('me@example.com', ['a@example.com'],
+                                   'Subject: email 4\n\nBody.\n'))
+            self.assertEqual(server.nb_connections, 3)
+            self.assertEqual(len(server.messages), 5)
+
+            # But only once per email.
+            server.nb_421_replies = 2
+            with self.assertRaises(smtplib.SMTPResponseException):
+                transport.sendmail('me@example.com', ['a@example.com'],
+                                   'Subject: email 5\n\nBody.\n')
+            self.assertEqual(server.nb_connections, 4)
+            self.assertEqual(len(server.messages), 5)
+
+            transport.close()
+            self.assertIsNone(transport.smtp)
+        finally:
+            done.set()
+            server_thread.join()
+            server.close()
+            asyncore.close_all()
+
+        # Once the server is gone, sending emails fails.
+        with self.assertRaises(socket.error):
+            transport.sendmail('me@example.com', ['a@example.com'],
+                               'Subject: email 6\n\nBody.\n')
+
+        # Unless we were asked to fall back on the sendmail program
+        # when no SMTP session can be opened.
+        import updates.sendmail
+
+        sendmail_log = '%s/sendmail.log' % TEST_DIR
+        fake_sendmail = '%s/sendmail' % TEST_DIR
+        with open(fake_sendmail, 'w') as f:
+            f.write('#! /bin/sh\necho "$@" >> %s\ncat >> %s\n'
+                    % (sendmail_log, sendmail_log))
+        os.chmod(fake_sendmail, 0755)
+
+        real_find_sendmail = updates.sendmail.find_sendmail
+        updates.sendmail.find_sendmail = lambda: fake_sendmail
+        try:
+            transport = EmailTransport(transport.smtp_server,
+                                       use_sendmail=False,
+                                       sendmail_fallback=True)
+            self.assertIsNone(transport.sendmail_exe)
+            for n in (7, 8):
+                self.assertTrue(
+                    transport.sendmail('me@example.com', ['a@example.com'],
+                                       'Subject: email %d\n\nBody.\n' % n))
+            self.assertEqual(transport.sendmail_exe, fake_sendmail)
+            self.assertIsNone(transport.smtp)
+        finally:
+            updates.sendmail.find_sendmail = real_find_sendmail
+        with open(sendmail_log) as f:
+            self.assertEqual(f.read(),
+                             'a@example.com\nSubject: email 7\n\nBody.\n'
+                             'a@example.com\nSubject: email 8\n\nBody.\n')
+
+
+if __name__ == '__main__':
+    runtests()
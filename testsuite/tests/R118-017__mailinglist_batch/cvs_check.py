@@ -0,0 +1,4 @@
+#! /usr/bin/env python
+"""A dummy cvs_check program that passes all files.
+"""
+pass
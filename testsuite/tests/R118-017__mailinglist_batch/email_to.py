@@ -0,0 +1,54 @@
+#! /usr/bin/env python
+"""A hooks.mailinglist script supporting the --batch protocol.
+
+Each invocation is logged in email_to.log, in the current directory
+(the bare repository).
+"""
+import sys
+
+ML_MAP = {'bfd': 'bfd-cvs@example.com',
+          'gdb': 'gdb-cvs@example.com',
+          }
+
+EVERYONE = set(ML_MAP[ml_key] for ml_key in ML_MAP)
+
+OWNER_MAP = (
+    ('bfd/', 'bfd'),
+    ('opcode/', 'bfd'),
+    ('gdb/', 'gdb'),
+    )
+
+
+def ml_from_filename(filename):
+    for (path, ml_key) in OWNER_MAP:
+        if filename.startswith(path):
+            return set([ML_MAP[ml_key]])
+    # Not found in map, it is a common file.
+    return EVERYONE
+
+
+def emails_for(filenames):
+    result = set()
+    for filename in filenames:
+        result.update(ml_from_filename(filename))
+    if not result:
+        # No files given, return EVERYONE
+        result = EVERYONE
+    return sorted(result)
+
+
+input_lines = sys.stdin.read().splitlines()
+with open('email_to.log', 'a') as log:
+    log.write('%s\n' % ' '.join(['email_to.py'] + sys.argv[1:]))
+    for line in input_lines:
+        log.write('    %s\n' % line)
+
+if sys.argv[1:] == ['--batch']:
+    while input_lines:
+        (_, rev, nb_files) = input_lines.pop(0).split()
+        filenames = input_lines[:int(nb_files)]
+        del input_lines[:int(nb_files)]
+        print 'commit %s' % rev
+        print '\n'.join(emails_for(filenames))
+else:
+    print '\n'.join(emails_for(input_lines))
@@ -0,0 +1,64 @@
+from support import *
+
+
+class TestRun(TestCase):
+    def test_commit_changes(self):
+        """Unit test git.commit_changes.
+        """
+        self.enable_unit_test()
+
+        import git
+        from git import (commit_changes, diff_tree, empty_tree_rev,
+                         prefetch_commit_changes)
+
+        rev_pairs = [
+            # A root commit.
+            (empty_tree_rev(), 'd065089ff184d97934c010ccd0e7e8ed94cb7165'),
+            ('d065089ff184d97934c010ccd0e7e8ed94cb7165',
+             '1516d0c4c0fdce739a5b62ccdecd9300995392b9'),
+            ('1516d0c4c0fdce739a5b62ccdecd9300995392b9',
+             '4a8540aa8676771a63e6053e3a523adee29bed98'),
+            ('1516d0c4c0fdce739a5b62ccdecd9300995392b9',
+             '8070696e551285e253cbe8bb848711dfa1980746'),
+            # Not a parent of the commit.
+            ('8070696e551285e253cbe8bb848711dfa1980746',
+             'da0e7332c075273f6129c01b89f0ac5bb7bd579a'),
+            # No change at all.
+            ('4a8540aa8676771a63e6053e3a523adee29bed98',
+             '4a8540aa8676771a63e6053e3a523adee29bed98'),
+            # Not using full SHA1s.
+            ('collide-a~1', '4a8540aa8676771a63e6053e3a523adee29bed98'),
+        ]
+        expected = dict((rev_pair, diff_tree('-r', *rev_pair))
+                        for rev_pair in rev_pairs)
+        self.assertEqual(expected[rev_pairs[5]], [])
+
+        # Count the number of git commands we run.
+        git_commands = []
+        real_popen = git.Popen
+
+        def popen(args, *other_args, **kwargs):
+            git_commands.append(args)
+            return real_popen(args, *other_args, **kwargs)
+
+        git.Popen = popen
+        try:
+            prefetch_commit_changes(rev_pairs)
+            self.assertEqual(git_commands, [])
+            for rev_pair in reversed(rev_pairs):
+                self.assertEqual(commit_changes(*rev_pair),
+                                 expected[rev_pair])
+        finally:
+            git.Popen = real_popen
+
+        # One "git diff-tree --stdin" for all the commits, except
+        # the one not using full SHA1s.
+        self.assertEqual(
+            [args[:3] for args in git_commands
+             if args[:2] == ['git', 'diff-tree']],
+            [['git', 'diff-tree', '--stdin'],
+             ['git', 'diff-tree', '-z']])
+
+
+if __name__ == '__main__':
+    runtests()
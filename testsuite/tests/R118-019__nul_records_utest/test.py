@@ -0,0 +1,63 @@
+from support import *
+
+
+class TestRun(TestCase):
+    def test_iter_nul_records(self):
+        """Unit test git.iter_nul_records.
+        """
+        self.enable_unit_test()
+
+        from cStringIO import StringIO
+        import git
+        from git import iter_nul_records
+
+        for (data, expected) in (
+                ('', []),
+                ('\x00', ['']),
+                ('a\x00bc\x00', ['a', 'bc']),
+                # The last record is not NUL-terminated.
+                ('a\x00\x00bc', ['a', '', 'bc']),
+        ):
+            self.assertEqual(list(iter_nul_records(data)), expected)
+
+            # Same thing, but reading the data from a file object,
+            # in small chunks, so that some records are split across
+            # several chunks.
+            real_chunk_size = git.OUTPUT_CHUNK_SIZE
+            git.OUTPUT_CHUNK_SIZE = 2
+            try:
+                self.assertEqual(list(iter_nul_records(StringIO(data))),
+                                 expected)
+            finally:
+                git.OUTPUT_CHUNK_SIZE = real_chunk_size
+
+    def test_git_iter_records(self):
+        """Unit test the _iter_records option of git_run.
+        """
+        self.enable_unit_test()
+
+        from git import git, diff_tree, CalledProcessError
+
+        self.assertEqual(
+            list(git.ls_tree('--full-tree', '--name-only', '-r', '-z',
+                             '8070696e551285e253cbe8bb848711dfa1980746',
+                             _iter_records=True)),
+            ['A', 'Dir/f', 'README', 'a'])
+
+        records = git.ls_tree('-z', 'no-such-rev', _iter_records=True)
+        with self.assertRaises(CalledProcessError):
+            list(records)
+
+        # diff_tree parses the output of "git diff-tree -z" using
+        # iter_nul_records.
+        self.assertEqual(
+            diff_tree('-r', '--root',
+                      'd065089ff184d97934c010ccd0e7e8ed94cb7165'),
+            [('000000', '100644',
+              '0000000000000000000000000000000000000000',
+              '01d0f124f86599aac247a7471aa98a583ecd027e',
+              'A', 'a')])
+
+
+if __name__ == '__main__':
+    runtests()